@@ -7,6 +7,8 @@
 import sys
 import os
 import json
+import threading
+import time
 
 import cv2
 import numpy as np
@@ -14,6 +16,169 @@ import numpy as np
 from decision_points.PointList import PointList
 from decision_points.MoveGetCirclePoint import MoveGetCirclePoint
 
+# cv2.warpPerspectiveが内部で使う固定小数点の精度（cv2.INTER_BITS）
+INTER_BITS = 5
+INTER_TAB_SIZE = 1 << INTER_BITS
+
+
+def open_video_capture(url):
+    """
+    映像配信URLに接続し、FPSと解像度を設定したcv2.VideoCaptureを返す
+
+    Parameters
+    ----------
+    url: str
+        映像配信URL
+
+    Returns
+    -------
+    cap: cv2.VideoCapture
+        接続済みのキャプチャ（接続に失敗した場合はisOpened()がFalseになる）
+    """
+    cap = cv2.VideoCapture(url)  # カメラシステムを使う場合
+    if not cap.isOpened():
+        return cap
+
+    # カメラFPSを30FPSに設定
+    cap.set(cv2.CAP_PROP_FPS, 30)
+
+    # カメラ画像の横幅を1280に設定
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+
+    # カメラ画像の縦幅を720に設定
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    return cap
+
+
+class FrameGrabber(threading.Thread):
+    """
+    映像配信URLに接続したまま、最新のフレームだけを保持し続けるスレッド
+    NOTE: capture()のたびにMJPEGストリームへ接続し直すと数秒かかるため、接続を張りっぱなしにする
+    """
+
+    def __init__(self, url, retry_interval=1.0):
+        """
+        Parameters
+        ----------
+        url: str
+            映像配信URL
+
+        retry_interval: float
+            接続が切れたときに再接続するまでの待ち時間（単位：秒）
+        """
+        super().__init__(daemon=True)
+        self.url = url
+        self.retry_interval = retry_interval
+        self.frame = None  # 最新のフレーム（1枚だけ保持する）
+        self.frame_count = 0  # これまでに取得したフレームの数
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+
+    def run(self):
+        cap = None
+        while not self.stopped.is_set():
+            # 未接続の場合は接続する
+            if cap is None:
+                cap = open_video_capture(self.url)
+                if not cap.isOpened():
+                    cap = None
+                    self.stopped.wait(self.retry_interval)
+                    continue
+
+            ret, img = cap.read()
+            if not ret or img is None:
+                # 映像が途切れた場合は接続し直す
+                cap.release()
+                cap = None
+                self.stopped.wait(self.retry_interval)
+                continue
+
+            # 古いフレームは捨てて、最新のフレームで上書きする
+            with self.condition:
+                self.frame = img
+                self.frame_count += 1
+                self.condition.notify_all()
+
+        if cap is not None:
+            cap.release()
+
+    def read(self, timeout=5.0):
+        """
+        最新のフレームを返す。まだ1枚も取得できていない場合は取得できるまで待つ
+
+        Parameters
+        ----------
+        timeout: float
+            フレームを待つ最大時間（単位：秒）
+
+        Returns
+        -------
+        frame: numpy.ndarray
+            最新のフレーム（タイムアウトした場合はNone）
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame is not None, timeout)
+            return self.frame
+
+    def read_frames(self, count, timeout=5.0):
+        """
+        最新のフレームから連続したcount枚のフレームを返す。足りない分は新しいフレームが届くまで待つ
+
+        Parameters
+        ----------
+        count: int
+            取得するフレームの枚数
+        timeout: float
+            1枚のフレームを待つ最大時間（単位：秒）
+
+        Returns
+        -------
+        frames: list
+            取得したフレームのリスト（タイムアウトした場合はcount枚より少なくなる）
+        """
+        return self.read_frames_after(count, timeout=timeout)[0]
+
+    def read_frames_after(self, count, after=0, timeout=5.0):
+        """
+        after番目より後に取得したフレームから、連続したcount枚のフレームを返す。
+        足りない分は新しいフレームが届くまで待つので、同じフレームを2回返すことはない
+
+        Parameters
+        ----------
+        count: int
+            取得するフレームの枚数
+        after: int
+            前回使ったフレームの番号（frame_count）。0の場合は最新のフレームから返す
+        timeout: float
+            1枚のフレームを待つ最大時間（単位：秒）
+
+        Returns
+        -------
+        frames: list
+            取得したフレームのリスト（タイムアウトした場合はcount枚より少なくなる）
+        last_count: int
+            最後に返したフレームの番号（1枚も返さなかった場合はafter）
+        """
+        frames = []
+        last_count = after
+        with self.condition:
+            for _ in range(count):
+                if not self.condition.wait_for(
+                        lambda: self.frame is not None and self.frame_count > last_count, timeout):
+                    break
+                frames.append(self.frame)
+                last_count = self.frame_count
+        return (frames, last_count)
+
+    def stop(self):
+        """
+        スレッドを止めて、ストリームを閉じる
+        """
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify_all()
+        self.join()
+
 
 class Camera:
     def __init__(self, url="http://raspberrypi.local/?action=stream"):
@@ -27,13 +192,38 @@ class Camera:
         self.modified_settings = False
         self.is_left = True  # TrueだとLコース
         self.move_get_circle_point = MoveGetCirclePoint()
+        self.grabber = None  # ストリームを張りっぱなしにするスレッド（start_stream()で起動する）
+        self.warp_maps = {}  # 台形補正用の変換マップのキャッシュ（key: (4隅の座標, 出力サイズ)）
+        self.captured_imgs = []  # 処理用の画像を合成する前のフレーム（余白なし）
+        self.padding = 0  # キャプチャした画像の余白（単位：px）
+        self.last_frame_count = 0  # 張りっぱなしのストリームから最後に取得したフレームの番号
 
         # 以下ファイルへ保存するデータ
         self.number_img_range = None  # 数字カードを切り取るための座標情報
         self.block_bingo_img_range = None  # ブロックビンゴエリアを切り取るための座標情報
         self.block_bingo_circle_coordinates = None  # ブロックビンゴエリアの各種サークルの座標情報
 
-    def capture(self, url=None, padding=0):
+    @property
+    def number_img_range(self):
+        return self._number_img_range
+
+    @number_img_range.setter
+    def number_img_range(self, img_range):
+        # 切り取る領域が変わったら、台形補正用の変換マップを作り直す
+        self._number_img_range = img_range
+        self.warp_maps.clear()
+
+    @property
+    def block_bingo_img_range(self):
+        return self._block_bingo_img_range
+
+    @block_bingo_img_range.setter
+    def block_bingo_img_range(self, img_range):
+        # 切り取る領域が変わったら、台形補正用の変換マップを作り直す
+        self._block_bingo_img_range = img_range
+        self.warp_maps.clear()
+
+    def capture(self, url=None, padding=0, frames=1, merge="median"):
         """
         URLから流れてくる映像をキャプチャし、静止画として保存する
 
@@ -45,6 +235,12 @@ class Camera:
         padding: int
             キャプチャした画像の余白（単位：px）。
 
+        frames: int
+            処理用の画像を作るためにキャプチャするフレームの枚数。2枚以上のときは合成してノイズを除去する
+
+        merge: str
+            フレームの合成方法（"median" or "mean"）
+
         Returns
         -------
         target_name: numpy.ndarray
@@ -52,49 +248,109 @@ class Camera:
         """
         if url is None:
             url = self.camera_url
-        cap = cv2.VideoCapture(url)  # カメラシステムを使う場合
-        if not cap.isOpened():
-            # HACK: エラーを返した方がいいかも
+
+        if self.is_streaming() and url == self.grabber.url:
+            imgs = self.read_frames(frames, url)
+            img_dummy = None
+        else:
+            # 座標指定用の画像として、もう1枚キャプチャする
+            imgs = self.read_frames(frames + 1, url)
+            img_dummy = imgs.pop() if len(imgs) > 1 else None
+
+        if len(imgs) == 0:
             print("On file {}".format(__file__))
             print("画像のキャプチャに失敗しました")
             sys.exit()
+        if img_dummy is None:
+            img_dummy = imgs[-1]
 
-        # カメラFPSを30FPSに設定
-        cap.set(cv2.CAP_PROP_FPS, 30)
+        # 複数のフレームを合成してノイズを除去する
+        img = self.merge_frames(imgs, merge)
 
-        # カメラ画像の横幅を1280に設定
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+        # 画像をメンバ変数に格納
+        self.captured_imgs = imgs
+        self.padding = padding
+        self.original_img = self.add_padding(img, padding)
+        self.original_img_dummy = self.add_padding(img_dummy, padding)
+        cv2.imwrite('./img/img_padding2.png', self.original_img)
+        cv2.imwrite('./img/img_dummy2.png', self.original_img_dummy)
 
-        # カメラ画像の縦幅を720に設定
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    def read_frames(self, count, url=None):
+        """
+        URLから流れてくる映像から、連続したフレームを取得する
 
-        # ピクセル配列をゼロ初期化
-        img = np.zeros((720, 1280, 3), dtype=np.uint8)
-        img_img = np.zeros((720, 1280, 3), dtype=np.uint8)
+        Parameters
+        ----------
+        count: int
+            取得するフレームの枚数
 
-        # 画像をキャプチャ
-        ret, img = cap.read()
-        ret_dummy, img_dummy = cap.read()
-        if img_dummy is None:
-            img_dummy = img
+        url: str
+            映像配信URL
+
+        Returns
+        -------
+        frames: list
+            取得したフレーム(numpy.ndarray)のリスト。取得に失敗したフレームは含まない
+        """
+        if url is None:
+            url = self.camera_url
 
-        # 余白を設定する
-        def create_padding(im):
-            tmp = im[:, :]
-            height, width = img.shape[:2]
-            new_img = cv2.resize(np.full((1, 1, 3), fill_value=255, dtype=np.uint8),
-                                 dsize=(width + padding * 2, height + padding * 2))
-            new_img[padding:height + padding, padding:width + padding] = tmp
-            return new_img
+        if self.is_streaming() and url == self.grabber.url:
+            # 張りっぱなしのストリームから最新のフレームを取得する
+            (frames, self.last_frame_count) = self.grabber.read_frames_after(count)
+            return frames
 
-        # 画像をメンバ変数に格納
-        self.original_img = create_padding(img)
-        self.original_img_dummy = create_padding(img_dummy)
-        cv2.imwrite('./img/img_padding2.png', self.original_img)
-        cv2.imwrite('./img/img_dummy2.png', self.original_img_dummy)
+        cap = open_video_capture(url)
+        if not cap.isOpened():
+            # HACK: エラーを返した方がいいかも
+            print("On file {}".format(__file__))
+            print("画像のキャプチャに失敗しました")
+            sys.exit()
+
+        # 画像をキャプチャ
+        frames = []
+        for _ in range(count):
+            ret, img = cap.read()
+            if ret and img is not None:
+                frames.append(img)
 
         # キャプチャ終了
         cap.release()
+        return frames
+
+    def start_stream(self, url=None):
+        """
+        ストリームを張りっぱなしにするスレッドを起動する。
+        起動後のcapture()は接続し直さず、最新のフレームをすぐに返す
+
+        Parameters
+        ----------
+        url: str
+            映像配信URL
+        """
+        if url is None:
+            url = self.camera_url
+        if self.is_streaming():
+            if self.grabber.url == url:
+                return
+            self.stop_stream()
+        self.grabber = FrameGrabber(url)
+        self.grabber.start()
+
+    def stop_stream(self):
+        """
+        ストリームを張りっぱなしにするスレッドを止める
+        """
+        if self.grabber is None:
+            return
+        self.grabber.stop()
+        self.grabber = None
+
+    def is_streaming(self):
+        """
+        ストリームを張りっぱなしにするスレッドが動いているかを返す
+        """
+        return self.grabber is not None and self.grabber.is_alive()
 
     def get_img(self, npoints, wname):
         ptlist = PointList(npoints)
@@ -126,9 +382,7 @@ class Camera:
             self.modified_settings = True
 
         # 画像を切り取る
-        result_img = self.clip(self.original_img, output_size=output_size,
-                               l_top=self.number_img_range["l_top"], l_btm=self.number_img_range["l_btm"],
-                               r_btm=self.number_img_range["r_btm"], r_top=self.number_img_range["r_top"])
+        result_img = self.warp(self.original_img, output_size, self.number_img_range)
         # 台形補正の結果を表示（何かキーを押すと終了）
         if is_debug:
             cv2.imshow("color", result_img)
@@ -137,6 +391,58 @@ class Camera:
             cv2.destroyAllWindows()
         return result_img
 
+    def get_number_imgs(self, output_size=(420, 297)):
+        """
+        直前のcapture()で取得したフレームそれぞれから数字カードを切り取る。
+        get_number_img()で切り取る領域を決めてから呼び出すこと
+
+        :param output_size: tuple[int, int] サイズ[width, height]
+        :return: list[numpy.ndarray] 数字カードの画像のリスト
+        """
+        return [self.warp(self.add_padding(img, self.padding), output_size, self.number_img_range)
+                for img in self.captured_imgs]
+
+    def get_new_number_img(self, output_size=(420, 297), timeout=5.0):
+        """
+        新しいフレームを1枚キャプチャして数字カードを切り取る。
+        ストリームを張りっぱなしにしている場合は、前回取得したフレームより新しいフレームが届くまで待つ。
+        処理用の画像(original_img)は更新しない
+
+        :param output_size: tuple[int, int] サイズ[width, height]
+        :param timeout: float 新しいフレームを待つ最大時間（単位：秒）
+        :return: numpy.ndarray 数字カードの画像（キャプチャに失敗した場合やタイムアウトした場合はNone）
+        """
+        if self.is_streaming() and self.camera_url == self.grabber.url:
+            (frames, self.last_frame_count) = self.grabber.read_frames_after(1, self.last_frame_count, timeout)
+        else:
+            frames = self.read_frames(1)
+        if len(frames) == 0:
+            return None
+        return self.warp(self.add_padding(frames[0], self.padding), output_size, self.number_img_range)
+
+    def get_new_number_imgs(self, timeout=1.0, output_size=(420, 297)):
+        """
+        呼び出してからtimeout秒が経つまで、新しいフレームから数字カードを切り取って1枚ずつ返すイテレータを返す。
+        新しいフレームを待つ時間は、残り時間までに制限する
+
+        :param timeout: float 新しいフレームを取得する時間の上限（単位：秒）
+        :param output_size: tuple[int, int] サイズ[width, height]
+        :return: iterator[numpy.ndarray] 数字カードの画像
+        """
+        deadline = time.time() + timeout
+
+        def new_number_imgs():
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                img = self.get_new_number_img(output_size, remaining)
+                if img is None:
+                    return
+                yield img
+
+        return new_number_imgs()
+
     def get_block_bingo_img(self, wname="Clip 'Block Bingo' area", npoints=4, output_size=(640, 640), is_debug=True):
         # ファイルから座標データを読み込んでいない場合は、切り取るための領域を選択する
         if self.block_bingo_img_range is None:
@@ -145,14 +451,8 @@ class Camera:
             self.modified_settings = True
 
         # 画像を切り取り、保存する
-        result_img = self.clip(self.original_img, output_size=output_size,
-                               l_top=self.block_bingo_img_range["l_top"], l_btm=self.block_bingo_img_range["l_btm"],
-                               r_btm=self.block_bingo_img_range["r_btm"], r_top=self.block_bingo_img_range["r_top"])
-        result_img_dummy = self.clip(self.original_img_dummy, output_size=output_size,
-                                     l_top=self.block_bingo_img_range["l_top"],
-                                     l_btm=self.block_bingo_img_range["l_btm"],
-                                     r_btm=self.block_bingo_img_range["r_btm"],
-                                     r_top=self.block_bingo_img_range["r_top"])
+        result_img = self.warp(self.original_img, output_size, self.block_bingo_img_range)
+        result_img_dummy = self.warp(self.original_img_dummy, output_size, self.block_bingo_img_range)
         # 台形補正の結果を表示（何かキーを押すと終了）
         if is_debug:
             cv2.imshow("color", result_img)
@@ -163,6 +463,21 @@ class Camera:
         self.block_bingo_img_dummy = result_img_dummy
         return result_img
 
+    def get_block_bingo_matrix(self, output_size=(640, 640)):
+        """
+        キャプチャした画像からブロックビンゴエリアの画像への射影変換行列を返す
+
+        Parameters
+        ----------
+        output_size: tuple
+            ブロックビンゴエリアの画像のサイズ。[高さ、横幅]の順
+        """
+        return self.perspective_matrix(output_size,
+                                       l_top=self.block_bingo_img_range["l_top"],
+                                       l_btm=self.block_bingo_img_range["l_btm"],
+                                       r_top=self.block_bingo_img_range["r_top"],
+                                       r_btm=self.block_bingo_img_range["r_btm"])
+
     def get_circle_coordinates_with_range(self, window_name="Choose circles"):
         if self.block_bingo_circle_coordinates is None:
             img = './img/block_bingo_img_dummy.png'
@@ -223,6 +538,73 @@ class Camera:
             json.dump(settings, fp, indent=4)
         print("[{}.{}]設定を保存しました".format(self.__class__.__name__, sys._getframe().f_code.co_name))
 
+    def warp(self, img, output_size, img_range):
+        """
+        画像から指定された領域を切り抜き、台形補正する。
+        変換マップは4隅の座標と出力サイズごとにキャッシュし、2回目以降はcv2.remapだけで済ませる。
+
+        Parameters
+        ----------
+        img: numpy.ndarray
+            入力画像
+
+        output_size: tuple
+            出力画像のサイズ。[高さ、横幅]の順
+
+        img_range: dict
+            切り取る領域の4隅の座標（l_top, l_btm, r_top, r_btm）
+
+        Returns
+        -------
+        clipped_img: numpy.ndarray
+            切り取った結果の画像
+        """
+        corners = tuple(tuple(float(v) for v in img_range[key]) for key in ("l_top", "l_btm", "r_top", "r_btm"))
+        key = (corners, tuple(output_size))
+        if key not in self.warp_maps:
+            mat = self.perspective_matrix(output_size, *corners)
+            self.warp_maps[key] = (mat,) + self.create_warp_maps(mat, output_size)
+        _, map1, map2 = self.warp_maps[key]
+        return cv2.remap(img, map1, map2, cv2.INTER_LINEAR)
+
+    @staticmethod
+    def create_warp_maps(mat, output_size):
+        """
+        cv2.warpPerspectiveと同じ結果になる、固定小数点形式のcv2.remap用変換マップを作る。
+
+        Parameters
+        ----------
+        mat: numpy.ndarray
+            入力画像から出力画像への射影変換行列
+
+        output_size: tuple
+            出力画像のサイズ。[高さ、横幅]の順
+
+        Returns
+        -------
+        map1: numpy.ndarray
+            参照する画素の整数部分（int16, [x, y]の順）
+
+        map2: numpy.ndarray
+            参照する画素の小数部分（uint16, 補間テーブルのインデックス）
+        """
+        h, w = output_size
+        # 出力画像の各画素が入力画像のどこを参照するかを、逆変換で求める
+        inv = cv2.invert(mat)[1]
+        xs = np.arange(w, dtype=np.float64)
+        ys = np.arange(h, dtype=np.float64)[:, None]
+        z = inv[2, 0] * xs + inv[2, 1] * ys + inv[2, 2]
+        with np.errstate(divide="ignore"):
+            z = np.where(z != 0, INTER_TAB_SIZE / z, 0)
+        x = np.rint(np.clip((inv[0, 0] * xs + inv[0, 1] * ys + inv[0, 2]) * z, -2 ** 31, 2 ** 31 - 1)).astype(np.int64)
+        y = np.rint(np.clip((inv[1, 0] * xs + inv[1, 1] * ys + inv[1, 2]) * z, -2 ** 31, 2 ** 31 - 1)).astype(np.int64)
+
+        map1 = np.empty((h, w, 2), dtype=np.int16)
+        map1[..., 0] = np.clip(x >> INTER_BITS, -32768, 32767)
+        map1[..., 1] = np.clip(y >> INTER_BITS, -32768, 32767)
+        map2 = ((y & (INTER_TAB_SIZE - 1)) * INTER_TAB_SIZE + (x & (INTER_TAB_SIZE - 1))).astype(np.uint16)
+        return map1, map2
+
     @staticmethod
     def array_to_list(src_dict):
         """
@@ -235,6 +617,72 @@ class Camera:
             target_dict[key] = src_dict[key].tolist()
         return target_dict
 
+    @staticmethod
+    def add_padding(img, padding):
+        """
+        画像の周囲に白色の余白を付ける
+
+        Parameters
+        ----------
+        img: numpy.ndarray
+            入力画像
+
+        padding: int
+            余白（単位：px）
+
+        Returns
+        -------
+        padded_img: numpy.ndarray
+            余白を付けた画像
+        """
+        height, width = img.shape[:2]
+        new_img = cv2.resize(np.full((1, 1, 3), fill_value=255, dtype=np.uint8),
+                             dsize=(width + padding * 2, height + padding * 2))
+        new_img[padding:height + padding, padding:width + padding] = img
+        return new_img
+
+    @staticmethod
+    def merge_frames(frames, method="median"):
+        """
+        複数のフレームを画素ごとに合成し、ノイズを除去した画像を返す
+
+        Parameters
+        ----------
+        frames: list
+            同じサイズのフレーム(numpy.ndarray)のリスト
+
+        method: str
+            "median"だと中央値、"mean"だと平均値で合成する
+
+        Returns
+        -------
+        merged_img: numpy.ndarray
+            合成した画像
+        """
+        n = len(frames)
+        if n == 1:
+            return frames[0]
+
+        if method == "median":
+            # フレームを1つの配列に詰めて、画素ごとの中央値をまとめて求める
+            stack = np.empty((n,) + frames[0].shape, dtype=np.uint8)
+            for i, frame in enumerate(frames):
+                stack[i] = frame
+            mid = n // 2
+            if n % 2 == 1:
+                return np.partition(stack, mid, axis=0)[mid]
+            stack = np.partition(stack, [mid - 1, mid], axis=0)
+            return ((stack[mid - 1].astype(np.uint16) + stack[mid] + 1) // 2).astype(np.uint8)
+
+        if method == "mean":
+            acc = np.zeros(frames[0].shape, dtype=np.float32)
+            for frame in frames:
+                acc += frame
+            acc *= 1.0 / n
+            return np.rint(acc).astype(np.uint8)
+
+        raise ValueError("合成方法は median か mean を指定してください")
+
     @staticmethod
     def clip(img, output_size=(420, 297),
              l_top=(-30, 460), l_btm=(190, 620),
@@ -273,15 +721,36 @@ class Camera:
         """
         # 出力サイズを引数から取得
         h, w = output_size
-        # [左上の座標],[右上の座標],[左下の座標],[右下の座標]
-        src_pts = np.array([l_top, r_top, l_btm, r_btm], dtype=np.float32)
-        dst_pts = np.array([[0, 0], [w, 0], [0, h], [w, h]], dtype=np.float32)
-        mat = cv2.getPerspectiveTransform(src_pts, dst_pts)
+        mat = Camera.perspective_matrix(output_size, l_top, l_btm, r_top, r_btm)
 
         clipped_img = cv2.warpPerspective(img, mat, (w, h))
 
         return clipped_img
 
+    @staticmethod
+    def perspective_matrix(output_size, l_top, l_btm, r_top, r_btm):
+        """
+        指定された4隅の座標を、出力画像の4隅へ移す射影変換行列を返す。
+
+        Parameters
+        ----------
+        output_size: tuple
+            出力画像のサイズ。[高さ、横幅]の順
+
+        l_top, l_btm, r_top, r_btm: list
+            左上、左下、右上、右下の座標。[X, Y]の順
+
+        Returns
+        -------
+        mat: numpy.ndarray
+            3x3の射影変換行列
+        """
+        h, w = output_size
+        # [左上の座標],[右上の座標],[左下の座標],[右下の座標]
+        src_pts = np.array([l_top, r_top, l_btm, r_btm], dtype=np.float32)
+        dst_pts = np.array([[0, 0], [w, 0], [0, h], [w, h]], dtype=np.float32)
+        return cv2.getPerspectiveTransform(src_pts, dst_pts)
+
 
 if __name__ == '__main__':
     edit_settings = False  # 設定ファイルの内容を上書きするかどうか（設定ファイルが存在しない場合は関係ない）
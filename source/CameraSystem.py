@@ -1,12 +1,22 @@
-from detection_number.DetectionNumber import DetectionNumber
+from detection_number.DetectionNumber import get_predictor, warm_up
 from Camera import Camera
 from bluetooth.Bluetooth import Bluetooth
+from bluetooth.AsyncBluetooth import AsyncBluetooth
+from bluetooth.CommandSender import CommandSender
 from detection_block.BlockRecognizer import BlockRecognizer
 from block_bingo.BlackBlockCommands import BlackBlockCommands
 from block_bingo.commands import Instructions
+from block_bingo.commands import load_durations
 from block_bingo.BlockBingoSolver import BlockBingoSolver
-import time
+from block_bingo.AnytimeSolver import AnytimeSolver
+from block_bingo.ParallelPlanner import ParallelPlanner
+from block_bingo.PlanCache import PlanCache
+from block_bingo.PlanCache import plan_key
+from block_bingo.PlanTable import PlanTable
+import asyncio
+import os
 import threading
+import itertools
 import pprint
 
 
@@ -19,8 +29,26 @@ class CameraSystem:
         self.camera.load_settings()
 
         self.bt = Bluetooth()
+        self.async_bt = AsyncBluetooth(self.bt)  # 接続と待ち合わせをイベントループで行うためのBluetooth
+        self.bt_loop = None  # Bluetoothの接続と待ち合わせを行うイベントループ
+        self.heartbeat = None  # 接続確認を定期的に送るタスク（開始の合図が届くまで）
+        self.heartbeat_interval = 5.0  # 接続確認を送る間隔[sec]
         self.port = "COM4"
         self.is_debug = False
+        self.framed_transfer = True  # 走行体が接続確認でフレーム転送に対応していると応答したら、コマンドをフレームにまとめて送るか
+        self.capture_frames = 5  # 認識に使う画像を合成するフレームの枚数
+        self.number_model_path = "./detection_number/my_model.npz"
+        self.number_threshold = 0.9  # 数字認識を打ち切る確からしさ
+        self.number_timeout = 1.0  # 数字認識にかける最大時間[sec]
+        self.planning_deadline = 0.2  # 運搬経路の改善を打ち切るまでの時間[sec]
+        self.bingo_time_budget = 90.0  # ブロックビンゴに使える残り時間[sec]
+        self.durations_path = "./block_bingo/durations.json"  # 走行体で実測した命令ごとの所要時間
+        self.durations = None  # 命令ごとの所要時間[sec](Noneの場合は既定値)
+        self.planner = None  # 運搬経路の候補を並列に計算するプランナ
+        self.plan_cache_path = "./block_bingo/plan_cache.sqlite3"  # 計算済みの運搬経路を保存するファイル
+        self.plan_cache = None  # 計算済みの運搬経路のキャッシュ
+        self.plan_table_path = "./block_bingo/plan_table"  # すべての配置の運搬経路を事前計算した表
+        self.plan_table = None  # 事前計算した運搬経路の表（メモリマップで読み込む）
 
     def start(self):
         """
@@ -28,10 +56,29 @@ class CameraSystem:
         :return:
         """
 
-        # スレッドを立てて、BT接続を始める。
-        connect_thread = threading.Thread(target=self._connect_to_ev3)
-        connect_thread.start()
-        time.sleep(3)
+        # イベントループのスレッドを立てて、BT接続を始める。
+        self.bt_loop = asyncio.new_event_loop()
+        threading.Thread(target=self.bt_loop.run_forever, daemon=True).start()
+        connected = asyncio.run_coroutine_threadsafe(self._connect_to_ev3(), self.bt_loop)
+        # カメラシステムとの接続を張りっぱなしにしておく（キャプチャのたびに接続し直さないため）
+        self.camera.start_stream()
+        # 座標ポチポチしている間に、数字認識の学習済みモデルを読み込んでおく
+        number_model = warm_up(self.number_model_path)
+        # 実測した命令ごとの所要時間を読み込む（ファイルが存在しない場合は既定値を使う）
+        if os.path.exists(self.durations_path):
+            self.durations = load_durations(self.durations_path)
+        # 運搬経路を計算するプロセスを立ち上げておく
+        self.planner = ParallelPlanner(durations=self.durations)
+        self.planner.warm_up()
+        # 計算済みの運搬経路を読み込んでおく（リハーサルや事前計算で同じ配置を計算していれば、計算を省略できる）
+        self.plan_cache = PlanCache(self.plan_cache_path)
+        print(f"SYS: 計算済みの運搬経路 {self.plan_cache.preload()}件")
+        # 事前計算した運搬経路の表を読み込む（表を計算したときと設定が異なる場合は使わない）
+        if os.path.isdir(self.plan_table_path):
+            plan_table = PlanTable(self.plan_table_path)
+            if plan_table.settings == self._plan_settings():
+                self.plan_table = plan_table
+                print(f"SYS: 事前計算した運搬経路 {len(plan_table)}件")
 
         while True:
             print("SYS: 本番ですか？")
@@ -65,19 +112,34 @@ class CameraSystem:
         print("\nSYS: 格子状のエリアを切り取ってください")
         self._detection_block_decide_points()
 
+        # 学習済みモデルの読み込みに失敗していたら、開始する前に例外を送出する
+        number_model.result()
+
         print('\nSYS: 開始しています...')
         if not self.is_debug:
-            connect_thread.join()
-            while True:
-                if self.bt.read() == 2:
-                    break
+            # 接続して、走行体から開始の合図が届くまで待つ
+            connected.result()
+            asyncio.run_coroutine_threadsafe(self._wait_for_start(), self.bt_loop).result()
 
         print("\nSYS: 数字カードを認識しています...")
         card_number = self._detection_number()
         print(f"SYS: ボーナスサークルは、{card_number}番サークル")
 
         print("\nSYS: ブロック運搬経路を計算しています...")
-        commands = self._path_planning(card_number, is_left)
+        # 計算できたコマンドから順に、別スレッドで走行体へ送信する
+        sender = None
+        if not self.is_debug:
+            # コマンドもイベントループで送る（接続確認などと読み書きが混ざらず、接続が切れたら接続し直す）
+            sender = CommandSender(self.async_bt, self.framed_transfer, is_print=self.is_debug, loop=self.bt_loop)
+            sender.start()
+        try:
+            commands = self._path_planning(card_number, is_left, sender.put if sender is not None else None)
+        except BaseException:
+            # 途中まで送ったコマンドを走行体に捨ててもらう（終了コードを待ったまま止まらないようにする）
+            if sender is not None:
+                sender.abort()
+                sender.join()
+            raise
 
         instructions = Instructions()
         print("運搬経路コマンド")
@@ -85,25 +147,47 @@ class CameraSystem:
                        for command in commands])
 
         print("\nSYS: コマンド送信しています...")
-        if not self.is_debug:
-            self._send_command(commands)
+        if sender is not None:
+            self._send_command(sender)
         else:
             print(commands)
-
-    def _connect_to_ev3(self):
+        self.camera.stop_stream()
+        self.planner.shutdown()
+        self.plan_cache.close()
+        connected.cancel()
+        asyncio.run_coroutine_threadsafe(self._stop_heartbeat(), self.bt_loop).result()
+        self.bt_loop.call_soon_threadsafe(self.bt_loop.stop)
+        self.async_bt.close()
+
+    async def _connect_to_ev3(self):
         """
-        EV3とBT接続
+        EV3とBT接続（接続が切れた場合は、AsyncBluetoothが接続し直す）
+        接続できたら、開始の合図が届くまで接続確認を定期的に送る（座標ポチポチなどをしている間に接続が切れても気づけるようにする）
         """
         print("\nSYS: Connect EV3")
-        self.bt.connect(self.port)
-        while True:
-            write_data = 0
-            self.bt.write(write_data, is_print=self.is_debug)
-            if self.bt.read() == 1:
-                print("SYS: Success! Connected ev3")
-                return
+        await self.async_bt.connect(self.port)
+        await self.async_bt.handshake()
+        self.heartbeat = asyncio.ensure_future(self.async_bt.heartbeat(self.heartbeat_interval))
 
-            time.sleep(1)  # sec
+    async def _wait_for_start(self):
+        """
+        走行体から開始の合図が届くまで待つ。合図が届いたら、コマンドの送信に接続確認が混ざらないように接続確認を止める
+        """
+        await self.async_bt.wait_for(AsyncBluetooth.START)
+        await self._stop_heartbeat()
+
+    async def _stop_heartbeat(self):
+        """
+        接続確認を定期的に送るタスクを止める
+        """
+        if self.heartbeat is None:
+            return
+        self.heartbeat.cancel()
+        try:
+            await self.heartbeat
+        except asyncio.CancelledError:
+            pass
+        self.heartbeat = None
 
     def _detection_number_decision_points(self):
         """
@@ -119,23 +203,66 @@ class CameraSystem:
         数字カードの切り取りと数字の識別
         :return: 数字カードの数字
         """
-        self.camera.capture(padding=100)
+        self.camera.capture(padding=100, frames=self.capture_frames)
         number_card = self.camera.get_number_img(is_debug=self.is_debug)
-        detection_number = DetectionNumber(
-            img=number_card, model_path="./detection_number/my_model.npz")
-        return detection_number.get_detect_number()
+        # 読み込み済みのモデルを使い回す（推論は画像を引数で渡すだけなので、状態を持たない）
+        predictor = get_predictor(self.number_model_path)
+        # 確からしさが閾値を超えるまで、キャプチャ済みのフレーム、新しいフレームの順に推論する
+        # （新しいフレームは、まだ使っていないフレームが届くまで、残り時間の範囲で待つ）
+        number_cards = itertools.chain([number_card], self.camera.get_number_imgs(),
+                                       self.camera.get_new_number_imgs(self.number_timeout))
+        number, confidence = predictor.detect_number_incrementally(
+            number_cards, threshold=self.number_threshold, timeout=self.number_timeout)
+        print(f"SYS: 数字認識の確からしさ {confidence:.2f}")
+        return number
+
+    def _path_planning(self, card_number, is_left, send=None):
+        """
+        運搬経路を計算する．sendを指定した場合は，計算できたコマンドから順にsendへ渡す
 
-    def _path_planning(self, card_number, is_left):
+        :param send: function コマンドのリストを受け取って送信する関数
+        :return: コマンドのリスト
+        """
         # ブロックの認識
         (block_circles, cross_circles) = self._detection_block(card_number, is_left)
 
+        # 同じ配置の運搬経路を事前計算または計算済みであれば、保存したコマンドを使う
+        key = plan_key(block_circles, cross_circles, self._plan_settings())
+        commands = None
+        if self.plan_table is not None:
+            commands = self.plan_table.get(block_circles, cross_circles)
+        if commands is None:
+            commands = self.plan_cache.get(key)
+        if commands is not None:
+            print("SYS: 計算済みの運搬経路を使います")
+            if send is not None:
+                send(commands)
+            return commands
+
+        # ビンゴ状態、ブロックサークル番号、ブロックサークル間の運搬経路の候補を並列に計算し、最良の候補を選ぶ
+        plan = self.planner.plan(block_circles, cross_circles, self.bingo_time_budget, self.durations)
+        print("SYS: {} {} (推定 {:.1f}秒)".format(plan['bingo'].name, plan['quota'], plan['time']))
+
         # ブロックサークル内の黒ブロック運搬経路を計算する
-        (commands, path) = self._black_circles_path(block_circles)
+        (commands, path) = self._black_circles_path(block_circles, plan['route'])
+        # 黒ブロック運搬のコマンドは、ブロックビンゴの運搬経路を計算している間に送信しておく
+        if send is not None:
+            send(commands)
         # ブロックビンゴを成立させるための運搬経路を計算する
-        commands += self._block_bingo_path(block_circles, cross_circles, path)
+        bingo_commands = self._block_bingo_path(block_circles, cross_circles, path, plan['bingo'], plan['quota'])
+        if send is not None:
+            send(bingo_commands)
+        commands += bingo_commands
 
+        self.plan_cache.put(key, commands)
         return commands
 
+    def _plan_settings(self):
+        """
+        運搬経路の計算結果を変える設定を返す。設定を変えた場合は、計算済みの運搬経路を使わない。
+        """
+        return {'durations': self.durations, 'time_budget': self.bingo_time_budget}
+
     def _detection_block_decide_points(self):
         # 領域、座標指定
 
@@ -161,26 +288,33 @@ class CameraSystem:
             Lコースかどうか
         """
         while True:
-            # 領域、座標指定
-            block_bingo_img = self.camera.get_block_bingo_img(
-                is_debug=self.is_debug)  # 領域指定して画像取得
-            circles_coordinates = self.camera.get_circle_coordinates_with_range()  # 座標をドラッグ・アンド・ドロップ
-            self.camera.save_settings()  # 座標ポチポチした結果を保存
             # ブロックの認識器の生成
             recognizer = BlockRecognizer(card_number, is_left)
-            # ブロックの認識(戻り値は、BlockCirclesCoordinateとCrossCirclesCoordinateのインスタンス)
-            (block_circle, cross_circle) = recognizer.recognize(
-                block_bingo_img, circles_coordinates)
+            if self.is_debug or self.camera.block_bingo_img_range is None \
+                    or self.camera.block_bingo_circle_coordinates is None:
+                # 領域、座標指定
+                block_bingo_img = self.camera.get_block_bingo_img(
+                    is_debug=self.is_debug)  # 領域指定して画像取得
+                circles_coordinates = self.camera.get_circle_coordinates_with_range()  # 座標をドラッグ・アンド・ドロップ
+                self.camera.save_settings()  # 座標ポチポチした結果を保存
+                # ブロックの認識(戻り値は、BlockCirclesCoordinateとCrossCirclesCoordinateのインスタンス)
+                (block_circle, cross_circle) = recognizer.recognize(
+                    block_bingo_img, circles_coordinates)
+            else:
+                # 領域、座標指定が済んでいる場合は、各サークルの周辺だけを台形補正して認識する
+                (block_circle, cross_circle) = recognizer.recognize_sparse(
+                    self.camera.original_img, self.camera.get_block_bingo_matrix(),
+                    self.camera.block_bingo_circle_coordinates)
             print(f"黒ブロック配置サークルは{block_circle.black_circle}番")
             print(f"カラーブロック配置サークルは{block_circle.color_circle}番")
 
             if block_circle is not None and cross_circle is not None:
                 break
             else:
-                self.camera.capture(padding=100)
+                self.camera.capture(padding=100, frames=self.capture_frames)
         return (block_circle, cross_circle)
 
-    def _black_circles_path(self, block_circles):
+    def _black_circles_path(self, block_circles, route=None):
         """
         ブロックサークル内の黒ブロックを運搬する経路を計算する。
 
@@ -188,14 +322,17 @@ class CameraSystem:
         ----------
         block_circles : BlockCirclesCoordinate
             ブロックサークルの座標
+        route : list
+            ブロックサークル間の運搬経路(Noneの場合は、BlockCirclesSolverで計算する)
         """
         solver = BlackBlockCommands(
-            block_circles.bonus_circle, block_circles.black_circle, block_circles.color_circle)
+            block_circles.bonus_circle, block_circles.black_circle, block_circles.color_circle,
+            block_circles.is_left, route)
         commands = list(solver.gen_commands())
 
         return (commands, solver.reverse_route)
 
-    def _block_bingo_path(self, block_circles, cross_circles, path):
+    def _block_bingo_path(self, block_circles, cross_circles, path, bingo, quota):
         """
         ブロックビンゴ成立のための運搬経路を計算する。
 
@@ -207,22 +344,27 @@ class CameraSystem:
             交点サークルの座標
         path : list
             黒ブロックを運搬するためのブロックサークル間移動の運搬経路
+        bingo : Bingo
+            ビンゴ状態
+        quota : list
+            ブロックを設置するブロックサークル番号
         """
-        solver = BlockBingoSolver(block_circles, cross_circles, path)
-        return solver.solve()
+        solver = BlockBingoSolver(block_circles, cross_circles, path, self.durations)
+        # 貪欲法の運搬経路を初期解として、締め切りまで改善を続ける
+        planner = AnytimeSolver(solver, bingo, self.planning_deadline, quota)
+        planner.start()
+        return planner.result()
 
-    def _send_command(self, commands):
+    def _send_command(self, sender):
         """
-        EV3にコマンドを送る
+        EV3へのコマンドの送信を終える（キューに残ったコマンドと終了コードを送り終えるまで待つ）
 
-        :param commands: コマンドのリスト
+        :param sender: CommandSender コマンドを送信しているスレッド
         """
-        for c in commands:
-            self.bt.write(ord(c))
-            time.sleep(0.5)  # sec
-
-        # 終了コードを送信
-        self.bt.write(ord('#'))
+        sender.close()
+        sender.join()
+        if sender.error is not None:
+            raise sender.error
         print("SYS: command send complete")
 
 
@@ -0,0 +1,84 @@
+"""
+    @file   AnytimeSolver.py
+    @author T.Miyaji
+    @brief  締め切りまで運搬経路を改善し続けるソルバを提供する。
+"""
+import threading
+import time
+from RuleBook import Bingo
+
+
+class AnytimeSolver(threading.Thread):
+    """
+    貪欲法(BlockBingoSolver.solve)の運搬経路をすぐに計算し、締め切りまで別スレッドで分枝限定法による改善を続けるクラス。
+    いつ問い合わせても、その時点で推定走行時間が最も短い運搬経路を返す。
+    """
+    def __init__(self, solver, bingo=Bingo.DOUBLE_BINGO, deadline=0.2, quota=None):
+        """
+        Parameters
+        ----------
+        solver : BlockBingoSolver
+            ブロックビンゴの運搬経路を計算するソルバ
+        bingo : Bingo
+            ビンゴ状態
+        deadline : float
+            運搬経路の改善を打ち切るまでの時間[sec]
+        quota : list
+            ブロックを設置するブロックサークル番号(Noneの場合は、ビンゴ状態の最初の候補)
+        """
+        super().__init__(daemon=True)
+        self.solver = solver
+        self.bingo = bingo
+        self.quota = quota
+        self.deadline = time.monotonic() + deadline
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        # 貪欲法の運搬経路を初期解とする
+        self.best = solver.greedy_plan(bingo, quota)
+
+
+    def run(self):
+        self.solver.improve_plan(self.bingo, self.best, self.should_stop, self.lock, self.quota)
+
+
+    def should_stop(self):
+        """
+        改善を打ち切るかどうかを返す。
+        """
+        return self.stopped.is_set() or time.monotonic() > self.deadline
+
+
+    def get(self):
+        """
+        その時点で推定走行時間が最も短い運搬経路のコマンドのリストを返す。
+        """
+        with self.lock:
+            return list(self.best['commands'])
+
+
+    def stop(self):
+        """
+        改善を打ち切る。
+        """
+        self.stopped.set()
+
+
+    def result(self, grace=0.01):
+        """
+        締め切りまで待ってから改善を打ち切り、推定走行時間が最も短い運搬経路のコマンドのリストを返す。
+        ソルバの状態(走行体の位置、向き、交点サークル)は、返した運搬経路を計算したあとの状態になる。
+        改善中のスレッドがgrace秒以内に終わらない場合は、待たずにその時点の最良解を返す(改善はソルバのコピーで行うので、ソルバの状態は変わらない)。
+
+        Parameters
+        ----------
+        grace : float
+            改善を打ち切ってから、スレッドの終了を待つ最大時間[sec]
+        """
+        if self.is_alive():
+            self.join(max(0, self.deadline - time.monotonic()))
+        self.stop()
+        if self.is_alive():
+            self.join(grace)
+        with self.lock:
+            self.solver.apply_plan(self.best)
+            return list(self.best['commands'])
@@ -7,9 +7,10 @@
 from BlockBingoCoordinate import BlockCirclesCoordinate
 from BlockCirclesPath import BlockCirclesSolver
 from commands import Instructions
+from commands import rewrite
 
 class BlackBlockCommands():
-    def __init__(self, bonus, black, color, is_left=True):
+    def __init__(self, bonus, black, color, is_left=True, route=None):
         """
         ブロックサークル内の黒ブロックを運搬する経路を計算するための情報を登録する。
         
@@ -23,6 +24,8 @@ class BlackBlockCommands():
             ブロックサークル内のカラーブロックが置かれているサークル番号
         is_left : bool
             コース設定のためのフラグ
+        route : list
+            ブロックサークル間の運搬経路(Noneの場合は、BlockCirclesSolverで計算する)
         """
         self.is_left = is_left
 
@@ -31,7 +34,7 @@ class BlackBlockCommands():
         self.block_circles_coordinate = BlockCirclesCoordinate(is_left, bonus, color, black)
 
         # 経路を計算
-        route_tmp = self.block_circles_solver.solve()
+        route_tmp = self.block_circles_solver.solve() if route is None else list(route)
         # 経路の軸の相違を吸収
         self.reverse_route = route_tmp
         self.route = list(map(lambda x: (x[1], x[0]), route_tmp))
@@ -87,7 +90,8 @@ class BlackBlockCommands():
         
         # 黒ブロックを配置するコマンドを追加する
         commands = self.put_to_command(commands)
-        return commands.replace(Instructions.STRAIGHT * 2, Instructions.STRAIGHT_STRAIGHT)
+        # 連続するブロックサークル間の移動や回頭を、置き換え規則でまとめる
+        return ''.join(rewrite(commands))
 
     def coordinate_to_command(self, robot_coor, next_coor, direction):
         """
@@ -21,6 +21,96 @@ class Color(Enum):
     WHITE = auto()
 
 
+# 交点サークルの座標の並び順（初期位置としてブロックが置かれている交点サークルが先頭）
+CROSS_CIRCLES_ORDER = [(0,0), (1,1), (0,2), (1,3), (2,0), (3,1), (2,2), (3,3),
+                       (0,1), (0,3), (1,0), (1,2), (2,1), (2,3), (3,0), (3,2)]
+
+
+def cross_circle_bit(coordinate):
+    """
+    交点サークルの座標に対応するビットを返す。4x4の交点サークルを16bitの整数(ビットボード)で表現する。
+    交点サークルでない座標(黒線の中点など)の場合は0を返す。
+
+    Parameters
+    ----------
+    coordinate : tuple
+        交点サークルの座標
+    """
+    if coordinate[0] in (0, 1, 2, 3) and coordinate[1] in (0, 1, 2, 3):
+        return 1 << (int(coordinate[0]) * 4 + int(coordinate[1]))
+    return 0
+
+
+class CrossCirclesSet():
+    """
+    ブロックが置かれている交点サークルの集合。16bitの整数(ビットボード)で表現する。
+    listと同じように in, append, remove, 添字アクセス, 反復ができる。
+    反復はCROSS_CIRCLES_ORDERの順に行う。
+    """
+    def __init__(self, coordinates=()):
+        """
+        Parameters
+        ----------
+        coordinates : list
+            ブロックが置かれている交点サークルの座標のリスト
+        """
+        self.mask = 0
+        for coordinate in coordinates:
+            self.append(coordinate)
+
+    def __contains__(self, coordinate):
+        return self.mask & cross_circle_bit(coordinate) != 0
+
+    def __iter__(self):
+        return (coordinate for coordinate in CROSS_CIRCLES_ORDER if self.mask & cross_circle_bit(coordinate))
+
+    def __len__(self):
+        return bin(self.mask).count('1')
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, CrossCirclesSet):
+            return self.mask == other.mask
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, coordinate):
+        """
+        交点サークルを集合に加える。
+
+        Parameters
+        ----------
+        coordinate : tuple
+            交点サークルの座標
+        """
+        bit = cross_circle_bit(coordinate)
+        if bit == 0:
+            raise ValueError('coordinate is not cross circle!')
+        self.mask |= bit
+
+    def remove(self, coordinate):
+        """
+        交点サークルを集合から取り除く。
+
+        Parameters
+        ----------
+        coordinate : tuple
+            交点サークルの座標
+        """
+        if coordinate not in self:
+            raise ValueError('coordinate is not in the set!')
+        self.mask &= ~cross_circle_bit(coordinate)
+
+    def copy(self):
+        other = CrossCirclesSet()
+        other.mask = self.mask
+        return other
+
+
 class BlockCirclesCoordinate():
     """
     ブロックサークルの座標を表すクラス
@@ -111,10 +201,58 @@ class CrossCirclesCoordinate():
         """
         # 交点サークルの座標を表す4x4行列を作成する(配列の要素は、配置されたブロックの色を表す)
         self.cross_circles = np.full((4, 4), Color.NONE)
-        # 初期位置としてブロックが置かれている交点サークルの座標をリスト化する
-        self.open = [(0,0), (1,1), (0,2), (1,3), (2,0), (3,1), (2,2), (3,3)]
+        # 色ごとのビットボード(key: Colorの値, value: その色のブロックが置かれた交点サークルのビット)
+        self.color_boards = {}
+        # 初期位置としてブロックが置かれている交点サークルの集合
+        self.open = CrossCirclesSet(CROSS_CIRCLES_ORDER[:8])
     
 
+    def copy(self):
+        """
+        交点サークルの状態を複製する。
+        """
+        other = CrossCirclesCoordinate()
+        other.cross_circles = self.cross_circles.copy()
+        other.color_boards = dict(self.color_boards)
+        other.open = self.open.copy()
+        return other
+
+
+    def key(self):
+        """
+        交点サークルの状態を表すハッシュ可能な値を返す。
+        """
+        return (self.open.mask, tuple(sorted((color, board) for (color, board) in self.color_boards.items() if board)))
+
+
+    def initial_block_values(self):
+        """
+        初期位置の交点サークル(CROSS_CIRCLES_ORDERの先頭8個)に置かれたブロックの色の値を、CROSS_CIRCLES_ORDERの順に返す。
+        ブロックの配置のキーに使う。認識できなかった色(None)と白(ブロックなし)は、Color.NONEの値にする。
+        """
+        values = []
+        for coordinate in CROSS_CIRCLES_ORDER[:8]:
+            color = self.color(coordinate)
+            if color is None or color.value == Color.WHITE.value:
+                color = Color.NONE
+            values.append(color.value)
+        return tuple(values)
+
+
+    def has_color(self, coordinate, color):
+        """
+        指定した交点サークルの座標に指定色のブロックが置かれているかを返す。
+
+        Parameters
+        ----------
+        coordinate : tuple
+            交点サークルの座標
+        color : Color
+            ブロックの色
+        """
+        return self.color_boards.get(color.value, 0) & cross_circle_bit(coordinate) != 0
+
+
     def color(self, coordinate):
         """
         指定した交点サークルの座標に置かれているブロックの色を取得する。
@@ -144,6 +282,12 @@ class CrossCirclesCoordinate():
             raise ValueError('y-coordinate of cross circles is invalid!')
         
         self.cross_circles[coordinate[0], coordinate[1]] = color
+        # ビットボードを更新する(色の比較はモジュールの読み込み方に依存しないように値で行う)
+        bit = cross_circle_bit(coordinate)
+        for key in self.color_boards:
+            self.color_boards[key] &= ~bit
+        if color is not None and color.value != Color.NONE.value:
+            self.color_boards[color.value] = self.color_boards.get(color.value, 0) | bit
     
 
     def goal_node(self, current, block_circle):
@@ -174,6 +318,23 @@ class CrossCirclesCoordinate():
         return coordinates[distance.index(min(distance))]
 
 
+    def goal_nodes(self, current, block_circle):
+        """
+        設置するブロックサークル番号の周辺にある、ブロックが置かれていない座標のリストを走行体に近い順に返す。
+
+        Parameters
+        ----------
+        current : tuple
+            走行体の現在地
+        block_circle : tuple
+            ブロックサークルの座標
+        """
+        coordinates = [(block_circle[0] + x, block_circle[1] + y)
+                       for x in (0, 0.5, 1) for y in (0, 0.5, 1) if (x, y) != (0.5, 0.5)]
+        coordinates = [coordinate for coordinate in coordinates if coordinate not in self.open]
+        return sorted(coordinates, key=lambda x: abs(x[0]-current[0]) + abs(x[1]-current[1]))
+
+
     def move_block(self, coordinate):
         """
         交点サークルからブロックを取得して移動したことをデータ構造に登録する。
@@ -201,12 +362,11 @@ class CrossCirclesCoordinate():
             運搬するブロックの色のリスト
         """
         # 現在地から近い順にブロックが置いてある交点サークルの座標をソートする
-        distances = list(map(lambda x: abs(x[0]-current[0]) + abs(x[1]-current[1]), self.open))
-        coordinates = [self.open[index] for index in np.argsort(distances)]
+        coordinates = sorted(self.open, key=lambda x: abs(x[0]-current[0]) + abs(x[1]-current[1]))
 
         # 走行体の現在地から最も近い、指定色のブロックが置いてある交点サークルの座標を調べる
         for coordinate in coordinates:
             for color in colors:
-                if self.cross_circles[coordinate].value == color.value:
+                if self.has_color(coordinate, color):
                     return coordinate, colors.index(color)
         return None
@@ -3,12 +3,41 @@
     @author T.Miyaji
     @brief  ブロックビンゴを攻略するための経路を計算するクラス
 """
+import copy
+import heapq
+import itertools
+import threading
+import time
 from BlockBingoCoordinate import Color
 from BlockBingoCoordinate import BlockCirclesCoordinate
 from BlockBingoCoordinate import CrossCirclesCoordinate
 from RuleBook import RuleBook
 from RuleBook import Bingo
+from RuleBook import BINGO_LINES
 from commands import Commands
+from commands import Instructions
+from commands import DEFAULT_DURATIONS
+from RouteTable import get_route_table
+
+
+def choose_plan(plans, time_budget):
+    """
+    推定走行時間が残り時間以内に収まる運搬経路のうち、成立するビンゴの列数が最も多いものを返す。
+    列数が同じ場合は、推定走行時間が短い方を選ぶ。残り時間に収まる運搬経路がない場合は、推定走行時間が最も短いものを返す。
+    ビンゴ状態を達成できる運搬経路がある場合は、達成できない運搬経路は選ばない。
+
+    Parameters
+    ----------
+    plans : list
+        運搬経路の辞書(bingo: ビンゴ状態, time: 推定走行時間, achieved: ビンゴ状態を達成したか)のリスト
+    time_budget : float
+        ブロックビンゴに使える残り時間[sec]
+    """
+    achieved = [plan for plan in plans if plan['achieved']] or plans
+    within = [plan for plan in achieved if plan['time'] <= time_budget]
+    if len(within) == 0:
+        return min(achieved, key=lambda plan: plan['time'])
+    return max(within, key=lambda plan: (BINGO_LINES[plan['bingo']], -plan['time']))
 
 
 class Path():
@@ -73,7 +102,7 @@ class Path():
 
 
 class BlockBingoSolver():
-    def __init__(self, block_circles, cross_circles, block_circles_path):
+    def __init__(self, block_circles, cross_circles, block_circles_path, durations=None):
         """
         ブロックビンゴを成立させるための経路を計算するクラス。
 
@@ -85,16 +114,27 @@ class BlockBingoSolver():
                 交点サークルの座標
             block_circles_path : list
                 ブロックサークル間移動の運搬経路
+            durations : dict
+                命令ごとの所要時間[sec](Noneの場合は既定値)
         """
         # ブロックサークルの座標クラス
         self.block_circles = block_circles
         # 交点サークルの座標クラス
         self.cross_circles = cross_circles
+        # 移動コストと走行時間の推定に使う命令ごとの所要時間
+        self.durations = durations if durations is not None else DEFAULT_DURATIONS
 
         # ブロックサークル間移動したあとの走行体の向きを取得する
         self.direction = self.get_robot_direction_after_block_circle(block_circles_path)
         # ブロックサークル間移動したあとの走行体の位置を取得する
         self.position = self.get_robot_position_after_block_circle(block_circles_path)
+        # 走行体の向きと移動方向ごとの移動コスト表
+        self.turn_costs = self.create_turn_costs()
+        # 移動コスト表の最小値(A*アルゴリズムの予測コストで使う)
+        self.min_turn_cost = min(cost for directions in self.turn_costs.values()
+                                 for moves in directions.values() for cost in moves.values())
+        # 全点対間の最短経路表(ブロックの配置ごとに初めて使うときに計算する)
+        self.route_table = get_route_table(self.graph_nodes(), self.graph_edges(), self.turn_costs)
 
     def get_robot_direction_after_block_circle(self, block_circles_path):
         """
@@ -216,6 +256,15 @@ class BlockBingoSolver():
         return [node for node in nodes if 0 <= node[0] <= 3 and 0 <= node[1] <= 3 and node not in block_circles]      
 
 
+    def copy(self):
+        """
+        交点サークルの状態を複製したソルバを返す。複製したソルバで経路を計算しても、複製元の状態は変わらない。
+        """
+        other = copy.copy(self)
+        other.cross_circles = self.cross_circles.copy()
+        return other
+
+
     def solve(self, bingo=Bingo.DOUBLE_BINGO):
         """
         ブロックビンゴ攻略とボーナスサークル設置を成立させるための運搬経路を計算する。
@@ -228,43 +277,117 @@ class BlockBingoSolver():
         # ゲームの終了判定クラス
         rule_book = RuleBook(self.block_circles, self.cross_circles, bingo)
         # コマンド変換クラス
-        commands = Commands(self.block_circles, self.cross_circles)
+        commands = Commands(self.block_circles, self.cross_circles, self.durations)
         
+        self.transport_greedily(rule_book, commands)
+        self.go_to_garage(commands)
+        return commands.get()
+
+
+    def transport_greedily(self, rule_book, commands):
+        """
+        走行体の現在地から最も近いブロックを順に運搬する経路を計算し、コマンドに変換する。
+        ビンゴ状態を達成できたかどうかを返す。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        commands : Commands
+            コマンド変換クラス
+        """
         while rule_book.achivement() != True:
-            # ブロックビンゴ攻略のために運搬するブロックサークル番号
-            quota = rule_book.get_quota()
-            colors = self.block_circles.colors(quota)
-            # ボーナスサークル設置が2個成立していないときは、運搬するブロック色に黒色を加える
-            if rule_book.bonus < 2:
-                colors.append(Color.BLACK)
-
-            (src, index) = self.cross_circles.start_node(self.position, colors)
-            if src is None or index is None:
+            # 走行体の現在地から最も近い、運搬するべきブロックを選ぶ
+            node = self.cross_circles.start_node(self.position, self.transport_colors(rule_book))
+            if node is None:
                 #   ブロックの運搬経路が計算できなかったとき、計算を中断してそれまで計算済みの経路を送信するようにする
-                break
-            # 走行体の現在地からブロックがある交点サークルまで移動する経路を求める
-            path = self.a_star(self.position, src)
-            # ブロックがある交点サークルからブロックを取得する
-            self.cross_circles.move_block(src)
-            self.position = src
-            self.direction = commands.convert(self.direction, path)
+                return False
+            (src, index) = node
+            self.transport(rule_book, commands, src, index)
+        return True
 
-            if colors[index] != Color.BLACK:
-                placed_circle = self.block_circles.get(quota[index])
-                dst = self.cross_circles.goal_node(src, placed_circle)
-                rule_book.put_color_block(index)
-            else:
-                placed_circle = self.block_circles.get(self.block_circles.bonus_circle)
-                dst = self.cross_circles.goal_node(src, placed_circle)
-                rule_book.put_black_block()
-            
-            # ブロックがある交点サークルからブロックサークルまで移動する経路を求める
-            path = self.a_star(src, dst)
-            self.position = dst
-            self.direction = commands.convert(self.direction, path)
-            self.direction = commands.put(self.position, placed_circle, self.direction)
-        
-        # ガレージに行くまでの運搬経路を計算する
+
+    def transport_colors(self, rule_book):
+        """
+        ブロックビンゴ攻略のために運搬するブロックの色のリストを返す。
+        ボーナスサークル設置が2個成立していないときは、末尾に黒色を加える。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        """
+        colors = self.block_circles.colors(rule_book.get_quota())
+        if rule_book.bonus < 2:
+            colors.append(Color.BLACK)
+        return colors
+
+
+    def placed_circle(self, rule_book, index):
+        """
+        運搬するブロックを設置するブロックサークルの座標を返す。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        index : int
+            運搬するブロックの色のリスト(transport_colors)のインデックス
+        """
+        quota = rule_book.get_quota()
+        if index < len(quota):
+            return self.block_circles.get(quota[index])
+        return self.block_circles.get(self.block_circles.bonus_circle)
+
+
+    def transport(self, rule_book, commands, src, index, dst=None):
+        """
+        交点サークルに置かれたブロックをブロックサークルまで運搬する経路を計算し、コマンドに変換する。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        commands : Commands
+            コマンド変換クラス
+        src : tuple
+            運搬するブロックが置かれた交点サークルの座標
+        index : int
+            運搬するブロックの色のリスト(transport_colors)のインデックス
+        dst : tuple
+            ブロックを設置するときに走行体が移動する座標(Noneの場合は、ブロックサークル周辺の最も近い座標)
+        """
+        placed_circle = self.placed_circle(rule_book, index)
+        # 走行体の現在地からブロックがある交点サークルまで移動する経路を求める
+        path = self.a_star(self.position, src)
+        # ブロックがある交点サークルからブロックを取得する
+        self.cross_circles.move_block(src)
+        self.position = src
+        self.direction = commands.convert(self.direction, path)
+
+        if dst is None:
+            dst = self.cross_circles.goal_node(src, placed_circle)
+        if index < len(rule_book.get_quota()):
+            rule_book.put_color_block(index)
+        else:
+            rule_book.put_black_block()
+
+        # ブロックがある交点サークルからブロックサークルまで移動する経路を求める
+        path = self.a_star(src, dst)
+        self.position = dst
+        self.direction = commands.convert(self.direction, path)
+        self.direction = commands.put(self.position, placed_circle, self.direction)
+
+
+    def go_to_garage(self, commands):
+        """
+        ガレージに行くまでの運搬経路を計算し、コマンドに変換する。
+
+        Parameters
+        ----------
+        commands : Commands
+            コマンド変換クラス
+        """
         if self.block_circles.is_left:
             # Lコースの場合、(2,3)まで移動する
             path = self.a_star(self.position, (2,3))
@@ -277,12 +400,250 @@ class BlockBingoSolver():
             self.direction = commands.convert(self.direction, path)
             # ガレージ方向(座標(1,0.5)から座標(1,0)方向)に回頭する
             commands.spin((1,0.5), (1,0), self.direction, path)
-        return commands.get()
+
+
+    def optimize(self, bingo=Bingo.DOUBLE_BINGO, budget=1.0, quota=None):
+        """
+        ブロックを運搬する順番と設置する位置を分枝限定法で探索し、推定走行時間が最も短い運搬経路を計算する。
+        探索は貪欲法(solve)の運搬経路を初期解とし、計算時間の上限(budget)に達した時点で打ち切る。
+        ソルバの状態(走行体の位置、向き、交点サークル)は、solveと同じく運搬経路を計算したあとの状態になる。
+
+        Parameters
+        ----------
+        bingo : Bingo
+            ビンゴ状態
+        budget : float
+            計算時間の上限[sec]
+        quota : list
+            ブロックを設置するブロックサークル番号(Noneの場合は、ビンゴ状態の最初の候補)
+        """
+        deadline = time.monotonic() + budget
+        best = self.greedy_plan(bingo, quota)
+        self.improve_plan(bingo, best, lambda: time.monotonic() > deadline, quota=quota)
+        self.apply_plan(best)
+        return best['commands']
+
+
+    def greedy_plan(self, bingo=Bingo.DOUBLE_BINGO, quota=None):
+        """
+        貪欲法(solve)で運搬経路を計算し、最良解として返す。ソルバの状態は変えない。
+        最良解は辞書型で、commands: コマンドのリスト, duration: 推定走行時間[sec], solver: 計算後のソルバ,
+        achieved: ビンゴ状態を達成したか、を格納する。
+
+        Parameters
+        ----------
+        bingo : Bingo
+            ビンゴ状態
+        quota : list
+            ブロックを設置するブロックサークル番号(Noneの場合は、ビンゴ状態の最初の候補)
+        """
+        greedy = self.copy()
+        rule_book = RuleBook(greedy.block_circles, greedy.cross_circles, bingo, quota)
+        commands = Commands(greedy.block_circles, greedy.cross_circles, greedy.durations)
+        achieved = greedy.transport_greedily(rule_book, commands)
+        greedy.go_to_garage(commands)
+        return {'commands': commands.get(), 'duration': commands.estimate_duration(), 'solver': greedy, 'achieved': achieved}
+
+
+    def improve_plan(self, bingo, best, should_stop, lock=None, quota=None):
+        """
+        分枝限定法で最良解を改善する。ソルバの状態は変えない。
+
+        Parameters
+        ----------
+        bingo : Bingo
+            ビンゴ状態
+        best : dict
+            最良解(greedy_planの戻り値)。改善した解で上書きする
+        should_stop : function
+            探索を打ち切るときにTrueを返す関数
+        lock : threading.Lock
+            最良解を別スレッドから参照する場合に、最良解の更新時に取得するロック
+        quota : list
+            ブロックを設置するブロックサークル番号(Noneの場合は、ビンゴ状態の最初の候補)
+        """
+        if lock is None:
+            lock = threading.Lock()
+        solver = self.copy()
+        rule_book = RuleBook(solver.block_circles, solver.cross_circles, bingo, quota)
+        commands = Commands(solver.block_circles, solver.cross_circles, solver.durations)
+        solver.branch_and_bound(rule_book, commands, best, should_stop, lock)
+
+
+    def select_plan(self, time_budget, executor=None):
+        """
+        すべてのビンゴ状態とブロックを設置するブロックサークル番号の候補について運搬経路を計算し、
+        推定走行時間が残り時間(time_budget)以内に収まる運搬経路のうち、成立するビンゴの列数が最も多いものを返す。
+        列数が同じ場合は、推定走行時間が短い方を選ぶ。残り時間に収まる運搬経路がない場合は、推定走行時間が最も短いものを返す。
+        ソルバの状態は変えない。返り値は最良解(greedy_planの戻り値)に、bingo: ビンゴ状態, quota: ブロックサークル番号,
+        time: 推定走行時間を加えた辞書である。
+
+        Parameters
+        ----------
+        time_budget : float
+            ブロックビンゴに使える残り時間[sec]
+        executor : concurrent.futures.Executor
+            候補を並列に計算するためのExecutor(Noneの場合は順番に計算する)
+        """
+        rule_book = RuleBook(self.block_circles, self.cross_circles, Bingo.SINGLE_BINGO)
+        candidates = [(bingo, quota) for bingo in Bingo for quota in rule_book.candidate_quotas(bingo)]
+        if executor is None:
+            plans = list(map(lambda candidate: self.greedy_plan(*candidate), candidates))
+        else:
+            plans = list(executor.map(self.greedy_plan, *zip(*candidates)))
+
+        for ((bingo, quota), plan) in zip(candidates, plans):
+            plan.update({'bingo': bingo, 'quota': quota, 'time': plan['duration']})
+        return choose_plan(plans, time_budget)
+
+
+    def apply_plan(self, best):
+        """
+        最良解を計算したあとの状態(走行体の位置、向き、交点サークル)をソルバに反映する。
+
+        Parameters
+        ----------
+        best : dict
+            最良解
+        """
+        self.cross_circles = best['solver'].cross_circles
+        self.position = best['solver'].position
+        self.direction = best['solver'].direction
+
+
+    def branch_and_bound(self, rule_book, commands, best, should_stop, lock):
+        """
+        分枝限定法でブロックを運搬する順番と設置する位置を探索する。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        commands : Commands
+            コマンド変換クラス
+        best : dict
+            最良解(commands: コマンドのリスト, duration: 推定走行時間, solver: 計算後のソルバ, achieved: ビンゴ状態を達成したか)
+        should_stop : function
+            探索を打ち切るときにTrueを返す関数
+        lock : threading.Lock
+            最良解を更新するときに取得するロック
+        """
+        if should_stop():
+            return
+        # 下界: 計算済みのコマンドのうち後から変わらない部分の推定走行時間 + 残りの設置回数 x 設置にかかる最短の時間
+        # (末尾の回頭は後に続く回頭とまとめられて短くなることがあるので、estimate_durationは下界にならない)
+        remaining = len(rule_book.get_quota()) + max(0, 2 - rule_book.bonus)
+        if best['achieved'] and commands.settled_duration() + remaining * self.put_duration() >= best['duration']:
+            return
+
+        if rule_book.achivement():
+            solver = self.copy()
+            garage = solver.copy_commands(commands)
+            solver.go_to_garage(garage)
+            duration = garage.estimate_duration()
+            with lock:
+                if not best['achieved'] or duration < best['duration']:
+                    best.update({'commands': garage.get(), 'duration': duration, 'solver': solver, 'achieved': True})
+            return
+
+        for (src, index, dst) in self.transport_candidates(rule_book):
+            solver = self.copy()
+            branch_rule_book = copy.copy(rule_book)
+            branch_rule_book.quota = list(rule_book.quota)
+            branch_rule_book.cross_circles = solver.cross_circles
+            branch_commands = solver.copy_commands(commands)
+            try:
+                solver.transport(branch_rule_book, branch_commands, src, index, dst)
+            except (ArithmeticError, ValueError):
+                # コマンドに変換できない運搬経路は候補から外す
+                continue
+            solver.branch_and_bound(branch_rule_book, branch_commands, best, should_stop, lock)
+
+
+    def transport_candidates(self, rule_book):
+        """
+        運搬するブロックと設置する位置の候補を、走行体の現在地から近い順に返す。
+        要素は(ブロックが置かれた交点サークルの座標, 色のリストのインデックス, ブロックを設置するときの走行体の位置)である。
+
+        Parameters
+        ----------
+        rule_book : RuleBook
+            ゲームの終了判定クラス
+        """
+        candidates = []
+        for (index, color) in enumerate(self.transport_colors(rule_book)):
+            for src in self.cross_circles.open:
+                if not self.cross_circles.has_color(src, color):
+                    continue
+                # ブロックを取得したあとは、ブロックが置かれていた交点サークルも設置する位置の候補になる
+                cross_circles = self.cross_circles.copy()
+                cross_circles.move_block(src)
+                for dst in cross_circles.goal_nodes(src, self.placed_circle(rule_book, index)):
+                    cost = self.Manhattan_distance(self.position, src) + self.Manhattan_distance(src, dst)
+                    candidates.append((cost, src, index, dst))
+        return [(src, index, dst) for (_, src, index, dst) in sorted(candidates, key=lambda x: x[0])]
+
+
+    def put_duration(self):
+        """
+        ブロックを設置する命令のうち、最も短い所要時間を返す。
+        """
+        return min(self.durations[instruction]
+                   for instruction in (Instructions.PUT, Instructions.QUICK_PUT_R, Instructions.QUICK_PUT_L))
+
+
+    def copy_commands(self, commands):
+        """
+        変換済みのコマンドを引き継いだ、このソルバの交点サークルを参照するコマンド変換クラスを返す。
+
+        Parameters
+        ----------
+        commands : Commands
+            コマンド変換クラス
+        """
+        other = Commands(self.block_circles, self.cross_circles, self.durations)
+        other.commands = list(commands.commands)
+        # 置き換え規則を適用済みの先頭部分も引き継ぐ(リストは書き換えないので共有してよい)
+        other.rewritten = commands.rewritten
+        return other
+
+
+    def graph_nodes(self):
+        """
+        走行体が移動できるノード(座標)のリストを返す。
+        """
+        grid = [(x / 2, y / 2) for x in range(0, 6+1) for y in range(0, 6+1)]
+        adjacent = set(node for elem in grid for node in self.adjacent_nodes(elem))
+        return [node for node in grid if node in adjacent]
+
+
+    def graph_edges(self):
+        """
+        ノード間の辺のリストを返す。要素は(始点の座標, 終点の座標, 移動方向)である。
+        """
+        return [(src, dst, self.get_robot_direction(src, dst))
+                for src in self.graph_nodes() for dst in self.adjacent_nodes(src)]
 
 
     def a_star(self, src, dst):
+        """
+        始点ノード(src)から終点ノード(dst)まで移動する経路を、事前計算した最短経路表から求める。
+
+        Parameters
+        ----------
+        src : tuple
+            始点ノード
+        dst : tuple
+            終点ノード
+        """
+        return self.route_table.route(self.cross_circles.open.mask, lambda node: node in self.cross_circles.open,
+                                      src, self.direction, dst)
+
+
+    def search(self, src, dst):
         """
         A*アルゴリズムを用いて始点ノード(src)から終点ノード(dst)まで移動する経路を探索する。
+        走行体の向きによって移動コストが変わるので、(交点サークルの座標, 走行体の向き)を状態として探索する。
 
         Parameters
         ----------
@@ -291,55 +652,79 @@ class BlockBingoSolver():
         dst : tuple
             終点ノード
         """
-        # openリスト
-        open = {self.position: 0 + self.Manhattan_distance(self.position, dst)}   # openリスト(辞書型; key: 交点サークルの座標, value: 移動コスト+予測コスト)
-        # closeリスト
-        close = {}
-        # 運搬経路
+        start = (src, self.direction)
+        # openリスト(優先度付きキュー; 要素: (移動コスト+予測コスト, 追加順, 移動コスト, 状態))
+        open = [(self.heuristic(src, dst), 0, 0, start)]
+        # 始点から各状態までの移動コスト(g値)
+        g = {start: 0}
+        # 運搬経路(状態の親子関係を格納する)
         path = Path()
-        while 1:
-            # openリストが空であるとき、例外を送出する(探索失敗)
-            if len(open) == 0:
-                raise ArithmeticError('open set is empty!')
-
+        # 同じコストの状態は先に追加した方から取り出すためのカウンタ
+        counter = itertools.count(1)
+        while open:
             # openリストのうち、最もコストの小さい要素を取得する
-            elem = min(open.items(), key=lambda x: x[1])[0]
+            (_, _, cost, state) = heapq.heappop(open)
+            # あとからより小さいコストが見つかった要素は読み飛ばす(遅延削除)
+            if cost > g[state]:
+                continue
 
+            (elem, direction) = state
             # 取得した要素が終点ノードなら探索を終了する
             if elem == dst:
-                return path.search_path(src, dst)
-            
-            # 取得した要素をopenリストからcloseリストへ移す
-            close[elem] = open.pop(elem)
+                return [node for (node, _) in path.search_path(start, state)]
+
             # 取得した要素の隣接ノードすべてに対して以下の操作を実行する
             for node in self.adjacent_nodes(elem):
-                # 最小コストの候補値を計算する(始点から対象ノードまでの移動コスト + 対象ノードから隣接ノードまでの移動コスト + 隣接ノードからゴールまでの予測コスト)
-                cost = (close[elem] - self.Manhattan_distance(elem, dst)) + self.moving_cost(elem, node, path) + self.Manhattan_distance(node, dst)
-                # 隣接ノードがopenリストにもcloseリストにも含まれていない場合
-                if node not in open and node not in close:
-                    # 隣接ノードをopenリストへ追加する
-                    open[node] = cost
-                    path.set_path(elem, node)
-                # 隣接ノードがopenリストにある場合
-                if node in open:
-                    # cost < f(node)の場合、f(node) = costとする
-                    if cost < open[node]:
-                        open[node] = cost
-                        # 記録してある隣接ノードの親をelemに置き換える
-                        path.set_path(elem, node)
-                # 隣接ノードがcloseリストにある場合
-                if node in close:
-                    # f(node)を計算する
-                    # cost < f(node)の場合、f(node) = costとする
-                    if cost < close[node]:
-                        open[node] = cost
-                        # 記録してある隣接ノードの親をelemに置き換える
-                        path.set_path(elem, node)
+                # 隣接ノードに移動したあとの走行体の向きは、移動方向と同じになる
+                next_state = (node, self.get_robot_direction(elem, node))
+                # 始点から対象状態までの移動コスト + 対象状態から隣接ノードまでの移動コスト
+                cost = g[state] + self.transition_cost(elem, node, direction)
+                # 隣接状態が未探索か、より小さいコストで到達できる場合は経路を更新する
+                if next_state not in g or cost < g[next_state]:
+                    g[next_state] = cost
+                    # 記録してある隣接状態の親を置き換える
+                    path.set_path(state, next_state)
+                    heapq.heappush(open, (cost + self.heuristic(node, dst), next(counter), cost, next_state))
+
+        # openリストが空であるとき、例外を送出する(探索失敗)
+        raise ArithmeticError('open set is empty!')
+
+
+    def heuristic(self, src, dst):
+        """
+        A*アルゴリズムの予測コストを返す。
+        黒線の中点1つ分の移動には少なくとも移動コスト表の最小値がかかるので、マンハッタン距離(交点サークル単位)に最小値を掛ける。
+
+        Parameters
+        ----------
+        src : tuple
+            始点の座標
+        dst : tuple
+            終点の座標
+        """
+        return self.Manhattan_distance(src, dst) * self.min_turn_cost
 
 
     def moving_cost(self, src, dst, path):
         """
         2点間の移動コストを計算して返す。
+        走行体の向きは、運搬経路に記録されている始点の1つ前の座標から求める。
+
+        Parameters
+        ----------
+        src : tuple
+            始点の座標
+        dst : tuple
+            終点の座標
+        path : dict
+            運搬経路
+        """
+        return self.transition_cost(src, dst, self.current_direction(src, path))
+
+
+    def transition_cost(self, src, dst, direction):
+        """
+        走行体の向きを指定して、2点間の移動コストを返す。
         方角: 上向きを0とし、時計回りに45度=1、90度=2、135度=3・・・315度=7とする
             0
            7 1
@@ -352,46 +737,43 @@ class BlockBingoSolver():
             始点の座標
         dst : tuple
             終点の座標
-        path : dict
-            運搬経路
+        direction : int
+            始点での走行体の向き
         """
         # 始点にブロックが置かれているかどうかを調べる
         has_block = src in self.cross_circles.open
-        # 走行体の向きを求める
-        direction = self.current_direction(src, path)
-        # 走行体が水平に進むとき
-        if src[0] == dst[0]:
-            if direction == 0: # 90度右に旋回するとき
-                return self.spin90(has_block)
-
-            if direction == 2: # 直進するとき
-                return self.straight(has_block, src[1] > dst[1])
-            
-            if direction == 4: # 90度左に旋回するとき
-                return self.spin90(has_block)
-            
-            if direction == 6: # 180度旋回して直進するとき
-                return self.straight(has_block, src[1] < dst[1])
-
-        # 走行体が垂直に進むとき
-        if src[1] == dst[1]:
-            if direction == 0: # 180度旋回して直進するとき
-                return self.straight(has_block, src[0] < dst[0])
-        
-            if direction == 2: # 90度右に旋回するとき
-                return self.spin90(has_block)
-           
-            if direction == 4: # 直進するとき
-                return self.straight(has_block, src[0] > dst[0])
-
-            if direction == 6: # 90度左に旋回するとき
-                return  self.spin90(has_block)
-        raise ValueError('src or dst is invalid!')
+        try:
+            return self.turn_costs[has_block][direction][self.get_robot_direction(src, dst)]
+        except (KeyError, ValueError):
+            raise ValueError('src or dst is invalid!')
+
+
+    def create_turn_costs(self):
+        """
+        走行体の向きと移動方向の組み合わせごとの移動コスト表を作成する。
+        移動コストは命令ごとの所要時間(durations)から求める。
+            turn_costs[始点にブロックが置かれているか][走行体の向き][移動方向] = 移動コスト
+        """
+        turn_costs = {}
+        for has_block in (False, True):
+            turn_costs[has_block] = {}
+            for direction in (0, 2, 4, 6):
+                turn_costs[has_block][direction] = {}
+                for move in (0, 2, 4, 6):
+                    turn = (move - direction) % 8
+                    if turn == 0: # 直進するとき
+                        cost = self.straight(has_block, False)
+                    elif turn == 4: # 180度旋回して直進するとき
+                        cost = self.straight(has_block, True)
+                    else: # 90度旋回するとき
+                        cost = self.spin90(has_block)
+                    turn_costs[has_block][direction][move] = cost
+        return turn_costs
 
 
     def straight(self, has_block, should_turn):
         """
-        直線のコストを返す。
+        直線のコスト(黒線の中点1つ分の移動にかかる時間)を返す。
 
         Parameters
         ----------
@@ -404,8 +786,9 @@ class BlockBingoSolver():
             return self.spin180(has_block)
 
         if has_block:
-            return 4
-        return 1            
+            return self.mean_duration(Instructions.STRAIGHT_DETOUR_RIGHT, Instructions.STRAIGHT_DETOUR_LEFT)
+        # MOVE_NODEは黒線の中点2つ分の移動
+        return self.durations[Instructions.MOVE_NODE] / 2
 
 
     def spin90(self, has_block):
@@ -418,8 +801,8 @@ class BlockBingoSolver():
             始点にブロックが置いてあるかどうか
         """
         if has_block:
-            return 2
-        return 2
+            return self.mean_duration(Instructions.TURN_RIGHT90_EXIST_BLOCK, Instructions.TURN_LEFT90_EXIST_BLOCK)
+        return self.mean_duration(Instructions.TURN_RIGHT90_UNEXIST_BLOCK, Instructions.TURN_LEFT90_UNEXIST_BLOCK)
 
 
     def spin180(self, has_block):
@@ -432,5 +815,18 @@ class BlockBingoSolver():
             始点にブロックが置いてあるかどうか
         """
         if has_block:
-            return 5
-        return 2
\ No newline at end of file
+            # その場で180度回頭してから、ブロックを迂回して直進する
+            return self.durations[Instructions.SPIN180] + self.straight(has_block, False)
+        return self.durations[Instructions.TURN180]
+
+
+    def mean_duration(self, *instructions):
+        """
+        左右の向きだけが異なる命令の所要時間の平均を返す。
+
+        Parameters
+        ----------
+        instructions : str
+            命令
+        """
+        return sum(self.durations[instruction] for instruction in instructions) / len(instructions)
\ No newline at end of file
@@ -66,6 +66,36 @@ class BlockCirclesSolver():
         
         return [enter] + catch_path + placement_path
             
+    def candidate_routes(self):
+        """
+        進入するサークルと、内回り・外回りの経路の組み合わせのうち、カラーブロックが置かれたサークルを通らない運搬経路をすべて返す。
+        先頭はsolve()で計算した運搬経路である。
+        """
+        tracks = BlockCirclesTracks(self.coordinate)
+        color = self.coordinate.get(self.color)
+        black = self.coordinate.get(self.black)
+        bonus = self.coordinate.get(self.bonus)
+        # Lコースのときは4番か6番サークル、Rコースのときは5番か8番サークルに進入する
+        enters = [self.coordinate.get(4), self.coordinate.get(6)] if self.is_left else [self.coordinate.get(5), self.coordinate.get(8)]
+
+        routes = [self.solve()]
+        for enter in enters:
+            if enter == color:
+                continue
+            for catch_tracks in (tracks.inner_tracks, tracks.outer_tracks):
+                catch_path = self.subset_of_tracks(enter, black, catch_tracks)
+                if color in catch_path:
+                    continue
+                for placement_tracks in (tracks.inner_tracks, tracks.outer_tracks):
+                    placement_path = self.subset_of_tracks(black, bonus, placement_tracks)
+                    # ボーナスサークルにはカラーブロックが置かれていてもよい
+                    if color in placement_path[0:-1]:
+                        continue
+                    route = [enter] + catch_path + placement_path
+                    if route not in routes:
+                        routes.append(route)
+        return routes
+
     def subset_of_tracks(self, start, goal, tracks):
         """
         経路の部分集合を取得する。
@@ -0,0 +1,200 @@
+"""
+    @file   ParallelPlanner.py
+    @author T.Miyaji
+    @brief  運搬経路の候補をプロセスプールで並列に計算し、最良の運搬経路を選ぶ。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from BlockBingoCoordinate import Color
+from BlockBingoCoordinate import BlockCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesCoordinate
+from BlockCirclesPath import BlockCirclesSolver
+from BlackBlockCommands import BlackBlockCommands
+from BlockBingoSolver import BlockBingoSolver
+from BlockBingoSolver import choose_plan
+from RuleBook import Bingo
+from RuleBook import RuleBook
+from commands import estimate_duration
+
+
+def board_of(cross_circles):
+    """
+    交点サークルに置かれたブロックを、プロセス間で受け渡せる(座標, 色の値)のタプルに変換する。
+
+    Parameters
+    ----------
+    cross_circles : CrossCirclesCoordinate
+        交点サークルの座標
+    """
+    return tuple((coordinate, cross_circles.color(coordinate).value) for coordinate in cross_circles.open)
+
+
+def load_route_table(durations=None):
+    """
+    プロセスプールの各プロセスの起動時に、事前計算した経路表(route_table.npz)を読み込んでおく。
+    経路表はプロセスごとに1回だけ読み込み、以降のBlockBingoSolverで使い回す。
+
+    Parameters
+    ----------
+    durations : dict
+        命令ごとの所要時間[sec](Noneの場合は既定値)
+    """
+    BlockBingoSolver(BlockCirclesCoordinate(True, 5, 3, 6), CrossCirclesCoordinate(), [(1,0), (2,0), (2,1)], durations)
+
+
+def evaluate_plan(unit):
+    """
+    1つの候補(ビンゴ状態 x ブロックサークル番号 x ブロックサークル間の運搬経路)について、運搬経路のコマンドを計算する。
+    プロセスプールで実行するために、モジュールの関数として定義する。
+
+    Parameters
+    ----------
+    unit : tuple
+        (is_left, bonus, black, color, board, bingo, quota, route, durations)
+    """
+    (is_left, bonus, black, color, board, bingo, quota, route, durations) = unit
+    try:
+        black_block = BlackBlockCommands(bonus, black, color, is_left, route)
+        commands = list(black_block.gen_commands())
+        cross_circles = CrossCirclesCoordinate()
+        for (coordinate, value) in board:
+            cross_circles.set_block_color(coordinate, Color(value))
+        solver = BlockBingoSolver(BlockCirclesCoordinate(is_left, bonus, color, black), cross_circles,
+                                  black_block.reverse_route, durations)
+        plan = solver.greedy_plan(bingo, quota)
+    except (ArithmeticError, IndexError, ValueError):
+        # 運搬経路が計算できない候補は選ばない
+        return None
+    return {'commands': commands + plan['commands'], 'achieved': plan['achieved'],
+            'time': estimate_duration(commands, durations) + plan['duration'],
+            'bingo': bingo, 'quota': quota, 'route': route}
+
+
+def plan_units(is_left, bonus, black, color, cross_circles, bingos=tuple(Bingo), durations=None):
+    """
+    並列に計算する候補(evaluate_planの引数)のリストを返す。
+
+    Parameters
+    ----------
+    is_left : bool
+        Lコースかどうか
+    bonus : int
+        ボーナスサークル番号
+    black : int
+        ブロックサークル内の黒ブロックが置かれているサークル番号
+    color : int
+        ブロックサークル内のカラーブロックが置かれているサークル番号
+    cross_circles : CrossCirclesCoordinate
+        交点サークルの座標
+    bingos : tuple
+        計算するビンゴ状態
+    durations : dict
+        命令ごとの所要時間[sec](Noneの場合は既定値)
+    """
+    board = board_of(cross_circles)
+    rule_book = RuleBook(BlockCirclesCoordinate(is_left, bonus, color, black), cross_circles, Bingo.SINGLE_BINGO)
+    routes = BlockCirclesSolver(bonus, black, color, is_left).candidate_routes()
+    return [(is_left, bonus, black, color, board, bingo, quota, route, durations)
+            for bingo in bingos for quota in rule_book.candidate_quotas(bingo) for route in routes]
+
+
+def best_plan(plans, time_budget):
+    """
+    evaluate_planで計算した運搬経路から、最良の運搬経路を選ぶ。計算できた運搬経路がない場合は例外を送出する。
+
+    Parameters
+    ----------
+    plans : iterable
+        evaluate_planの戻り値
+    time_budget : float
+        ブロックビンゴに使える残り時間[sec]
+    """
+    plans = [plan for plan in plans if plan is not None]
+    if len(plans) == 0:
+        raise ArithmeticError('could not find any plan!')
+    return choose_plan(plans, time_budget)
+
+
+class ParallelPlanner():
+    """
+    ビンゴ状態、ブロックを設置するブロックサークル番号、ブロックサークル間の運搬経路(進入サークルと内回り・外回り)の
+    組み合わせをプロセスプールで並列に計算し、最良の運搬経路を選ぶクラス。
+    """
+    def __init__(self, executor=None, max_workers=None, durations=None):
+        """
+        Parameters
+        ----------
+        executor : concurrent.futures.Executor
+            候補を並列に計算するためのExecutor(Noneの場合は、ProcessPoolExecutorを生成する)
+        max_workers : int
+            生成するProcessPoolExecutorのプロセス数
+        durations : dict
+            生成するProcessPoolExecutorの各プロセスが、起動時に経路表を読み込むときに使う命令ごとの所要時間[sec]
+        """
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers, initializer=load_route_table, initargs=(durations,))
+        self.executor = executor
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+
+
+    def units(self, is_left, bonus, black, color, cross_circles, bingos=tuple(Bingo), durations=None):
+        """
+        並列に計算する候補のリストを返す(plan_unitsを参照)。
+
+        Parameters
+        ----------
+        is_left : bool
+            Lコースかどうか
+        bonus : int
+            ボーナスサークル番号
+        black : int
+            ブロックサークル内の黒ブロックが置かれているサークル番号
+        color : int
+            ブロックサークル内のカラーブロックが置かれているサークル番号
+        cross_circles : CrossCirclesCoordinate
+            交点サークルの座標
+        bingos : tuple
+            計算するビンゴ状態
+        durations : dict
+            命令ごとの所要時間[sec](Noneの場合は既定値)
+        """
+        return plan_units(is_left, bonus, black, color, cross_circles, bingos, durations)
+
+
+    def plan(self, block_circles, cross_circles, time_budget, durations=None, bingos=tuple(Bingo)):
+        """
+        すべての候補の運搬経路を並列に計算し、推定走行時間が残り時間に収まる運搬経路のうち、
+        成立するビンゴの列数が最も多く、推定走行時間が最も短いものを返す。
+        返り値は、commands: コマンドのリスト, achieved: ビンゴ状態を達成したか, bingo: ビンゴ状態,
+        quota: ブロックサークル番号, route: ブロックサークル間の運搬経路, time: 推定走行時間、を格納した辞書である。
+
+        Parameters
+        ----------
+        block_circles : BlockCirclesCoordinate
+            ブロックサークルの座標
+        cross_circles : CrossCirclesCoordinate
+            交点サークルの座標
+        time_budget : float
+            ブロックビンゴに使える残り時間[sec]
+        durations : dict
+            命令ごとの所要時間[sec](Noneの場合は既定値)
+        bingos : tuple
+            計算するビンゴ状態
+        """
+        units = self.units(block_circles.is_left, block_circles.bonus_circle, block_circles.black_circle,
+                           block_circles.color_circle, cross_circles, bingos, durations)
+        return best_plan(self.executor.map(evaluate_plan, units), time_budget)
+
+
+    def warm_up(self):
+        """
+        プロセスプールのプロセスを立ち上げておく(最初の計算でプロセスの起動と経路表の読み込みを待たないため)。
+        """
+        list(self.executor.map(abs, range(self.max_workers)))
+
+
+    def shutdown(self):
+        """
+        プロセスプールを終了する。
+        """
+        self.executor.shutdown()
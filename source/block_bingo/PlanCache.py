@@ -0,0 +1,119 @@
+"""
+    @file   PlanCache.py
+    @author T.Miyaji
+    @brief  計算済みの運搬経路のコマンドをファイル(SQLite)に保存し、同じ配置では計算を省略する。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+# 運搬経路のキャッシュのファイル名
+PLAN_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plan_cache.sqlite3')
+
+
+def plan_key(block_circles, cross_circles, settings=None):
+    """
+    ブロックの配置から、運搬経路のキャッシュのキーを計算する。
+    キーは(コース, ボーナスサークル番号, 黒ブロックとカラーブロックのサークル番号, 初期位置の交点サークルのブロックの色)を
+    決まった順に並べたもののハッシュ値である。ブロックの置かれない交点サークルの認識結果(白やNone)はキーに含めない。
+
+    Parameters
+    ----------
+    block_circles : BlockCirclesCoordinate
+        ブロックサークルの座標
+    cross_circles : CrossCirclesCoordinate
+        交点サークルの座標
+    settings : dict
+        運搬経路の計算結果を変える設定(命令ごとの所要時間や残り時間など)。設定が異なる場合は別のキーになる
+    """
+    layout = {'is_left': bool(block_circles.is_left),
+              'bonus': int(block_circles.bonus_circle),
+              'black': int(block_circles.black_circle),
+              'color': int(block_circles.color_circle),
+              'cross_circles': list(cross_circles.initial_block_values()),
+              'settings': settings}
+    text = json.dumps(layout, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class PlanCache():
+    """
+    ブロックの配置(plan_keyのキー)ごとに、走行体に送信するコマンドの文字列を保存するクラス。
+    preloadで保存済みのコマンドをすべてメモリに読み込んでおけば、本番ではファイルを読まずにコマンドを取得できる。
+    """
+    def __init__(self, file_name=PLAN_CACHE_FILE):
+        """
+        Parameters
+        ----------
+        file_name : str
+            キャッシュのファイル名(SQLite)
+        """
+        self.file_name = file_name
+        # 運搬経路の計算とコマンドの送信は別スレッドになることがあるので、接続をスレッド間で共有する
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, commands TEXT NOT NULL)')
+        self.connection.commit()
+        # preloadで読み込んだコマンド(key: キー, value: コマンドの文字列)
+        self.plans = {}
+        self.lock = threading.Lock()
+
+
+    def preload(self):
+        """
+        保存済みのコマンドをすべてメモリに読み込み、読み込んだ数を返す。
+        """
+        with self.lock:
+            self.plans = dict(self.connection.execute('SELECT key, commands FROM plans'))
+            return len(self.plans)
+
+
+    def get(self, key):
+        """
+        キーに対応するコマンドのリストを返す。保存されていない場合はNoneを返す。
+
+        Parameters
+        ----------
+        key : str
+            plan_keyで計算したキー
+        """
+        with self.lock:
+            commands = self.plans.get(key)
+            if commands is None:
+                row = self.connection.execute('SELECT commands FROM plans WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                commands = self.plans[key] = row[0]
+        return list(commands)
+
+
+    def put(self, key, commands):
+        """
+        キーに対応するコマンドを保存する。同じキーのコマンドがある場合は上書きする。
+
+        Parameters
+        ----------
+        key : str
+            plan_keyで計算したキー
+        commands : list
+            コマンドのリスト
+        """
+        commands = ''.join(commands)
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO plans (key, commands) VALUES (?, ?)', (key, commands))
+            self.connection.commit()
+            self.plans[key] = commands
+
+
+    def close(self):
+        """
+        キャッシュのファイルを閉じる。
+        """
+        with self.lock:
+            self.connection.close()
+
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
@@ -0,0 +1,266 @@
+"""
+    @file   PlanTable.py
+    @author T.Miyaji
+    @brief  すべてのブロックの配置について運搬経路を事前計算した表を作成し、メモリマップで読み込む。
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from BlockBingoCoordinate import Color
+from BlockBingoCoordinate import CROSS_CIRCLES_ORDER
+from BlockBingoCoordinate import BlockCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesCoordinate
+from BlackBlockCommands import BlackBlockCommands
+from BlockBingoSolver import BlockBingoSolver
+from ParallelPlanner import plan_units
+from ParallelPlanner import evaluate_plan
+from ParallelPlanner import best_plan
+from ParallelPlanner import load_route_table
+from commands import load_durations
+
+# 事前計算した運搬経路の表を保存するディレクトリ
+PLAN_TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plan_table')
+# ブロックの初期位置となる交点サークル(CROSS_CIRCLES_ORDERの先頭8個)
+INITIAL_POSITIONS = CROSS_CIRCLES_ORDER[:8]
+# 交点サークルに置かれるカラーブロックの色(1色はブロックサークル内に置かれるので、交点サークルには7個置かれる)
+BLOCK_COLORS = (Color.RED, Color.BLUE, Color.YELLOW, Color.GREEN)
+# 1度に並列計算する配置の数
+BATCH_SIZE = 20000
+
+
+def layout_key(block_circles, cross_circles):
+    """
+    ブロックの配置を64bitの整数に変換する。
+    上位から(コース: 1bit, ボーナスサークル番号: 4bit, 黒ブロックのサークル番号: 4bit, カラーブロックのサークル番号: 4bit,
+    INITIAL_POSITIONSの順の交点サークルの色: 3bit x 8)を並べたものである。
+    ブロックの置かれない交点サークルの認識結果(白やNone)はキーに含めない(initial_block_valuesを参照)。
+
+    Parameters
+    ----------
+    block_circles : BlockCirclesCoordinate
+        ブロックサークルの座標
+    cross_circles : CrossCirclesCoordinate
+        交点サークルの座標
+    """
+    key = int(bool(block_circles.is_left))
+    for number in (block_circles.bonus_circle, block_circles.black_circle, block_circles.color_circle):
+        key = (key << 4) | int(number)
+    for value in cross_circles.initial_block_values():
+        key = (key << 3) | value
+    return key
+
+
+def block_arrangements():
+    """
+    交点サークルの初期位置に置かれるブロックの色の並びを、すべて返す。
+    並びはColorの値の辞書順(layout_keyの昇順)に並べる。
+    """
+    arrangements = set()
+    for single in BLOCK_COLORS:
+        # 黒ブロック1個と、ブロックサークル内に置かれた色以外は2個ずつのカラーブロック
+        blocks = [Color.BLACK.value] + [color.value for color in BLOCK_COLORS for _ in range(2 if color != single else 1)]
+        arrangements.update(itertools.permutations(blocks))
+    return sorted(arrangements)
+
+
+def enumerate_layouts(courses=(True, False), bonuses=range(1, 8+1)):
+    """
+    ブロックの配置(is_left, bonus, black, color, 初期位置のブロックの色の値)を、layout_keyの昇順にすべて返す。
+
+    Parameters
+    ----------
+    courses : tuple
+        計算するコース(True: Lコース)
+    bonuses : iterable
+        計算するボーナスサークル番号
+    """
+    arrangements = block_arrangements()
+    for is_left in sorted(courses):
+        for bonus in sorted(bonuses):
+            for black in range(1, 8+1):
+                for color in range(1, 8+1):
+                    if color == black:
+                        continue
+                    for blocks in arrangements:
+                        yield (is_left, bonus, black, color, blocks)
+
+
+def create_circles(layout):
+    """
+    ブロックの配置から、ブロックサークルと交点サークルの座標クラスを生成する。
+
+    Parameters
+    ----------
+    layout : tuple
+        (is_left, bonus, black, color, 初期位置のブロックの色の値)
+    """
+    (is_left, bonus, black, color, blocks) = layout
+    cross_circles = CrossCirclesCoordinate()
+    for (coordinate, value) in zip(INITIAL_POSITIONS, blocks):
+        cross_circles.set_block_color(coordinate, Color(value))
+    return (BlockCirclesCoordinate(is_left, bonus, color, black), cross_circles)
+
+
+def plan_layout(task):
+    """
+    1つの配置について、CameraSystemと同じ手順で運搬経路を計算する。プロセスプールで実行するために、モジュールの関数として定義する。
+    返り値は(layout_key, コマンドの文字列, 失敗の理由)である。運搬経路が計算できなかった場合、コマンドの文字列はNoneになる。
+    ビンゴ状態を達成できなかった運搬経路は、コマンドの文字列と失敗の理由の両方を返す。
+
+    Parameters
+    ----------
+    task : tuple
+        (配置, ブロックビンゴに使える残り時間, 命令ごとの所要時間, 運搬経路の改善に使う時間)
+    """
+    (layout, time_budget, durations, budget) = task
+    (block_circles, cross_circles) = create_circles(layout)
+    key = layout_key(block_circles, cross_circles)
+    (is_left, bonus, black, color, _) = layout
+    try:
+        plan = best_plan(map(evaluate_plan, plan_units(is_left, bonus, black, color, cross_circles, durations=durations)),
+                         time_budget)
+        commands = plan['commands']
+        if budget > 0:
+            # CameraSystemと同じく、選んだ候補の運搬経路を分枝限定法で改善する
+            black_block = BlackBlockCommands(bonus, black, color, is_left, plan['route'])
+            solver = BlockBingoSolver(block_circles, cross_circles, black_block.reverse_route, durations)
+            commands = list(black_block.gen_commands()) + solver.optimize(plan['bingo'], budget, plan['quota'])
+    except (ArithmeticError, IndexError, ValueError) as e:
+        return (key, None, type(e).__name__)
+    reason = None if plan['achieved'] else 'not achieved'
+    return (key, ''.join(commands), reason)
+
+
+def build_table(layouts, directory=PLAN_TABLE_DIR, settings=None, budget=0.0, max_workers=None, chunksize=64):
+    """
+    すべての配置の運搬経路をプロセスプールで並列に計算し、表をディレクトリに保存する。
+    表は、keys.npy(layout_keyの昇順), offsets.npy(コマンドの開始位置), commands.npy(コマンドの文字を連結したもの)である。
+    運搬経路を計算できなかった配置は failures.npy に、理由ごとの件数は meta.json に保存する。
+
+    Parameters
+    ----------
+    layouts : iterable
+        enumerate_layoutsの戻り値(layout_keyの昇順)
+    directory : str
+        保存先のディレクトリ
+    settings : dict
+        運搬経路の計算に使う設定(durations: 命令ごとの所要時間, time_budget: ブロックビンゴに使える残り時間)
+    budget : float
+        1つの配置あたり、運搬経路の改善に使う時間[sec](0の場合は改善しない)
+    max_workers : int
+        プロセス数
+    chunksize : int
+        1度にプロセスへ渡す配置の数
+    """
+    settings = dict(settings or {'durations': None, 'time_budget': 90.0})
+    keys = []
+    offsets = [0]
+    commands = bytearray()
+    failures = []
+    reasons = collections.Counter()
+    processed = 0
+    layouts = iter(layouts)
+    with ProcessPoolExecutor(max_workers, initializer=load_route_table, initargs=(settings['durations'],)) as executor:
+        while True:
+            batch = [(layout, settings['time_budget'], settings['durations'], budget)
+                     for layout in itertools.islice(layouts, BATCH_SIZE)]
+            if len(batch) == 0:
+                break
+            for (key, command, reason) in executor.map(plan_layout, batch, chunksize=chunksize):
+                if reason is not None:
+                    failures.append(key)
+                    reasons[reason] += 1
+                if command is None:
+                    continue
+                keys.append(key)
+                commands += command.encode('ascii')
+                offsets.append(len(commands))
+            processed += len(batch)
+            print('{} layouts, {} failures'.format(processed, len(failures)))
+
+    keys = np.array(keys, dtype=np.uint64)
+    if np.any(keys[1:] <= keys[:-1]):
+        raise ValueError('layouts are not sorted by layout_key!')
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'keys.npy'), keys)
+    np.save(os.path.join(directory, 'offsets.npy'), np.array(offsets, dtype=np.uint64))
+    np.save(os.path.join(directory, 'commands.npy'), np.frombuffer(bytes(commands), dtype=np.uint8))
+    np.save(os.path.join(directory, 'failures.npy'), np.array(failures, dtype=np.uint64))
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'settings': settings, 'budget': budget, 'plans': len(keys), 'failures': dict(reasons)}, f, indent=2)
+    return reasons
+
+
+class PlanTable():
+    """
+    build_tableで保存した運搬経路の表を、メモリマップで読み込むクラス。
+    起動時にファイル全体を読み込まないので、配置ごとの運搬経路は二分探索で必要な部分だけ読み出す。
+    """
+    def __init__(self, directory=PLAN_TABLE_DIR):
+        """
+        Parameters
+        ----------
+        directory : str
+            build_tableで保存したディレクトリ
+        """
+        self.keys = np.load(os.path.join(directory, 'keys.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'), mmap_mode='r')
+        self.commands = np.load(os.path.join(directory, 'commands.npy'), mmap_mode='r')
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        # 表を計算したときの設定(CameraSystemの設定と異なる場合は使わない)
+        self.settings = self.meta['settings']
+
+
+    def get(self, block_circles, cross_circles):
+        """
+        配置に対応するコマンドのリストを返す。表にない場合はNoneを返す。
+
+        Parameters
+        ----------
+        block_circles : BlockCirclesCoordinate
+            ブロックサークルの座標
+        cross_circles : CrossCirclesCoordinate
+            交点サークルの座標
+        """
+        key = np.uint64(layout_key(block_circles, cross_circles))
+        index = int(np.searchsorted(self.keys, key))
+        if index >= len(self.keys) or self.keys[index] != key:
+            return None
+        (start, end) = (int(self.offsets[index]), int(self.offsets[index + 1]))
+        return list(self.commands[start:end].tobytes().decode('ascii'))
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def main():
+    # すべての配置の運搬経路を事前計算して保存する
+    parser = argparse.ArgumentParser(description='すべてのブロックの配置の運搬経路を事前計算する')
+    parser.add_argument('--course', choices=['L', 'R'], nargs='*', default=['L', 'R'], help='計算するコース')
+    parser.add_argument('--bonus', type=int, nargs='*', default=list(range(1, 8+1)), help='計算するボーナスサークル番号')
+    parser.add_argument('--durations', default=None, help='命令ごとの所要時間のファイル(JSON)')
+    parser.add_argument('--time-budget', type=float, default=90.0, help='ブロックビンゴに使える残り時間[sec]')
+    parser.add_argument('--budget', type=float, default=0.0, help='1つの配置あたり、運搬経路の改善に使う時間[sec]')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数(既定値はCPUのコア数)')
+    parser.add_argument('--out', default=PLAN_TABLE_DIR, help='保存先のディレクトリ')
+    args = parser.parse_args()
+
+    durations = load_durations(args.durations) if args.durations is not None else None
+    layouts = enumerate_layouts(tuple(course == 'L' for course in args.course), args.bonus)
+    start = time.time()
+    reasons = build_table(layouts, args.out, {'durations': durations, 'time_budget': args.time_budget},
+                          args.budget, args.workers)
+    print('saved {} ({:.1f} sec)'.format(args.out, time.time() - start))
+    for (reason, count) in sorted(reasons.items()):
+        print('  {}: {}'.format(reason, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+    @file   RouteTable.py
+    @author T.Miyaji
+    @brief  交点サークル間の最短経路を事前計算した表を提供する。
+"""
+import os
+import threading
+import numpy as np
+from BlockBingoCoordinate import CrossCirclesSet
+
+# 経路が存在しないことを表すコスト
+INF = np.inf
+# 事前計算した経路表のファイル名
+ROUTE_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_table.npz')
+# 走行体の向き(北, 東, 南, 西)
+DIRECTIONS = (0, 2, 4, 6)
+
+# 計算済みの経路表(key: (ノードと辺の組, 移動コスト表))
+_route_tables = {}
+_route_tables_lock = threading.Lock()
+
+
+class RouteTable():
+    """
+    (交点サークルの座標, 走行体の向き)を状態とした全点対間の最短経路を保持するクラス。
+    移動コストは始点にブロックが置かれているかどうかで変わるので、
+    ブロックが置かれた交点サークルの集合(ビットボード)ごとに、初めて使うときにワーシャル–フロイド法で計算する。
+    """
+    def __init__(self, nodes, edges, turn_costs):
+        """
+        Parameters
+        ----------
+        nodes : list
+            ノード(座標)のリスト
+        edges : list
+            辺のリスト。要素は(始点の座標, 終点の座標, 移動方向)
+        turn_costs : dict
+            移動コスト表(turn_costs[始点にブロックが置かれているか][走行体の向き][移動方向] = 移動コスト)
+        """
+        self.nodes = list(nodes)
+        self.index = {node: i for (i, node) in enumerate(self.nodes)}
+        self.edges = [(self.index[src], self.index[dst], move) for (src, dst, move) in edges]
+        # 移動コスト表を配列に変換する(turn_costs[始点にブロックが置かれているか, 走行体の向き, 移動方向])
+        self.turn_costs = np.array([[[turn_costs[has_block][direction][move] for move in DIRECTIONS]
+                                     for direction in DIRECTIONS] for has_block in (False, True)], dtype=np.float32)
+        # 計算済みの表(key: ビットボード, value: (コスト行列, 次の状態の行列))
+        self.tables = {}
+        self.lock = threading.Lock()
+
+
+    def state(self, node, direction):
+        """
+        (座標, 走行体の向き)を状態の番号に変換する。
+
+        Parameters
+        ----------
+        node : tuple
+            座標
+        direction : int
+            走行体の向き
+        """
+        return self.index[node] * len(DIRECTIONS) + direction // 2
+
+
+    def get(self, mask, has_block):
+        """
+        指定したビットボードの経路表を返す。計算していない場合は計算する。
+
+        Parameters
+        ----------
+        mask : int
+            ブロックが置かれた交点サークルのビットボード
+        has_block : function
+            座標を受け取り、その座標にブロックが置かれているかを返す関数
+        """
+        with self.lock:
+            if mask not in self.tables:
+                self.tables[mask] = self.floyd_warshall([has_block(node) for node in self.nodes])
+            return self.tables[mask]
+
+
+    def floyd_warshall(self, blocks):
+        """
+        ワーシャル–フロイド法で全点対間の最小コストと経路を計算する。
+
+        Parameters
+        ----------
+        blocks : list
+            ノードごとのブロックが置かれているかどうか
+        """
+        size = len(self.nodes) * len(DIRECTIONS)
+        costs = np.full((size, size), INF, dtype=np.float32)
+        np.fill_diagonal(costs, 0)
+        # next_states[i, j] = 状態iから状態jに向かうときの次の状態
+        next_states = np.full((size, size), -1, dtype=np.int16)
+        next_states[np.arange(size), np.arange(size)] = np.arange(size)
+
+        for (src, dst, move) in self.edges:
+            for direction in DIRECTIONS:
+                i = src * len(DIRECTIONS) + direction // 2
+                j = dst * len(DIRECTIONS) + move // 2
+                costs[i, j] = self.turn_costs[int(blocks[src]), direction // 2, move // 2]
+                next_states[i, j] = j
+
+        for k in range(size):
+            candidate = costs[:, k, np.newaxis] + costs[np.newaxis, k, :]
+            shorter = candidate < costs
+            costs = np.where(shorter, candidate, costs)
+            next_states = np.where(shorter, next_states[:, k, np.newaxis], next_states)
+        return costs, next_states
+
+
+    def route(self, mask, has_block, src, direction, dst):
+        """
+        始点から終点までの最小コストの経路を返す。終点での走行体の向きは問わない。
+
+        Parameters
+        ----------
+        mask : int
+            ブロックが置かれた交点サークルのビットボード
+        has_block : function
+            座標を受け取り、その座標にブロックが置かれているかを返す関数
+        src : tuple
+            始点の座標
+        direction : int
+            始点での走行体の向き
+        dst : tuple
+            終点の座標
+        """
+        if src not in self.index or dst not in self.index:
+            raise ArithmeticError('could not find the path from start node!')
+        (costs, next_states) = self.get(mask, has_block)
+        start = self.state(src, direction)
+        goals = [self.state(dst, d) for d in DIRECTIONS]
+        goal = min(goals, key=lambda x: costs[start, x])
+        if costs[start, goal] >= INF:
+            raise ArithmeticError('could not find the path from start node!')
+
+        path = [src]
+        state = start
+        while state != goal:
+            state = int(next_states[state, goal])
+            path.append(self.nodes[state // len(DIRECTIONS)])
+        # 終点は呼び出し元が指定した座標をそのまま返す
+        path[-1] = dst
+        return path
+
+
+    def cost(self, mask, has_block, src, direction, dst):
+        """
+        始点から終点までの最小コストを返す。
+
+        Parameters
+        ----------
+        mask : int
+            ブロックが置かれた交点サークルのビットボード
+        has_block : function
+            座標を受け取り、その座標にブロックが置かれているかを返す関数
+        src : tuple
+            始点の座標
+        direction : int
+            始点での走行体の向き
+        dst : tuple
+            終点の座標
+        """
+        (costs, _) = self.get(mask, has_block)
+        start = self.state(src, direction)
+        return float(min(costs[start, self.state(dst, d)] for d in DIRECTIONS))
+
+
+    def save(self, file_name):
+        """
+        計算済みの経路表をファイルに保存する。
+
+        Parameters
+        ----------
+        file_name : str
+            保存先のファイル名(.npz)
+        """
+        with self.lock:
+            masks = sorted(self.tables)
+            np.savez_compressed(file_name,
+                                nodes=np.array(self.nodes, dtype=np.float32),
+                                turn_costs=self.turn_costs,
+                                masks=np.array(masks, dtype=np.int64),
+                                costs=np.array([self.tables[mask][0] for mask in masks], dtype=np.float32).reshape(-1, *self.shape()),
+                                next_states=np.array([self.tables[mask][1] for mask in masks], dtype=np.int16).reshape(-1, *self.shape()))
+
+
+    def load(self, file_name):
+        """
+        保存した経路表を読み込む。ノードや移動コスト表が一致しない場合は例外を送出する。
+
+        Parameters
+        ----------
+        file_name : str
+            経路表のファイル名(.npz)
+        """
+        with np.load(file_name) as npz:
+            if not np.array_equal(npz['nodes'], np.array(self.nodes, dtype=np.float32)):
+                raise ValueError('nodes of the route table are different!')
+            if not np.array_equal(npz['turn_costs'], self.turn_costs):
+                raise ValueError('turn costs of the route table are different!')
+            if npz['costs'].dtype != np.float32:
+                raise ValueError('costs of the route table are not float32!')
+            tables = {int(mask): (costs, next_states)
+                      for (mask, costs, next_states) in zip(npz['masks'], npz['costs'], npz['next_states'])}
+        with self.lock:
+            self.tables.update(tables)
+
+
+    def precompute(self, cross_circles, file_name=ROUTE_TABLE_FILE):
+        """
+        指定した交点サークルに置かれたブロックを取り除いてできる、すべての配置の経路表を計算して保存する。
+
+        Parameters
+        ----------
+        cross_circles : list
+            初期位置としてブロックが置かれている交点サークルの座標のリスト
+        file_name : str
+            保存先のファイル名(.npz)
+        """
+        for subset in range(1 << len(cross_circles)):
+            blocks = CrossCirclesSet([cross_circles[i] for i in range(len(cross_circles)) if subset & (1 << i)])
+            self.get(blocks.mask, lambda node: node in blocks)
+        self.save(file_name)
+
+
+    def shape(self):
+        """
+        経路表の行列の大きさを返す。
+        """
+        size = len(self.nodes) * len(DIRECTIONS)
+        return (size, size)
+
+
+def get_route_table(nodes, edges, turn_costs):
+    """
+    経路表を返す。同じノード、辺、移動コスト表の経路表はプロセス内で使い回す。
+
+    Parameters
+    ----------
+    nodes : list
+        ノード(座標)のリスト
+    edges : list
+        辺のリスト。要素は(始点の座標, 終点の座標, 移動方向)
+    turn_costs : dict
+        移動コスト表
+    """
+    key = (tuple(nodes), tuple(edges),
+           tuple((has_block, direction, move, cost)
+                 for (has_block, directions) in sorted(turn_costs.items())
+                 for (direction, moves) in sorted(directions.items())
+                 for (move, cost) in sorted(moves.items())))
+    with _route_tables_lock:
+        if key not in _route_tables:
+            route_table = RouteTable(nodes, edges, turn_costs)
+            # 事前計算した経路表があれば読み込む(ノードや移動コスト表が異なる場合は使わない)
+            if os.path.exists(ROUTE_TABLE_FILE):
+                try:
+                    route_table.load(ROUTE_TABLE_FILE)
+                except ValueError:
+                    pass
+            _route_tables[key] = route_table
+        return _route_tables[key]
+
+
+def main():
+    # ブロックの配置ごとの経路表を事前計算してファイルに保存する
+    from BlockBingoSolver import BlockBingoSolver
+    from BlockBingoCoordinate import BlockCirclesCoordinate
+    from BlockBingoCoordinate import CrossCirclesCoordinate
+    cross_circles = CrossCirclesCoordinate()
+    solver = BlockBingoSolver(BlockCirclesCoordinate(True, 5, 3, 6), cross_circles, [(1,0), (2,0), (2,1)])
+    solver.route_table.precompute(list(cross_circles.open))
+    print('saved {}'.format(ROUTE_TABLE_FILE))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,27 @@ class Bingo(Enum):
     FULL_BINGO = auto()
 
 
+# ビンゴ状態ごとの、ブロックを設置するブロックサークル番号の候補
+BINGO_CANDIDATES = {
+    Bingo.SINGLE_BINGO: [[1, 2, 3], [3, 5, 8], [6, 7, 8], [1, 4, 6]],
+    Bingo.DOUBLE_BINGO: [[1, 2, 3, 5, 8], [1, 2, 3, 4, 6],
+                         [3, 5, 8, 7, 6], [1, 4, 6, 7, 8]],
+    Bingo.TRIPLE_BINGO: [[1, 2, 3, 5, 8, 7, 6], [1, 2, 3, 4, 6, 7, 8],
+                         [3, 5, 8, 7, 6, 4, 1], [6, 4, 1, 2, 3, 5, 8]],
+    Bingo.FULL_BINGO: [[number for number in range(1, 8+1)]]
+}
+
+# ビンゴ状態ごとの成立するビンゴの列数(運搬経路の得点)
+BINGO_LINES = {
+    Bingo.SINGLE_BINGO: 1,
+    Bingo.DOUBLE_BINGO: 2,
+    Bingo.TRIPLE_BINGO: 3,
+    Bingo.FULL_BINGO: 8
+}
+
+
 class RuleBook():
-    def __init__(self, block_circles, cross_circles, bingo):
+    def __init__(self, block_circles, cross_circles, bingo, quota=None):
         """
         ブロックサークルおよび交点サークルの座標を登録し、ブロックビンゴの終了基準を決定する。
 
@@ -27,6 +46,8 @@ class RuleBook():
             交点サークルの座標
         bingo : Bingo
             ビンゴ状態
+        quota : list
+            ブロックを設置するブロックサークル番号(Noneの場合は、ビンゴ状態の最初の候補)
         """
         self.block_circles = block_circles
         self.cross_circles = cross_circles
@@ -34,7 +55,10 @@ class RuleBook():
         # ボーナスサークル設置成功数
         self.bonus = 1
         # ビンゴ達成のためのノルマ
-        self.quota = self.select_bingo_quota(bingo)
+        if quota is None:
+            self.quota = self.select_bingo_quota(bingo)
+        else:
+            self.quota = list(quota)
     
 
     def select_bingo_quota(self, bingo):
@@ -58,65 +82,65 @@ class RuleBook():
         raise ValueError('selected quota is not in Bingo enumeration!')
 
 
-    def single_bingo(self):
+    def candidate_quotas(self, bingo):
         """
-        シングルビンゴを達成するためにブロックを設置するブロックサークルの番号を返す。
+        ビンゴ状態を達成するためにブロックを設置するブロックサークル番号の候補をすべて返す。
+        カラーブロックが置かれたブロックサークルを含む候補だけを、そのブロックサークル番号を除いて返す。
+
+        Parameters
+        ----------
+        bingo : Bingo
+            ビンゴの種類
         """
+        if bingo not in BINGO_CANDIDATES:
+            raise ValueError('selected quota is not in Bingo enumeration!')
         # カラーブロックが置かれたブロックサークル番号を取得する
         color_circle = self.block_circles.color_circle
-        candidates = [[1, 2, 3], [3, 5, 8], [6, 7, 8], [1, 4, 6]]
+        return [[number for number in candidate if number != color_circle]
+                for candidate in BINGO_CANDIDATES[bingo] if color_circle in candidate]
+
+
+    def first_quota(self, bingo):
+        """
+        ビンゴ状態を達成するためにブロックを設置するブロックサークル番号の候補のうち、最初の候補を返す。
+
+        Parameters
+        ----------
+        bingo : Bingo
+            ビンゴの種類
+        """
+        candidates = self.candidate_quotas(bingo)
+        if len(candidates) == 0:
+            raise ValueError('The number of block circle where color block is placed is wrong!')
+        return candidates[0]
 
-        for candidate in candidates:
-            if color_circle in candidate:
-                candidate.remove(color_circle)
-                return candidate
-        raise ValueError('The number of block circle where color block is placed is wrong!')
+
+    def single_bingo(self):
+        """
+        シングルビンゴを達成するためにブロックを設置するブロックサークルの番号を返す。
+        """
+        return self.first_quota(Bingo.SINGLE_BINGO)
 
 
     def double_bingo(self):
         """
         ダブルビンゴを達成するためにブロックを設置するブロックサークルの番号を返す。
         """
-        # カラーブロックが置かれたブロックサークル番号を取得する
-        color_circle = self.block_circles.color_circle
-        candidates = [[1, 2, 3, 5, 8], [1, 2, 3, 4, 6], 
-                      [3, 5, 8, 7, 6], [1, 4, 6, 7, 8]]
-
-        for candidate in candidates:
-            if color_circle in candidate:
-                candidate.remove(color_circle)
-                return candidate
-        raise ValueError('The number of block circle where color block is placed is wrong!')
+        return self.first_quota(Bingo.DOUBLE_BINGO)
 
     
     def triple_bingo(self):
         """
         トリプルビンゴを達成するためにブロックを設置するブロックサークルの番号を返す。
         """
-        # カラーブロックが置かれたブロックサークル番号を取得する
-        color_circle = self.block_circles.color_circle
-        candidates = [[1, 2, 3, 5, 8, 7, 6], [1, 2, 3, 4, 6, 7, 8],
-                      [3, 5, 8, 7, 6, 4, 1], [6, 4, 1, 2, 3, 5, 8]]
-        
-        for candidate in candidates:
-            if color_circle in candidate:
-                candidate.remove(color_circle)
-                return candidate
-        raise ValueError('The number of block circle where color block is placed is wrong!')
+        return self.first_quota(Bingo.TRIPLE_BINGO)
 
 
     def full_bingo(self):
         """
         フルビンゴを達成するためにブロックを設置するブロックサークルの番号を返す。
         """
-        # カラーブロックが置かれたブロックサークル番号を取得する
-        color_circle = self.block_circles.color_circle
-        candidate = [number for number in range(1, 8+1)]
-
-        if color_circle in candidate:
-            candidate.remove(color_circle)
-            return candidate
-        raise ValueError('The number of block circle where color block is placed is wrong!')
+        return self.first_quota(Bingo.FULL_BINGO)
 
     
     def get_quota(self):
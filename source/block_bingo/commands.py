@@ -3,6 +3,8 @@
     @author T.Miyaji
     @brief  ブロックビンゴ攻略のための運搬経路を走行体動作コマンドに変換する。
 """
+import itertools
+import json
 from BlockBingoCoordinate import BlockCirclesCoordinate
 from BlockBingoCoordinate import CrossCirclesCoordinate
 
@@ -58,8 +60,179 @@ class Instructions():
         return ja[instruction]
 
 
+# 命令ごとの所要時間[sec]の既定値。
+# BlockBingoSolverの従来の移動コスト(直進1, 90度旋回2, ブロックありの直進4, ブロックありの180度旋回5)と一致するように決めた値なので、
+# 走行体で実測した所要時間をload_durations()で読み込んで置き換える。
+# MOVE_NODEは交点サークル間(黒線の中点2つ分)の移動にかかる時間である。
+DEFAULT_DURATIONS = {
+    Instructions.ENTER_BINGO_AREA_L4: 4.0,
+    Instructions.ENTER_BINGO_AREA_L6: 4.0,
+    Instructions.ENTER_BINGO_AREA_R5: 4.0,
+    Instructions.ENTER_BINGO_AREA_R8: 4.0,
+    Instructions.STRAIGHT: 2.0,
+    Instructions.SPIN_RIGHT: 1.0,
+    Instructions.SPIN_LEFT: 1.0,
+    Instructions.SPIN180: 1.0,
+    Instructions.PUT: 2.0,
+    Instructions.STRAIGHT_DETOUR_RIGHT: 4.0,
+    Instructions.STRAIGHT_DETOUR_LEFT: 4.0,
+    Instructions.TURN_RIGHT90_EXIST_BLOCK: 2.0,
+    Instructions.TURN_RIGHT90_UNEXIST_BLOCK: 2.0,
+    Instructions.TURN_LEFT90_EXIST_BLOCK: 2.0,
+    Instructions.TURN_LEFT90_UNEXIST_BLOCK: 2.0,
+    Instructions.TURN180: 2.0,
+    Instructions.PREPARE_TO_PUT: 1.0,
+    Instructions.STRAIGHT_STRAIGHT: 4.0,
+    Instructions.MOVE_NODE: 2.0,
+    Instructions.QUICK_PUT_R: 2.0,
+    Instructions.QUICK_PUT_L: 2.0
+}
+
+
+def load_durations(file_name):
+    """
+    走行体で実測した命令ごとの所要時間[sec]をJSONファイルから読み込む。
+    キーは命令の文字('u'など)または命令名('MOVE_NODE'など)で指定する。ファイルにない命令は既定値を使う。
+
+    Parameters
+    ----------
+    file_name : str
+        所要時間を記述したJSONファイル
+    """
+    with open(file_name, encoding='utf-8') as f:
+        measured = json.load(f)
+
+    durations = dict(DEFAULT_DURATIONS)
+    for (key, value) in measured.items():
+        instruction = getattr(Instructions, key, key) if key.isupper() else key
+        if instruction not in DEFAULT_DURATIONS:
+            raise ValueError('unknown instruction: {}'.format(key))
+        if not isinstance(value, (int, float)) or value < 0:
+            raise ValueError('duration of {} is invalid!'.format(key))
+        durations[instruction] = float(value)
+    return durations
+
+
+def estimate_duration(commands, durations=None):
+    """
+    走行体に送信するコマンドのリストから、走行にかかる時間[sec]を推定する。
+
+    Parameters
+    ----------
+    commands : list
+        コマンドのリスト
+    durations : dict
+        命令ごとの所要時間(Noneの場合は既定値)
+    """
+    if durations is None:
+        durations = DEFAULT_DURATIONS
+    try:
+        return sum(durations[command] for command in commands)
+    except KeyError as e:
+        raise ValueError('unknown instruction: {}'.format(e.args[0]))
+
+
+# その場で回頭する命令の回転角[度](右回りを正とする)
+SPIN_ANGLES = {
+    Instructions.SPIN_RIGHT: 90,
+    Instructions.SPIN_LEFT: 270,
+    Instructions.SPIN180: 180
+}
+
+
+def rewrite_rules(durations=None):
+    """
+    連続する2つの命令を、同じ動作になるより短い命令列に置き換える規則の表を返す。
+    置き換えるかどうかは、推定走行時間、命令数の順に比べて決める。
+        rules[(命令, 命令)] = 置き換えたあとの命令のタプル
+
+    Parameters
+    ----------
+    durations : dict
+        命令ごとの所要時間(Noneの場合は既定値)
+    """
+    if durations is None:
+        durations = DEFAULT_DURATIONS
+    cost = lambda sequence: (sum(durations[instruction] for instruction in sequence), len(sequence))
+
+    # 回頭の組は、回転角の合計が同じ回頭命令の列のうち最も短いものに置き換える(回転角の合計が0なら取り除く)
+    spins = [()] + [(spin,) for spin in SPIN_ANGLES] + [(spin, spin) for spin in SPIN_ANGLES]
+    rules = {}
+    for pattern in itertools.product(SPIN_ANGLES, repeat=2):
+        angle = sum(SPIN_ANGLES[spin] for spin in pattern) % 360
+        candidates = [spin for spin in spins if sum(SPIN_ANGLES[s] for s in spin) % 360 == angle]
+        replacement = min(candidates, key=cost)
+        if cost(replacement) < cost(pattern):
+            rules[pattern] = replacement
+
+    # ブロックサークル間の移動を2回続ける場合は、1つの命令にまとめる
+    pattern = (Instructions.STRAIGHT, Instructions.STRAIGHT)
+    if cost((Instructions.STRAIGHT_STRAIGHT,)) < cost(pattern):
+        rules[pattern] = (Instructions.STRAIGHT_STRAIGHT,)
+    return rules
+
+
+def rewrite(commands, rules=None, prefix=()):
+    """
+    コマンドのリストに置き換え規則を繰り返し適用し、置き換えられなくなったコマンドのリストを返す。
+    置き換えたあとの命令と直前の命令の組にも規則を適用するので、回頭が3つ以上続く場合もまとめられる。
+    置き換えは先頭から順に行うので、rewrite(P + S) は rewrite(S, prefix=rewrite(P)) と等しい。
+
+    Parameters
+    ----------
+    commands : iterable
+        コマンドのリスト
+    rules : dict
+        置き換え規則の表(Noneの場合は、既定の所要時間で作成した表)
+    prefix : list
+        置き換え済みのコマンドのリスト(この後ろにcommandsを続けて置き換える)
+    """
+    if rules is None:
+        rules = DEFAULT_REWRITE_RULES
+    result = list(prefix)
+    for command in commands:
+        pending = [command]
+        while pending:
+            result.append(pending.pop(0))
+            pattern = tuple(result[-2:])
+            if pattern in rules:
+                del result[-2:]
+                pending = list(rules[pattern]) + pending
+    return result
+
+
+DEFAULT_REWRITE_RULES = rewrite_rules()
+
+
+def pack_move_nodes(raw):
+    """
+    交点サークル間の移動が2個続いたときは、コマンドを1個にまとめる。
+    2個連続したとき1つにまとめるので、3個連続するときは2個にまとめられる。
+
+    Parameters
+    ----------
+    raw : list
+        コマンドのリスト
+    """
+    if len(raw) == 0:
+        return []
+    commands = list(raw[0])
+    needPack = True  # MOVE_NODEを1つにまとめる必要があるかどうかを表す
+
+    for i in range(1, len(raw)):
+        # 交点サークル間の移動が2個連続するときは、格納しない
+        if needPack and raw[i] == Instructions.MOVE_NODE and \
+                raw[i - 1] == Instructions.MOVE_NODE:
+            # 3個連続したとき1個にまとめられないために、needPackをFalseにする
+            needPack = False
+            continue
+        needPack = True
+        commands.append(raw[i])
+    return commands
+
+
 class Commands():
-    def __init__(self, block_circles, cross_circles):
+    def __init__(self, block_circles, cross_circles, durations=None):
         """
         ブロックサークルおよび交点サークルの情報を登録する。
 
@@ -69,12 +242,19 @@ class Commands():
             ブロックサークルの座標
         cross_circles : CrossCirclesCoordinate
             交点サークルの座標
+        durations : dict
+            命令ごとの所要時間(Noneの場合は既定値)
         """
         self.block_circles = block_circles
         self.cross_circles = cross_circles
+        self.durations = durations if durations is not None else DEFAULT_DURATIONS
+        # コマンドを短くするための置き換え規則
+        self.rules = DEFAULT_REWRITE_RULES if self.durations is DEFAULT_DURATIONS else rewrite_rules(self.durations)
 
         # コマンドのリスト
         self.commands = []
+        # 置き換え規則を適用済みのコマンドの先頭部分(置き換える前のコマンド, 置き換えたあとのコマンド)
+        self.rewritten = ([], [])
 
     def convert(self, direction, path):
         """
@@ -103,23 +283,58 @@ class Commands():
     def get(self):
         """
         変換したコマンドを返す。
+        連続する回頭は置き換え規則(rewrite_rules)でまとめ、打ち消し合う回頭は取り除く。
         もし、交点サークル間の移動が2個続いたときは、コマンドを1個にまとめる。
         2個連続したとき1つにまとめるので、3個連続するときは2個にまとめられる。
         :return:
         """
-        commands = list(self.commands[0])
-        needPack = True  # MOVE_NODEを1つにまとめる必要があるかどうかを表す
-
-        for i in range(1, len(self.commands)):
-            # 交点サークル間の移動が2個連続するときは、格納しない
-            if needPack and self.commands[i] == Instructions.MOVE_NODE and \
-                    self.commands[i - 1] == Instructions.MOVE_NODE:
-                # 3個連続したとき1個にまとめられないために、needPackをFalseにする
-                needPack = False
-                continue
-            needPack = True
-            commands.append(self.commands[i])
-        return commands
+        return pack_move_nodes(self.rewrite())
+
+    def rewrite(self):
+        """
+        変換したコマンドに置き換え規則を適用したリストを返す。
+        最後の命令以外の置き換え結果は覚えておき、次に呼び出したときは追加された命令だけを置き換える
+        (最後の命令は、次の移動で旋回やブロックありの直進に置き換えられることがあるので覚えない)。
+        分枝限定法ではコマンドを引き継いで少しずつ追加するので、呼び出すたびにすべてを置き換えずに済む。
+        """
+        (raw, result) = self.rewritten
+        if self.commands[:len(raw)] != raw:
+            # 覚えている先頭部分が書き換えられた場合は、最初から置き換える
+            (raw, result) = ([], [])
+        stable = len(self.commands) - 1
+        if stable > len(raw):
+            result = rewrite(self.commands[len(raw):stable], self.rules, result)
+            raw = self.commands[:stable]
+            self.rewritten = (raw, result)
+        return rewrite(self.commands[len(raw):], self.rules, result)
+
+    def estimate_duration(self):
+        """
+        変換したコマンドを走行体が実行するのにかかる時間[sec]を推定する。
+        """
+        if len(self.commands) == 0:
+            return 0
+        return estimate_duration(self.get(), self.durations)
+
+    def settled_duration(self):
+        """
+        変換したコマンドのうち、後からコマンドを追加しても変わらない先頭部分の推定走行時間[sec]を返す。
+        最後の命令は次の移動で書き換えられることがあり、末尾の回頭やブロックサークル間の移動は
+        後に続く命令と置き換え規則でまとめられることがあるので数えない。
+        分枝限定法では、この値を計算済みのコマンドの推定走行時間の下界として使う。
+        """
+        if len(self.commands) <= 1:
+            return 0
+        self.rewrite()
+        (raw, result) = self.rewritten
+        if raw != self.commands[:-1]:
+            result = rewrite(self.commands[:-1], self.rules)
+        # 置き換え規則に現れる命令が末尾に続く間は、後の命令とまとめられる可能性がある
+        rewritable = {instruction for pattern in self.rules for instruction in pattern}
+        end = len(result)
+        while end > 0 and result[end - 1] in rewritable:
+            end -= 1
+        return estimate_duration(pack_move_nodes(result[:end]), self.durations)
 
     def get_next_direction(self, src, dst):
         """
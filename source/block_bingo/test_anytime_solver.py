@@ -0,0 +1,63 @@
+"""
+    @file   test_anytime_solver.py
+    @author T.Miyaji
+    @brief  AnytimeSolverのテストコード
+"""
+import time
+import pytest
+from AnytimeSolver import AnytimeSolver
+from commands import estimate_duration
+from test_block_bingo_solver import create_solve_left
+
+
+def test_get_before_start():
+    """
+    改善を始める前から、貪欲法の運搬経路が得られることを確認する。
+    """
+    greedy = create_solve_left().solve()
+    planner = AnytimeSolver(create_solve_left(), deadline=1.0)
+    assert greedy == planner.get()
+
+
+def test_result():
+    """
+    締め切りまでに改善した運搬経路の推定走行時間が、貪欲法の運搬経路の推定走行時間以下であることを確認する。
+    """
+    greedy = create_solve_left().solve()
+    solver = create_solve_left()
+    planner = AnytimeSolver(solver, deadline=0.5)
+    planner.start()
+    commands = planner.result()
+    assert estimate_duration(commands) <= estimate_duration(greedy)
+    # 改善を打ち切ったスレッドは、最後まで待てば終了する
+    planner.join()
+    assert not planner.is_alive()
+    # ダブルビンゴ(4個)とボーナスサークル(1個)のために、5個のブロックが運搬されている
+    assert 3 == len(solver.cross_circles.open)
+
+
+def test_deadline():
+    """
+    締め切りを過ぎると、改善を打ち切って運搬経路を返すことを確認する。
+    """
+    planner = AnytimeSolver(create_solve_left(), deadline=0.1)
+    planner.start()
+    start = time.monotonic()
+    planner.result()
+    assert time.monotonic() - start < 0.5
+
+
+def test_hard_deadline():
+    """
+    改善の1ステップが締め切りを過ぎても終わらない場合は、スレッドを待たずにその時点の最良解を返すことを確認する。
+    """
+    solver = create_solve_left()
+    planner = AnytimeSolver(solver, deadline=0.1)
+    greedy = planner.get()
+    # 打ち切りの合図を無視して、長い時間かかるステップを模擬する
+    solver.improve_plan = lambda *args: time.sleep(2.0)
+    planner.start()
+    start = time.monotonic()
+    assert greedy == planner.result(grace=0.05)
+    assert time.monotonic() - start < 0.5
+    assert planner.is_alive()
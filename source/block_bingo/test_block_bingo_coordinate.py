@@ -7,6 +7,7 @@ import pytest
 from BlockBingoCoordinate import Color
 from BlockBingoCoordinate import BlockCirclesCoordinate
 from BlockBingoCoordinate import CrossCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesSet
 
 def create_block_circles(is_left = True, bonus = 6, color = 3, black = 5):
     return BlockCirclesCoordinate(is_left, bonus, color, black)
@@ -167,4 +168,54 @@ def test_start_node():
     # 1つだけ青色のブロックを置いて、正しく処理できるか確認する
     coordinate.set_block_color((0,2), Color.BLUE)
     assert ((2,0), 2) == coordinate.start_node((2.5,0), [Color.RED, Color.BLUE, Color.GREEN])
-    assert ((0,2), 1) == coordinate.start_node((2.5, 0), [Color.YELLOW, Color.BLUE])
\ No newline at end of file
+    assert ((0,2), 1) == coordinate.start_node((2.5, 0), [Color.YELLOW, Color.BLUE])
+
+def test_cross_circles_set():
+    """
+    ブロックが置かれた交点サークルの集合が、リストと同じように扱えることを確認する。
+    """
+    circles = CrossCirclesSet([(0,0), (1,1)])
+    assert (0,0) in circles
+    assert (1,1.5) not in circles
+    assert (4,0) not in circles
+    assert 2 == len(circles)
+
+    circles.append((3,2))
+    assert [(0,0), (1,1), (3,2)] == list(circles)
+    assert (3,2) == circles[-1]
+
+    circles.remove((1,1))
+    assert [(0,0), (3,2)] == list(circles)
+    with pytest.raises(ValueError):
+        circles.remove((1,1))
+    with pytest.raises(ValueError):
+        circles.append((0.5,0))
+
+
+def test_copy_cross_circles():
+    """
+    交点サークルの状態を複製したとき、複製元の状態が変わらないことを確認する。
+    """
+    coordinate = CrossCirclesCoordinate()
+    coordinate.set_block_color((0,0), Color.RED)
+    other = coordinate.copy()
+    assert coordinate.key() == other.key()
+
+    other.move_block((0,0))
+    assert coordinate.has_color((0,0), Color.RED)
+    assert not other.has_color((0,0), Color.RED)
+    assert (0,0) in coordinate.open
+    assert (0,0) not in other.open
+    assert coordinate.key() != other.key()
+
+
+def test_has_color():
+    """
+    色を上書きしたとき、前の色のビットが消えることを確認する。
+    """
+    coordinate = CrossCirclesCoordinate()
+    coordinate.set_block_color((2,2), Color.RED)
+    coordinate.set_block_color((2,2), Color.BLUE)
+    assert not coordinate.has_color((2,2), Color.RED)
+    assert coordinate.has_color((2,2), Color.BLUE)
+    assert not coordinate.has_color((2,1), Color.BLUE)
@@ -4,11 +4,16 @@
     @brief  block_bingo_solverのテストファイル
 """
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from BlockBingoSolver import Path
 from BlockBingoSolver import BlockBingoSolver
 from BlockBingoSolver import BlockCirclesCoordinate
 from BlockBingoSolver import CrossCirclesCoordinate
 from BlockBingoCoordinate import Color
+from commands import Instructions
+from commands import DEFAULT_DURATIONS
+from commands import estimate_duration
+from RuleBook import Bingo
 
 
 def create_block_bingo(path=[(1,0), (2,0), (2,1)], is_left=True, bonus=5, color=3, black=6):
@@ -196,7 +201,56 @@ def test_a_star3():
     assert [(2,0), (2,0.5), (2,1), (2,1.5), (2,2), (1.5,2), (1,2)] == solver.a_star((2,0), (1,2))
 
 
-def test_solve_left():
+def test_a_star_from_src():
+    """
+    走行体の現在地ではなく、指定した始点ノードから探索することを確認する。
+    """
+    solver = create_block_bingo([(1,0), (0,0)])
+    solver.direction = 2
+    solver.position = (3,3)
+    solver.cross_circles.move_block((1,1))
+    assert [(1,1), (1,1.5), (1,2), (0.5,2), (0,2)] == solver.a_star((1,1), (0,2))
+
+
+def test_a_star_unreachable():
+    """
+    終点ノードに到達できない場合、例外が送出されることを確認する。
+    """
+    solver = create_block_bingo([(1,0), (0,0)])
+    solver.direction = 2
+    solver.position = (1,1)
+    with pytest.raises(ArithmeticError):
+        solver.a_star((1,1), (0.5,0.5))
+
+
+def test_turn_costs():
+    """
+    走行体の向きと移動方向ごとの移動コスト表が、直進・旋回のコストと一致することを確認する。
+    """
+    solver = create_block_bingo()
+    # 直進、90度旋回、180度旋回
+    assert 1 == solver.turn_costs[False][2][2]
+    assert 2 == solver.turn_costs[False][2][0]
+    assert 2 == solver.turn_costs[False][2][6]
+    # 始点にブロックが置かれているとき
+    assert 4 == solver.turn_costs[True][4][4]
+    assert 2 == solver.turn_costs[True][4][2]
+    assert 5 == solver.turn_costs[True][4][0]
+
+
+def test_a_star_direction():
+    """
+    走行体の向きを考慮して、移動コストが最小となる経路を探索することを確認する。
+    """
+    # 走行体の現在地は(0,1)、向きは北向き
+    solver = create_block_bingo([(1,0), (0,0)])
+    solver.direction = 0
+    solver.position = (0,1)
+    # (1,1)側を回るよりも旋回が1回少ない、(0,0)側を回る経路になる
+    assert [(0,1), (0,0.5), (0,0), (0.5,0), (1,0), (1.5,0)] == solver.a_star((0,1), (1.5,0))
+
+
+def create_solve_left():
     solver = create_block_bingo([(2,0), (1,0)], bonus=4, color=2)
     block = [[Color.YELLOW, Color.NONE, Color.BLUE, Color.NONE],
              [Color.NONE, Color.RED, Color.NONE, Color.BLACK],
@@ -205,6 +259,11 @@ def test_solve_left():
     for x in range(0, 3+1):
         for y in range(0, 3+1):
             solver.cross_circles.set_block_color((x,y), block[x][y])
+    return solver
+
+
+def test_solve_left():
+    solver = create_solve_left()
 
     commands = ['e', 'u', 'd', 'u', 'y', 'u', 'd', 'u', 'u', 'j', 'u', 'z', 'd', 'u', 'f', 'u', 'z',
                 'e', 'u', 'f', 'u', 'u', 'l', 'd', 'g', 'e',
@@ -223,8 +282,100 @@ def test_solve_right():
         for y in range(0, 3+1):
             solver.cross_circles.set_block_color((x,y), block[x][y])
 
-    commands = ['e', 'm', 'u', 'f', 'u', 'm', 'h', 'd', 'g', 'd', 'u',
-                'u', 'z', 'e', 'u', 'f', 'u', 'k', 'u', 'z', 'e', 'u',
+    # 向きも状態に含めて探索するので、180°回頭して迂回する経路ではなく、右に回頭して旋回する経路を選ぶ
+    commands = ['e', 'm', 'u', 'd', 'u', 'k', 'l', 'd', 'g', 'd', 'u',
+                'u', 'z', 'e', 'u', 'e', 'u', 'm', 'u', 'y', 'u',
                 'u', 'd', 'y', 'u', 'k', 'u', 'k', 'u', 'u', 'z', 'u', 'j', 'u', 'e']
     
-    assert commands == solver.solve()
\ No newline at end of file
+    assert commands == solver.solve()
+
+def test_solve_without_block():
+    """
+    運搬するべき色のブロックがない場合、それまでの経路とガレージまでの経路を返すことを確認する。
+    """
+    solver = create_block_bingo([(2,0), (1,0)], bonus=4, color=2)
+    # 交点サークルには色のついたブロックが置かれていない
+    commands = solver.solve()
+    assert 0 < len(commands)
+    # ブロックを設置するコマンドは含まれない
+    assert not set(commands) & set(['g', 'y', 'z'])
+
+
+def test_optimize():
+    """
+    分枝限定法で計算した運搬経路の推定走行時間が、貪欲法で計算した運搬経路の推定走行時間以下であることを確認する。
+    """
+    greedy = create_solve_left().solve()
+    solver = create_solve_left()
+    commands = solver.optimize(budget=1.0)
+    assert estimate_duration(commands) <= estimate_duration(greedy)
+    # ダブルビンゴ(4個)とボーナスサークル(1個)のために、5個のブロックが運搬されている
+    assert 3 == len(solver.cross_circles.open)
+
+
+def test_optimize_without_budget():
+    """
+    計算時間がない場合は、貪欲法の運搬経路を返すことを確認する。
+    """
+    greedy = create_solve_left().solve()
+    assert greedy == create_solve_left().optimize(budget=0)
+
+
+def test_copy():
+    """
+    複製したソルバで経路を計算しても、複製元の状態が変わらないことを確認する。
+    """
+    solver = create_solve_left()
+    other = solver.copy()
+    other.solve()
+    assert 8 == len(solver.cross_circles.open)
+    assert (2,0.5) == solver.position
+
+
+def test_select_plan():
+    """
+    残り時間に収まる運搬経路のうち、成立するビンゴの列数が最も多いものを選ぶことを確認する。
+    """
+    solver = create_solve_left()
+    plan = solver.select_plan(time_budget=1000)
+    assert plan['achieved']
+    assert plan['time'] <= 1000
+    # シングルビンゴの運搬経路しか収まらない残り時間を指定する
+    single = create_solve_left().greedy_plan(Bingo.SINGLE_BINGO)
+    plan = solver.select_plan(time_budget=single['duration'])
+    assert Bingo.SINGLE_BINGO == plan['bingo']
+    # ソルバの状態は変わらない
+    assert 8 == len(solver.cross_circles.open)
+
+
+def test_select_plan_with_executor():
+    """
+    Executorを指定しても、順番に計算した場合と同じ運搬経路を選ぶことを確認する。
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        plan = create_solve_left().select_plan(60, executor=executor)
+    assert plan['commands'] == create_solve_left().select_plan(60)['commands']
+
+
+def test_turn_costs_from_durations():
+    """
+    移動コストが命令ごとの所要時間から求まり、所要時間の短い運搬経路を選ぶことを確認する。
+    """
+    durations = dict(DEFAULT_DURATIONS)
+    durations.update({Instructions.MOVE_NODE: 1.0, Instructions.TURN180: 3.5})
+    solver = BlockBingoSolver(BlockCirclesCoordinate(True, 5, 3, 6), CrossCirclesCoordinate(),
+                              [(1,0), (2,0), (2,1)], durations)
+    assert 0.5 == solver.straight(False, False)
+    assert 3.5 == solver.spin180(False)
+    assert 5 == solver.spin180(True)
+    # 経路表の経路とA*アルゴリズムで探索した経路の移動コストが一致する
+    for dst in [(0,0), (3,3), (0.5,2), (3,1.5)]:
+        costs = []
+        for path in [solver.a_star(solver.position, dst), solver.search(solver.position, dst)]:
+            direction = solver.direction
+            cost = 0
+            for (src, node) in zip(path, path[1:]):
+                cost += solver.transition_cost(src, node, direction)
+                direction = solver.get_robot_direction(src, node)
+            costs.append(cost)
+        assert costs[0] == costs[1]
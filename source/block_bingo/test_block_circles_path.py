@@ -178,5 +178,32 @@ class BlockCirclesSolverTest(unittest.TestCase):
         goal = original.index(5) + 1
         self.assertEqual(original[start:goal], solver.subset_of_tracks(2, 5, original))
 
+    def test_candidate_routes(self):
+        """
+        candidate_routes()のテストコード
+        確認事項
+            1. 先頭の運搬経路は、solve()の運搬経路であること
+            2. 運搬経路は重複しないこと
+            3. solve()以外の運搬経路は、ボーナスサークルを除いてカラーブロックが置かれたサークルを通らないこと
+            4. 運搬経路の末尾は、ボーナスサークルであること
+        """
+        for is_left in [True, False]:
+            for bonus in range(1, 8 + 1):
+                for black in range(1, 8 + 1):
+                    for color in range(1, 8 + 1):
+                        if bonus == black or black == color:
+                            continue
+                        solver = BlockCirclesSolver(bonus, black, color, is_left)
+                        routes = solver.candidate_routes()
+                        # 確認事項1.のテスト
+                        self.assertEqual(solver.solve(), routes[0])
+                        # 確認事項2.のテスト
+                        self.assertEqual(len(routes), len(set(map(tuple, routes))))
+                        for route in routes[1:]:
+                            # 確認事項3.のテスト
+                            self.assertTrue(solver.coordinate.get(color) not in route[0:-1])
+                            # 確認事項4.のテスト
+                            self.assertEqual(solver.coordinate.get(bonus), route[-1])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
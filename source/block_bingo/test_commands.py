@@ -5,6 +5,11 @@
 """
 from commands import Instructions
 from commands import Commands
+from commands import DEFAULT_DURATIONS
+from commands import load_durations
+from commands import estimate_duration
+from commands import rewrite
+from commands import rewrite_rules
 from BlockBingoCoordinate import BlockCirclesCoordinate
 from BlockBingoCoordinate import CrossCirclesCoordinate
 import pytest
@@ -244,4 +249,111 @@ def test_get():
 
     # uが2個連続するとき、1個にまとめられることを確認する
     expected = ['u', 'k', 'u', 'u', 'u', 'e', 'a']
-    assert commands.get() == expected
\ No newline at end of file
+    assert commands.get() == expected
+
+def test_estimate_duration():
+    commands = create_commands()
+    commands.commands = ['u', 'u', 'k', 'u', 'e', 'g']
+
+    # まとめたあとのコマンド(u, k, u, e, g)の所要時間の合計になることを確認する
+    assert 2 + 2 + 2 + 1 + 2 == commands.estimate_duration()
+    assert 0 == create_commands().estimate_duration()
+    with pytest.raises(ValueError):
+        estimate_duration(['u', '?'])
+
+
+def test_load_durations(tmpdir):
+    file_name = tmpdir.join('durations.json')
+    file_name.write('{"MOVE_NODE": 1.5, "h": 3.25}')
+
+    durations = load_durations(str(file_name))
+    assert 1.5 == durations[Instructions.MOVE_NODE]
+    assert 3.25 == durations[Instructions.STRAIGHT_DETOUR_RIGHT]
+    # ファイルに記述していない命令は既定値になる
+    assert DEFAULT_DURATIONS[Instructions.PUT] == durations[Instructions.PUT]
+
+    file_name.write('{"JUMP": 1.0}')
+    with pytest.raises(ValueError):
+        load_durations(str(file_name))
+    file_name.write('{"u": -1.0}')
+    with pytest.raises(ValueError):
+        load_durations(str(file_name))
+
+
+def test_rewrite():
+    # 連続する回頭は、回転角の合計が同じ回頭にまとめられることを確認する
+    assert ['f'] == rewrite(['d', 'd'])
+    assert ['e'] == rewrite(['d', 'f'])
+    assert ['u', 'd', 'u'] == rewrite(['u', 'd', 'd', 'd', 'f', 'u'])
+    # 打ち消し合う回頭は取り除かれることを確認する
+    assert ['u', 'u'] == rewrite(['u', 'd', 'e', 'u'])
+    assert [] == rewrite(['f', 'd', 'd'])
+    # ブロックサークル間の移動が続くときは、2回移動する命令にまとめられることを確認する
+    assert ['p', 'c'] == rewrite(['c', 'c', 'c'])
+    # 回頭以外の命令は置き換えないことを確認する
+    assert ['d', 'u', 'e', 'g'] == rewrite(['d', 'u', 'e', 'g'])
+
+
+def test_rewrite_rules():
+    # 180°回頭が90°回頭2回よりも遅い場合は、90°回頭2回をまとめないことを確認する
+    durations = dict(DEFAULT_DURATIONS)
+    durations[Instructions.SPIN180] = 2.5
+    rules = rewrite_rules(durations)
+    assert ('d', 'd') not in rules
+    assert ('e',) == rules[('d', 'f')]
+    assert () == rules[('d', 'e')]
+
+
+def test_get_with_rewrite():
+    commands = create_commands()
+    commands.commands = ['u', 'd', 'e', 'u', 'd', 'd', 'g']
+
+    # 打ち消し合う回頭を取り除いたあとに、交点サークル間の移動がまとめられることを確認する
+    assert ['u', 'f', 'g'] == commands.get()
+
+
+def test_convert_at_pickup():
+    # ブロックを取得する交点サークルでは、ブロックありの旋回(ブロックを避ける動作)にまとめずに回頭してから直進することを確認する
+    commands = create_commands()
+    assert 0 == commands.convert(0, [(2.5,1), (2,1)])
+    assert 2 == commands.convert(0, [(2,1), (2,1.5), (2,2)])
+    assert ['u', 'd', 'u'] == commands.get()
+
+
+def test_settled_duration():
+    # 後に続く回頭とまとめられると推定走行時間が短くなるので、まとめられる可能性がある末尾は下界に数えないことを確認する
+    commands = create_commands()
+    commands.commands = ['u', 'd', 'd']
+    assert 3.0 == commands.estimate_duration()
+    assert 2.0 == commands.settled_duration()
+    commands.commands.append('f')
+    assert 2.0 == commands.estimate_duration()
+    # 後からコマンドを追加しても、推定走行時間が下界を下回らないことを確認する
+    sequence = ['u', 'd', 'd', 'u', 'f', 'd', 'u', 'u', 'e', 'd', 'c', 'c', 'c', 'g']
+    commands = create_commands()
+    for (i, command) in enumerate(sequence):
+        commands.commands.append(command)
+        for end in range(i + 1, len(sequence) + 1):
+            longer = create_commands()
+            longer.commands = sequence[:end]
+            assert commands.settled_duration() <= longer.estimate_duration()
+
+
+def test_get_incrementally():
+    # 少しずつ追加しながら呼び出しても、まとめて置き換えた場合と同じコマンドになることを確認する
+    sequence = ['u', 'd', 'd', 'u', 'f', 'd', 'u', 'u', 'e', 'd', 'c', 'c', 'c', 'g']
+    commands = create_commands()
+    for command in sequence:
+        commands.commands.append(command)
+        expected = create_commands()
+        expected.commands = list(commands.commands)
+        assert expected.get() == commands.get()
+    # 最後の命令が置き換えられても、置き換えたあとのコマンドが返ることを確認する
+    commands.commands[-1] = 'd'
+    expected = create_commands()
+    expected.commands = list(commands.commands)
+    assert expected.get() == commands.get()
+    assert 'd' == commands.get()[-1]
+    # 先頭部分が書き換えられた場合は、最初から置き換えることを確認する
+    commands.commands = ['u', 'u', 'd']
+    assert ['u', 'd'] == commands.get()
@@ -0,0 +1,102 @@
+"""
+    @file   test_parallel_planner.py
+    @author T.Miyaji
+    @brief  ParallelPlannerのテストコード
+"""
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from BlockBingoCoordinate import Color
+from BlockBingoCoordinate import BlockCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesCoordinate
+from BlackBlockCommands import BlackBlockCommands
+from BlockBingoSolver import BlockBingoSolver
+from ParallelPlanner import ParallelPlanner
+from ParallelPlanner import board_of
+from ParallelPlanner import evaluate_plan
+from ParallelPlanner import load_route_table
+from RuleBook import Bingo
+import RouteTable
+
+
+def create_circles(is_left=True, bonus=4, color=2, black=6):
+    block_circles = BlockCirclesCoordinate(is_left, bonus, color, black)
+    cross_circles = CrossCirclesCoordinate()
+    block = [[Color.YELLOW, Color.NONE, Color.BLUE, Color.NONE],
+             [Color.NONE, Color.RED, Color.NONE, Color.BLACK],
+             [Color.YELLOW, Color.NONE, Color.RED, Color.NONE],
+             [Color.NONE, Color.BLUE, Color.NONE, Color.GREEN]]
+    for x in range(0, 3+1):
+        for y in range(0, 3+1):
+            cross_circles.set_block_color((x,y), block[x][y])
+    return (block_circles, cross_circles)
+
+
+def test_evaluate_plan():
+    """
+    候補の運搬経路が、ブロックサークル間の運搬経路とブロックビンゴの運搬経路をつなげたものであることを確認する。
+    """
+    (block_circles, cross_circles) = create_circles()
+    black_block = BlackBlockCommands(4, 6, 2, True)
+    expected = list(black_block.gen_commands())
+    expected += BlockBingoSolver(block_circles, cross_circles.copy(), black_block.reverse_route).solve()
+
+    unit = (True, 4, 6, 2, board_of(cross_circles), Bingo.DOUBLE_BINGO, None, black_block.reverse_route, None)
+    plan = evaluate_plan(unit)
+    assert expected == plan['commands']
+
+
+def test_plan():
+    """
+    すべての候補から選んだ運搬経路のコマンド数が、既定の運搬経路のコマンド数以下であることを確認する。
+    """
+    (block_circles, cross_circles) = create_circles()
+    black_block = BlackBlockCommands(4, 6, 2, True)
+    default = list(black_block.gen_commands())
+    default += BlockBingoSolver(block_circles, cross_circles.copy(), black_block.reverse_route).solve()
+
+    planner = ParallelPlanner(ThreadPoolExecutor(max_workers=2))
+    plan = planner.plan(block_circles, cross_circles, 1000, bingos=(Bingo.DOUBLE_BINGO,))
+    planner.shutdown()
+    assert plan['achieved']
+    assert len(plan['commands']) <= len(default)
+    # 交点サークルの状態は変わらない
+    assert 8 == len(cross_circles.open)
+
+
+def test_plan_with_process_pool():
+    """
+    プロセスプールで計算しても、順番に計算した場合と同じ運搬経路を選ぶことを確認する。
+    """
+    (block_circles, cross_circles) = create_circles()
+    planner = ParallelPlanner(ProcessPoolExecutor(max_workers=2))
+    plan = planner.plan(block_circles, cross_circles, 1000, bingos=(Bingo.SINGLE_BINGO,))
+    planner.shutdown()
+
+    planner = ParallelPlanner(ThreadPoolExecutor(max_workers=1))
+    assert plan['commands'] == planner.plan(block_circles, cross_circles, 1000, bingos=(Bingo.SINGLE_BINGO,))['commands']
+    planner.shutdown()
+
+
+def test_load_route_table():
+    """
+    プロセスの起動時に、経路表を1回だけ読み込んでおくことを確認する。
+    """
+    RouteTable._route_tables.clear()
+    load_route_table()
+    assert 1 == len(RouteTable._route_tables)
+    route_table = next(iter(RouteTable._route_tables.values()))
+    # 以降に生成するBlockBingoSolverは、読み込み済みの経路表を使う
+    (block_circles, cross_circles) = create_circles()
+    assert route_table is BlockBingoSolver(block_circles, cross_circles, [(1,0), (2,0), (2,1)]).route_table
+
+    # 既定のプロセスプールは、プロセスの起動時に経路表を読み込む
+    planner = ParallelPlanner(max_workers=1)
+    planner.warm_up()
+    assert plan_commands(planner) == plan_commands(ParallelPlanner(ThreadPoolExecutor(max_workers=1)))
+    planner.shutdown()
+
+
+def plan_commands(planner):
+    (block_circles, cross_circles) = create_circles()
+    return planner.plan(block_circles, cross_circles, 1000, bingos=(Bingo.SINGLE_BINGO,))['commands']
@@ -0,0 +1,73 @@
+"""
+    @file   test_plan_cache.py
+    @author T.Miyaji
+    @brief  PlanCacheのテストコード
+"""
+import pytest
+from BlockBingoCoordinate import Color
+from BlockBingoCoordinate import BlockCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesCoordinate
+from PlanCache import PlanCache
+from PlanCache import plan_key
+
+
+def create_circles(is_left=True, bonus=4, color=2, black=6):
+    block_circles = BlockCirclesCoordinate(is_left, bonus, color, black)
+    cross_circles = CrossCirclesCoordinate()
+    block = [[Color.YELLOW, Color.NONE, Color.BLUE, Color.NONE],
+             [Color.NONE, Color.RED, Color.NONE, Color.BLACK],
+             [Color.YELLOW, Color.NONE, Color.RED, Color.NONE],
+             [Color.NONE, Color.BLUE, Color.NONE, Color.GREEN]]
+    for x in range(0, 3+1):
+        for y in range(0, 3+1):
+            cross_circles.set_block_color((x,y), block[x][y])
+    return (block_circles, cross_circles)
+
+
+def test_plan_key():
+    """
+    同じ配置なら同じキーに、配置や設定が異なれば別のキーになることを確認する。
+    """
+    key = plan_key(*create_circles())
+    assert key == plan_key(*create_circles())
+    assert key != plan_key(*create_circles(is_left=False))
+    assert key != plan_key(*create_circles(bonus=5))
+    assert key != plan_key(*create_circles(), settings={'time_budget': 60})
+
+    (block_circles, cross_circles) = create_circles()
+    cross_circles.set_block_color((0,0), Color.GREEN)
+    assert key != plan_key(block_circles, cross_circles)
+
+
+def test_plan_key_with_recognized_colors():
+    """
+    BlockRecognizerと同じく、ブロックのない交点サークルを白や認識できない色(None)にしても同じキーになることを確認する。
+    """
+    key = plan_key(*create_circles())
+    (block_circles, cross_circles) = create_circles()
+    cross_circles.set_block_color((0,1), Color.WHITE)
+    cross_circles.set_block_color((2,3), None)
+    assert key == plan_key(block_circles, cross_circles)
+
+    # 初期位置の交点サークルが認識できなかった場合も、キーを計算できる
+    cross_circles.set_block_color((0,0), None)
+    assert key != plan_key(block_circles, cross_circles)
+
+
+def test_put_and_get(tmpdir):
+    file_name = str(tmpdir.join('plan_cache.sqlite3'))
+    key = plan_key(*create_circles())
+    cache = PlanCache(file_name)
+    assert cache.get(key) is None
+    cache.put(key, ['a', 'c', 'u', 'g'])
+    assert ['a', 'c', 'u', 'g'] == cache.get(key)
+    cache.close()
+
+    # ファイルに保存したコマンドを読み込めることを確認する
+    cache = PlanCache(file_name)
+    assert 1 == len(cache)
+    assert 1 == cache.preload()
+    assert ['a', 'c', 'u', 'g'] == cache.get(key)
+    cache.put(key, ['b', 'c'])
+    assert ['b', 'c'] == cache.get(key)
+    cache.close()
@@ -0,0 +1,86 @@
+"""
+    @file   test_plan_table.py
+    @author T.Miyaji
+    @brief  PlanTableのテストコード
+"""
+import itertools
+import pytest
+from BlockBingoCoordinate import Color
+from BlockBingoCoordinate import CROSS_CIRCLES_ORDER
+from PlanTable import PlanTable
+from PlanTable import block_arrangements
+from PlanTable import build_table
+from PlanTable import create_circles
+from PlanTable import enumerate_layouts
+from PlanTable import layout_key
+from ParallelPlanner import ParallelPlanner
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_block_arrangements():
+    """
+    交点サークルのブロックの並びが、(8!/(2!2!2!)) x 4色 = 20160通りあることを確認する。
+    """
+    arrangements = block_arrangements()
+    assert 20160 == len(arrangements)
+    assert arrangements == sorted(set(arrangements))
+
+
+def test_enumerate_layouts():
+    """
+    配置がlayout_keyの昇順に列挙されることを確認する。
+    """
+    layouts = list(itertools.islice(enumerate_layouts(), 0, 1000000, 997))
+    keys = [layout_key(*create_circles(layout)) for layout in layouts]
+    assert keys == sorted(keys)
+    assert len(keys) == len(set(keys))
+    assert not layouts[0][0]
+
+
+def recognized_circles(layout):
+    """
+    BlockRecognizerと同じく、ブロックのない交点サークルを白(Color.WHITE)にした座標クラスを生成する。
+    """
+    (block_circles, cross_circles) = create_circles(layout)
+    for coordinate in CROSS_CIRCLES_ORDER[8:]:
+        cross_circles.set_block_color(coordinate, Color.WHITE)
+    return (block_circles, cross_circles)
+
+
+def test_layout_key_with_recognized_colors():
+    """
+    ブロックのない交点サークルの認識結果(白や認識できない色)は、キーに影響しないことを確認する。
+    """
+    layout = next(enumerate_layouts())
+    key = layout_key(*create_circles(layout))
+    (block_circles, cross_circles) = recognized_circles(layout)
+    assert key == layout_key(block_circles, cross_circles)
+    cross_circles.set_block_color(CROSS_CIRCLES_ORDER[8], None)
+    assert key == layout_key(block_circles, cross_circles)
+
+
+def test_build_table(tmpdir):
+    """
+    表から読み出した運搬経路が、ParallelPlannerで計算した運搬経路と一致することを確認する。
+    """
+    directory = str(tmpdir.join('plan_table'))
+    layouts = list(itertools.islice(enumerate_layouts((True,), (4,)), 0, 100000, 20000))
+    build_table(layouts, directory, max_workers=1)
+
+    table = PlanTable(directory)
+    assert len(layouts) == len(table)
+    assert {'durations': None, 'time_budget': 90.0} == table.settings
+    planner = ParallelPlanner(ThreadPoolExecutor(max_workers=1))
+    for layout in layouts:
+        (block_circles, cross_circles) = create_circles(layout)
+        assert planner.plan(block_circles, cross_circles, 90.0)['commands'] == table.get(block_circles, cross_circles)
+    planner.shutdown()
+
+    # BlockRecognizerと同じく、ブロックのない交点サークルを白にした配置でも表を引けることを確認する
+    (block_circles, cross_circles) = recognized_circles(layouts[0])
+    assert table.get(*create_circles(layouts[0])) == table.get(block_circles, cross_circles)
+    assert table.get(block_circles, cross_circles) is not None
+
+    # 表にない配置はNoneになる
+    (block_circles, cross_circles) = create_circles((False, 4, 1, 2, layouts[0][4]))
+    assert table.get(block_circles, cross_circles) is None
@@ -0,0 +1,89 @@
+"""
+    @file   test_route_table.py
+    @author T.Miyaji
+    @brief  RouteTableのテストコード
+"""
+import pytest
+from BlockBingoSolver import BlockBingoSolver
+from BlockBingoCoordinate import BlockCirclesCoordinate
+from BlockBingoCoordinate import CrossCirclesCoordinate
+from RouteTable import RouteTable
+
+
+def create_block_bingo():
+    block_circles = BlockCirclesCoordinate(True, 5, 3, 6)
+    cross_circles = CrossCirclesCoordinate()
+    return BlockBingoSolver(block_circles, cross_circles, [(1,0), (2,0), (2,1)])
+
+
+def create_route_table(solver):
+    return RouteTable(solver.graph_nodes(), solver.graph_edges(), solver.turn_costs)
+
+
+def path_cost(solver, path, direction):
+    cost = 0
+    for (src, dst) in zip(path, path[1:]):
+        cost += solver.transition_cost(src, dst, direction)
+        direction = solver.get_robot_direction(src, dst)
+    return cost
+
+
+def test_route():
+    """
+    経路表から求めた経路のコストが、A*アルゴリズムで探索した経路のコストと一致することを確認する。
+    """
+    solver = create_block_bingo()
+    solver.cross_circles.move_block((1,1))
+    route_table = create_route_table(solver)
+    has_block = lambda node: node in solver.cross_circles.open
+
+    for (src, dst) in [((1,1), (0,2)), ((3,1), (1,0)), ((0,1), (1.5,0)), ((3,3), (0,0))]:
+        for direction in (0, 2, 4, 6):
+            solver.direction = direction
+            path = route_table.route(solver.cross_circles.open.mask, has_block, src, direction, dst)
+            assert src == path[0] and dst == path[-1]
+            cost = path_cost(solver, path, direction)
+            assert cost == path_cost(solver, solver.search(src, dst), direction)
+            assert cost == route_table.cost(solver.cross_circles.open.mask, has_block, src, direction, dst)
+
+
+def test_route_unreachable():
+    """
+    ブロックサークルの中心など、移動できない座標を指定した場合は例外が送出されることを確認する。
+    """
+    solver = create_block_bingo()
+    route_table = create_route_table(solver)
+    with pytest.raises(ArithmeticError):
+        route_table.route(solver.cross_circles.open.mask, lambda node: False, (0,0), 2, (0.5,0.5))
+
+
+def test_save_and_load(tmpdir):
+    """
+    保存した経路表を読み込むと、同じ経路表が得られることを確認する。
+    """
+    solver = create_block_bingo()
+    route_table = create_route_table(solver)
+    mask = solver.cross_circles.open.mask
+    route_table.get(mask, lambda node: node in solver.cross_circles.open)
+    file_name = str(tmpdir.join('route_table.npz'))
+    route_table.save(file_name)
+
+    loaded = create_route_table(solver)
+    loaded.load(file_name)
+    assert [mask] == list(loaded.tables)
+    assert (route_table.tables[mask][0] == loaded.tables[mask][0]).all()
+    assert (route_table.tables[mask][1] == loaded.tables[mask][1]).all()
+
+
+def test_load_different_costs(tmpdir):
+    """
+    移動コスト表が異なる経路表を読み込んだ場合、例外が送出されることを確認する。
+    """
+    solver = create_block_bingo()
+    route_table = create_route_table(solver)
+    file_name = str(tmpdir.join('route_table.npz'))
+    route_table.save(file_name)
+
+    solver.turn_costs[False][2][2] = 3
+    with pytest.raises(ValueError):
+        create_route_table(solver).load(file_name)
@@ -58,4 +58,20 @@ def test_full_bingo():
     for color in range(1, 8+1):
         rule_book = create_rule_book(color)
         assert color not in rule_book.full_bingo()
-        assert 7 == len(rule_book.full_bingo())
\ No newline at end of file
+        assert 7 == len(rule_book.full_bingo())
+
+def test_candidate_quotas():
+    # 3番サークルは、シングルビンゴの候補のうち2つに含まれる
+    rule_book = create_rule_book(3)
+    assert [[1, 2], [5, 8]] == rule_book.candidate_quotas(Bingo.SINGLE_BINGO)
+    for bingo in Bingo:
+        for quota in rule_book.candidate_quotas(bingo):
+            assert 3 not in quota
+    # 最初の候補が運搬するブロックサークル番号になる
+    assert rule_book.candidate_quotas(Bingo.DOUBLE_BINGO)[0] == rule_book.double_bingo()
+
+
+def test_init_with_quota():
+    block_circle = BlockCirclesCoordinate(True, 1, 3, 6)
+    rule_book = RuleBook(block_circle, CrossCirclesCoordinate(), Bingo.SINGLE_BINGO, [5, 8])
+    assert [5, 8] == rule_book.get_quota()
@@ -0,0 +1,229 @@
+"""
+@file: AsyncBluetooth.py
+@author: Tatsumi0000
+@brief: Bluetoothの読み書きをasyncioから待てるようにする
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import serial
+from Bluetooth import Bluetooth
+
+
+class AsyncBluetooth:
+    """
+    Bluetoothのブロッキングする読み書きを専用のスレッドで実行し，asyncioのイベントループから待てるようにするクラス
+    シリアルポートへのアクセスは1つのスレッドで順番に行うので，読み書きが混ざらない
+    データを待つときは，短い時間ずつ区切って待つ（待っている間も，接続確認やコマンドの送信を割り込ませられる）
+    """
+    HELLO = Bluetooth.HELLO  # 走行体への接続確認
+    CONNECTED = Bluetooth.CONNECTED  # 走行体からの接続確認の応答
+    START = Bluetooth.START  # 走行体からの開始の合図
+    ACK_TIMEOUT = Bluetooth.ACK_TIMEOUT  # ACKを待つ時間（単位は秒）
+    SLICE = 0.5  # データを待つときに，専用のスレッドで1回に待つ時間の上限（単位は秒）
+
+    def __init__(self, bt=None):
+        """
+        :param bt: Bluetooth
+            読み書きに使うBluetooth（Noneの場合は生成する）
+        """
+        self.bt = bt if bt is not None else Bluetooth()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # 再接続に使う接続先
+        self.port = None
+        self.baud = 115200
+        self.timeout = 5
+
+    async def _call(self, func, *args, cancellable=False):
+        """
+        ブロッキングする関数を専用のスレッドで実行し，終わるまで待つ
+        待っている間にキャンセルされた場合は，関数が終わってからキャンセルする（関数が読み込みを続けたまま，次に届いたデータを読んで捨てないようにする）
+
+        :param cancellable: bool
+            関数がcancelled（threading.Event）を受け取るか．受け取る場合は，キャンセルされたときにセットして関数をすぐに終わらせる
+        """
+        cancelled = threading.Event()
+        if cancellable:
+            func = functools.partial(func, cancelled=cancelled)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func, *args)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancelled.set()
+            await asyncio.wait([future])
+            raise
+
+    async def _call_with_reconnect(self, func, *args, cancellable=False):
+        """
+        ブロッキングする関数を専用のスレッドで実行する．接続が切れていた場合は接続し直してから，もう一度実行する
+        """
+        try:
+            return await self._call(func, *args, cancellable=cancellable)
+        except serial.SerialException:
+            if self.port is None:
+                raise
+            await self.reconnect()
+            return await self._call(func, *args, cancellable=cancellable)
+
+    async def connect(self, port, baud=115200, timeout=5, retry_interval=3, attempts=None):
+        """
+        接続できるまで接続を試みる
+
+        :param port: str
+            接続するポート番号
+        :param baud: int
+            ボーレート（デフォルトは115200）
+        :param timeout: int
+            読み込みのタイムアウトの時間（単位は秒）
+        :param retry_interval: float
+            接続に失敗したときに，次に接続を試みるまでの時間（単位は秒）
+        :param attempts: int
+            接続を試みる回数の上限（Noneの場合は接続できるまで試みる）
+        """
+        self.port = port
+        self.baud = baud
+        self.timeout = timeout
+        attempt = 0
+        while True:
+            try:
+                await self._call(self.bt.open, port, baud, timeout)
+                print("BT: 接続成功ｷﾀ——(ﾟ∀ﾟ)——!!")
+                return
+            except serial.SerialException:
+                attempt += 1
+                if attempts is not None and attempt >= attempts:
+                    raise
+                await asyncio.sleep(retry_interval)
+
+    async def reconnect(self, retry_interval=3, attempts=None):
+        """
+        切断してから，前回と同じ接続先に接続し直す
+
+        :param retry_interval: float
+            接続に失敗したときに，次に接続を試みるまでの時間（単位は秒）
+        :param attempts: int
+            接続を試みる回数の上限（Noneの場合は接続できるまで試みる）
+        """
+        print("BT: 接続し直します")
+        await self._call(self.bt.close)
+        await self.connect(self.port, self.baud, self.timeout, retry_interval, attempts)
+
+    async def read(self):
+        """
+        1バイト受け取る．接続が切れていた場合は接続し直してから受け取る
+
+        :return: 受け取ったデータ（タイムアウトした場合は0）
+        """
+        return await self._call_with_reconnect(self.bt.read)
+
+    async def write(self, int_value, is_print=False):
+        """
+        1バイト送る．接続が切れていた場合は接続し直してから送る
+
+        :param int_value: int
+            送るデータ
+        :param is_print: bool
+            送るデータを表示するか
+        """
+        await self._call_with_reconnect(self.bt.write, int_value, is_print)
+
+    async def write_commands(self, payload, framed=True, interval=0.5, retries=3, ack_timeout=Bluetooth.ACK_TIMEOUT,
+                             is_print=False):
+        """
+        コマンドを接続確認で決めた送信方式で送る（Bluetooth.write_commandsを参照）
+        1フレーム（1バイトずつ送る場合は1バイト）ごとに送るので，接続が切れた場合は接続し直して，送れなかったところから送り直す
+        （フレームの通し番号は変わらないので，走行体が受け取っていたフレームを再送しても2回実行されない）
+
+        :param payload: bytes or str
+            送るコマンド
+        :param framed: bool
+            走行体が対応している場合に，フレームにまとめて送るか（Falseの場合は1バイトずつ送る）
+        :param interval: float
+            1バイトずつ送る場合に，1バイト送るごとに待つ時間（単位は秒）
+        :param retries: int
+            1フレームあたりの送信回数の上限
+        :param ack_timeout: float
+            1回送るごとにACKを待つ時間（単位は秒）
+        :param is_print: bool
+            送るデータを表示するか
+        """
+        if isinstance(payload, str):
+            payload = payload.encode('ascii')
+        size = Bluetooth.MAX_PAYLOAD if framed and self.bt.framed else 1
+        for start in range(0, len(payload), size):
+            await self._call_with_reconnect(self.bt.write_commands, payload[start:start + size], framed, interval,
+                                            retries, ack_timeout, is_print)
+
+    async def wait_for(self, code, timeout=None):
+        """
+        指定したデータを受け取るまで待つ
+        待つ時間を過ぎたりキャンセルされたりしたら，専用のスレッドでの読み込みも止める（あとから届いたデータを読んで捨てない）
+
+        :param code: int
+            待つデータ
+        :param timeout: float
+            待つ時間の上限（単位は秒，Noneの場合は受け取るまで待つ）．超えた場合はasyncio.TimeoutErrorを送出する
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = self.SLICE if deadline is None else min(self.SLICE, deadline - loop.time())
+            if wait <= 0:
+                raise asyncio.TimeoutError()
+            if await self._call_with_reconnect(self.bt.wait_for, (code,), wait, cancellable=True) == code:
+                return
+
+    async def handshake(self, interval=1, timeout=None, reply_timeout=1.0):
+        """
+        走行体から応答があるまで，接続確認を送り続ける．応答によって，フレーム転送を使うかが決まる（Bluetooth.helloを参照）
+
+        :param interval: float
+            応答がなかったときに，次に接続確認を送るまでの時間（単位は秒）
+        :param timeout: float
+            待つ時間の上限（単位は秒，Noneの場合は応答があるまで待つ）．超えた場合はasyncio.TimeoutErrorを送出する
+        :param reply_timeout: float
+            1回の接続確認で応答を待つ時間（単位は秒）
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = reply_timeout if deadline is None else min(reply_timeout, deadline - loop.time())
+            if wait <= 0:
+                raise asyncio.TimeoutError()
+            if await self._call_with_reconnect(self.bt.hello, wait, cancellable=True):
+                print("SYS: Success! Connected ev3" + (" (framed)" if self.bt.framed else ""))
+                return
+            await asyncio.sleep(interval if deadline is None else max(0, min(interval, deadline - loop.time())))
+
+    async def heartbeat(self, interval=5, reply_timeout=1.0, misses=3):
+        """
+        キャンセルされるまで，接続確認を定期的に送る．misses回続けて応答がなければ，接続が切れたとみなして接続し直す
+        （接続確認のあとで何も読み書きしない間に接続が切れても，コマンドを送る前に気づけるようにする）
+        走行体は，開始の合図を送る前でも後でも接続確認に応答する
+
+        :param interval: float
+            接続確認を送る間隔（単位は秒）
+        :param reply_timeout: float
+            1回の接続確認で応答を待つ時間（単位は秒）
+        :param misses: int
+            接続し直すまでに，続けて応答がなかった回数
+        """
+        missed = 0
+        while True:
+            await asyncio.sleep(interval)
+            if await self._call_with_reconnect(self.bt.hello, reply_timeout, cancellable=True):
+                missed = 0
+                continue
+            missed += 1
+            if missed >= misses and self.port is not None:
+                await self.reconnect()
+                missed = 0
+
+    def close(self):
+        """
+        切断して，読み書きに使うスレッドを終了する
+        """
+        self.executor.shutdown()
+        self.bt.close()
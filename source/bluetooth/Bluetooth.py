@@ -9,6 +9,18 @@ import time
 
 
 class Bluetooth:
+    # 走行体との接続確認で使うコード
+    HELLO = 0  # 走行体への接続確認
+    CONNECTED = 1  # 走行体からの接続確認の応答（フレーム転送に対応していない走行体）
+    START = 2  # 走行体からの開始の合図
+    CONNECTED_FRAMED = 3  # 走行体からの接続確認の応答（フレーム転送に対応している走行体）
+    # フレーム転送で使う制御コード
+    FRAME_HEADER = 0x02  # フレームの先頭(STX)
+    ACK = 0x06  # 受信成功（続けて受け取ったフレームの通し番号を1バイト返す）
+    NACK = 0x15  # 受信失敗（チェックサムが一致しないなど）
+    MAX_PAYLOAD = 255  # 1フレームで送れるデータの最大バイト数（長さを1バイトで表すため）
+    ACK_TIMEOUT = 0.2  # ACKを待つ時間（単位は秒）
+
     def __init__(self):
         """コンストラクタ
         """
@@ -16,6 +28,9 @@ class Bluetooth:
         # ポートが開いていたら一旦閉じる．開いているのに開こうとするとだめなので．
         if self.ser.is_open:
             self.ser.close()
+        self.framed = False  # 走行体がフレーム転送に対応しているか（接続確認の応答で決まる）
+        self.seq = 0  # 次に送るフレームの通し番号（0と1を交互に使う）
+        self.pending = set()  # 別のデータを待っている間に届いた開始の合図（次に待つときに受け取る）
 
     def connect(self, port, baud=115200, timeout=5):
         """
@@ -28,15 +43,11 @@ class Bluetooth:
         :param timeout: int
             タイムアウトの時間（単位は秒）
         """
-        self.ser.port = port
-        self.ser.baudrate = baud
-        self.ser.timeout = timeout
-
         # 接続していない場合
         print("BT: ちょいまちこ")
         while not self.ser.is_open:
             try:
-                self.ser.open()
+                self.open(port, baud, timeout)
             except serial.SerialException:
                 # print("すこし待ってね⊂二二二（ ＾ω＾）二⊃ﾌﾞｰﾝ")
                 time.sleep(3)  # 3秒後に接続リトライ
@@ -46,6 +57,29 @@ class Bluetooth:
 
         print("BT: 接続成功ｷﾀ——(ﾟ∀ﾟ)——!!")
 
+    def open(self, port, baud=115200, timeout=5):
+        """
+        1回だけ接続を試みる（接続できなかった場合はserial.SerialExceptionを送出する）
+
+        :param port: str
+            接続するポート番号
+        :param baud: int
+            ボーレート（デフォルトは115200）
+        :param timeout: int
+            タイムアウトの時間（単位は秒）
+        """
+        self.ser.port = port
+        self.ser.baudrate = baud
+        self.ser.timeout = timeout
+        self.ser.open()
+
+    def close(self):
+        """
+        切断する
+        """
+        if self.ser.is_open:
+            self.ser.close()
+
     def read(self):
         """
         シリアル通信でデータを受け取るメソッド
@@ -64,6 +98,191 @@ class Bluetooth:
             print(f'{chr(int_value)}({int_value})を送信')
         self.ser.write(self.convert_to_byte(int_value, 1, "big"))
 
+    def hello(self, timeout=None, cancelled=None):
+        """
+        接続確認を1回送り，走行体の応答からフレーム転送に対応しているかを決めるメソッド
+        フレーム転送に対応している走行体は3を，対応していない走行体は1を返す
+        :param timeout: float
+            応答を待つ時間（単位は秒，Noneの場合はシリアルポートのタイムアウトの時間）
+        :param cancelled: threading.Event
+            セットされたら応答を待つのをやめる
+        :return: bool 応答があればTrue
+        """
+        self.write(self.HELLO, is_print=False)
+        reply = self.wait_for((self.CONNECTED, self.CONNECTED_FRAMED),
+                              self.ser.timeout if timeout is None else timeout, cancelled=cancelled)
+        if reply is None:
+            return False
+        self.framed = reply == self.CONNECTED_FRAMED
+        # 走行体は接続確認を受け取ると通し番号を初期化する
+        self.seq = 0
+        return True
+
+    def wait_for(self, codes, timeout=None, poll=0.1, cancelled=None):
+        """
+        指定したデータのどれかを受け取るまで，短いタイムアウトで読み込みを繰り返すメソッド
+        待つ時間を過ぎたら読み込みをやめるので，待つのをやめたあとに届いたデータを読んで捨てることはない
+        それ以外のデータは読み捨てる（開始の合図だけは，次に待つときのために残しておく）
+        :param codes: tuple
+            待つデータ
+        :param timeout: float
+            待つ時間の上限（単位は秒，Noneの場合は受け取るまで待つ）
+        :param poll: float
+            1回の読み込みで待つ時間（単位は秒）
+        :param cancelled: threading.Event
+            セットされたら，次の読み込みの前に待つのをやめる
+        :return: 受け取ったデータ（タイムアウトした場合やcancelledがセットされた場合はNone）
+        """
+        for code in codes:
+            if code in self.pending:
+                self.pending.discard(code)
+                return code
+        deadline = None if timeout is None else time.monotonic() + timeout
+        saved = self.ser.timeout
+        try:
+            while cancelled is None or not cancelled.is_set():
+                remaining = poll if deadline is None else min(poll, deadline - time.monotonic())
+                if remaining <= 0:
+                    return None
+                self.ser.timeout = remaining
+                data = self.ser.read()
+                if not data:
+                    continue
+                if data[0] in codes:
+                    return data[0]
+                if data[0] == self.START:
+                    self.pending.add(data[0])
+            return None
+        finally:
+            self.ser.timeout = saved
+
+    def write_frame(self, payload, retries=3, ack_timeout=ACK_TIMEOUT, is_print=True):
+        """
+        データをフレーム（先頭, 通し番号, 長さ, データ, チェックサム）にまとめて1回のwriteで送り，
+        同じ通し番号のACKが返ってくるまで再送するメソッド
+        データが255バイトを超える場合は，複数のフレームに分けて送る
+        接続確認でフレーム転送に対応していると応答した走行体にだけ使う（対応していない走行体はフレームをコマンドとして受け取ってしまう）
+        :param payload: bytes or str
+            送るデータ
+        :param retries: int
+            1フレームあたりの送信回数の上限
+        :param ack_timeout: float
+            1回送るごとにACKを待つ時間（単位は秒）
+        :param is_print: bool
+            送ったフレームを表示するか
+        :return: bool すべてのフレームでACKを受け取ったらTrue
+        """
+        if isinstance(payload, str):
+            payload = payload.encode('ascii')
+        for start in range(0, len(payload), self.MAX_PAYLOAD):
+            frame = self.make_frame(payload[start:start + self.MAX_PAYLOAD], self.seq)
+            for _ in range(retries):
+                if is_print:
+                    print(f'{frame}を送信')
+                self.ser.write(frame)
+                self.ser.flush()
+                # NACKやタイムアウトの場合は再送する．走行体は同じ通し番号のフレームを実行せずにACKだけ返し直す
+                if self.wait_ack(self.seq, ack_timeout):
+                    break
+            else:
+                return False
+            self.seq ^= 1
+        return True
+
+    def wait_ack(self, seq, timeout):
+        """
+        指定した通し番号のACKを待つメソッド．遅れて届いた前のフレームのACKは読み捨てる
+        :param seq: int
+            送ったフレームの通し番号
+        :param timeout: float
+            待つ時間の上限（単位は秒）
+        :return: bool ACKを受け取ったらTrue（NACKを受け取った場合やタイムアウトした場合はFalse）
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            reply = self.wait_for((self.ACK, self.NACK), deadline - time.monotonic())
+            if reply != self.ACK:
+                return False
+            if self.wait_for((0, 1), deadline - time.monotonic()) == seq:
+                return True
+
+    def write_commands(self, payload, framed=True, interval=0.5, retries=3, ack_timeout=ACK_TIMEOUT, is_print=True):
+        """
+        コマンドを，接続確認で決めた送信方式で送るメソッド
+        フレーム転送は，走行体が対応していると応答した場合だけ使う（対応していない走行体は，フレームの各バイトをコマンドとして受け取ってしまう）
+        フレーム転送に対応した走行体はフレームの外のデータを読み捨てるので，ACKが返ってこなくても1バイトずつ送り直さない
+        :param payload: bytes or str
+            送るコマンド
+        :param framed: bool
+            走行体が対応している場合に，フレームにまとめて送るか（Falseの場合は1バイトずつ送る）
+        :param interval: float
+            1バイトずつ送る場合に，1バイト送るごとに待つ時間（単位は秒）
+        :param retries: int
+            1フレームあたりの送信回数の上限
+        :param ack_timeout: float
+            1回送るごとにACKを待つ時間（単位は秒）
+        :param is_print: bool
+            送るデータを表示するか
+        """
+        if not (framed and self.framed):
+            self.write_legacy(payload, interval, is_print)
+        elif not self.write_frame(payload, retries, ack_timeout, is_print):
+            raise serial.SerialException('EV3 did not acknowledge the frame!')
+
+    def write_legacy(self, payload, interval=0.5, is_print=True):
+        """
+        フレーム転送に対応していない走行体のために，1バイトずつ間隔をあけて送るメソッド
+        :param payload: bytes or str
+            送るデータ
+        :param interval: float
+            1バイト送るごとに待つ時間（単位は秒）
+        :param is_print: bool
+            送るデータを表示するか
+        """
+        if isinstance(payload, str):
+            payload = payload.encode('ascii')
+        for int_value in payload:
+            self.write(int_value, is_print=is_print)
+            time.sleep(interval)
+
+    @classmethod
+    def make_frame(cls, payload, seq=0):
+        """
+        データをフレーム（先頭, 通し番号, 長さ, データ, チェックサム）に変換する
+        :param payload: bytes
+            送るデータ（255バイト以下）
+        :param seq: int
+            フレームの通し番号（0か1）
+        :return: bytes フレーム
+        """
+        if len(payload) > cls.MAX_PAYLOAD:
+            raise ValueError('payload is too long!')
+        body = cls.convert_to_byte(seq, 1, "big") + cls.convert_to_byte(len(payload), 1, "big") + bytes(payload)
+        return cls.convert_to_byte(cls.FRAME_HEADER, 1, "big") + body + cls.convert_to_byte(cls.checksum(body), 1, "big")
+
+    @classmethod
+    def parse_frame(cls, frame):
+        """
+        フレームからデータを取り出す（走行体側の受信処理と同じ）
+        :param frame: bytes
+            受け取ったフレーム
+        :return: tuple (通し番号, データ)
+        """
+        if len(frame) < 4 or frame[0] != cls.FRAME_HEADER or len(frame) != frame[2] + 4:
+            raise ValueError('frame is broken!')
+        if cls.checksum(frame[1:-1]) != frame[-1]:
+            raise ValueError('checksum is invalid!')
+        return (frame[1], bytes(frame[3:-1]))
+
+    @staticmethod
+    def checksum(data):
+        """
+        チェックサム（通し番号，長さ，データの各バイトの和の下位8bit）を計算する
+        :param data: bytes
+        :return: int チェックサム
+        """
+        return sum(data) & 0xFF
+
     @staticmethod
     def convert_to_byte(convert_data, byte_size, byte_order):
         """
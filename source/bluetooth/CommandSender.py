@@ -0,0 +1,101 @@
+"""
+@file: CommandSender.py
+@author: Tatsumi0000
+@brief: 計算できたコマンドから順に、別スレッドで走行体へ送信する
+"""
+import asyncio
+import queue
+import threading
+import serial
+
+
+class CommandSender(threading.Thread):
+    """
+    運搬経路の計算（生産者）とコマンドの送信（消費者）をキューでつなぐスレッド
+    黒ブロック運搬のコマンドを送っている間に、ブロックビンゴの運搬経路を計算できる
+    AsyncBluetoothとイベントループを渡した場合は，イベントループでコマンドを送る（読み書きを専用のスレッドで順番に行い，接続が切れたら接続し直す）
+    """
+    TERMINATOR = '#'  # 終了コード
+    ABORT = '!'  # 中止コード（走行体は受け取ったコマンドを捨てて，運搬を始めない）
+
+    def __init__(self, bt, framed=True, interval=0.5, retries=3, ack_timeout=None, is_print=False, loop=None):
+        """
+        :param bt: Bluetooth or AsyncBluetooth
+            走行体と接続したBluetooth（loopを渡す場合はAsyncBluetooth）
+        :param framed: bool
+            走行体がフレーム転送に対応していると応答した場合に，コマンドをフレームにまとめて送るか（Falseの場合は1バイトずつ送る）
+        :param interval: float
+            1バイトずつ送る場合に、1バイト送るごとに待つ時間（単位は秒）
+        :param retries: int
+            1フレームあたりの送信回数の上限
+        :param ack_timeout: float
+            1回送るごとにACKを待つ時間（単位は秒，Noneの場合はBluetooth.ACK_TIMEOUT）
+        :param is_print: bool
+            送るデータを表示するか
+        :param loop: asyncio.AbstractEventLoop
+            AsyncBluetoothの読み書きを行うイベントループ（別のスレッドで動いているもの）
+        """
+        super().__init__(daemon=True)
+        self.bt = bt
+        self.framed = framed
+        self.interval = interval
+        self.retries = retries
+        self.ack_timeout = ack_timeout if ack_timeout is not None else bt.ACK_TIMEOUT
+        self.is_print = is_print
+        self.loop = loop
+        self.segments = queue.Queue()
+        self.sent = []  # 送信したコマンドの文字列（送信した順）
+        self.error = None  # 送信に失敗した場合の例外
+        self.aborted = threading.Event()  # 中止するときにセットする
+
+    def put(self, commands):
+        """
+        送信するコマンドをキューに追加する（呼び出し元はすぐに次の計算に戻れる）
+        :param commands: list or str
+            コマンドのリスト
+        """
+        self.segments.put(''.join(commands))
+
+    def close(self):
+        """
+        すべてのコマンドを追加し終えたことを知らせる．キューに残ったコマンドを送ったあとで終了コードを送信する
+        """
+        self.segments.put(None)
+
+    def abort(self):
+        """
+        運搬経路の計算に失敗したことを知らせる．キューに残ったコマンドは送らずに，終了コードの代わりに中止コードを送信する
+        （途中まで送ったコマンドを，走行体が終了コードを待ったまま持ち続けないようにするため）
+        """
+        self.aborted.set()
+        self.segments.put(None)
+
+    def run(self):
+        try:
+            while True:
+                segment = self.segments.get()
+                if self.aborted.is_set():
+                    print("SYS: コマンドの送信を中止します")
+                    self.send(self.ABORT)
+                    return
+                if segment is None:
+                    self.send(self.TERMINATOR)
+                    return
+                if len(segment) > 0:
+                    self.send(segment)
+        except serial.SerialException as e:
+            print(f"SYS: コマンドの送信に失敗しました({e})")
+            self.error = e
+
+    def send(self, payload):
+        """
+        コマンドを接続確認で決めた送信方式で送信する（Bluetooth.write_commandsを参照）
+        :param payload: str
+            送るコマンドの文字列
+        """
+        args = (payload, self.framed, self.interval, self.retries, self.ack_timeout, self.is_print)
+        if self.loop is None:
+            self.bt.write_commands(*args)
+        else:
+            asyncio.run_coroutine_threadsafe(self.bt.write_commands(*args), self.loop).result()
+        self.sent.append(payload)
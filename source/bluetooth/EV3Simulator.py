@@ -0,0 +1,196 @@
+"""
+@file: EV3Simulator.py
+@author: Tatsumi0000
+@brief: 走行体(EV3)の代わりに，疑似端末でカメラシステムと通信する
+"""
+import os
+import random
+import select
+import threading
+import time
+import tty
+from Bluetooth import Bluetooth
+
+
+class EV3Simulator(threading.Thread):
+    """
+    疑似端末(pty)の片側で走行体の通信プログラムと同じように応答するスレッド
+    もう片側(port)をBluetooth.connectに渡すと，走行体なしで通信を試せる
+        0: 接続確認 -> 1を返す（フレーム転送に対応している場合は3を返し，フレームの通し番号を初期化する）
+        send_start(): 開始の合図として2を送る
+        フレーム（Bluetooth.make_frame）: チェックサムが一致すればACKと通し番号，一致しなければNACKを返す
+            直前に受け取ったフレームと同じ通し番号のフレーム（再送されたフレーム）は，実行せずにACKだけ返し直す
+        それ以外の文字: 1文字ずつ受け取ったコマンド（フレーム転送の場合は，次のフレームの先頭まで読み捨てる）
+        #: コマンドの終了コード
+        !: コマンドの中止コード（それまでに受け取ったコマンドを捨てる）
+    """
+    HELLO = Bluetooth.HELLO  # 走行体への接続確認
+    CONNECTED = Bluetooth.CONNECTED  # 走行体からの接続確認の応答
+    CONNECTED_FRAMED = Bluetooth.CONNECTED_FRAMED  # フレーム転送に対応している走行体からの接続確認の応答
+    START = Bluetooth.START  # 走行体からの開始の合図
+    TERMINATOR = ord('#')  # 終了コード
+    ABORT = ord('!')  # 中止コード
+
+    def __init__(self, framed=True, latency=0.0, loss=0.0, seed=None, frame_timeout=0.2, reply_loss=0.0, jitter=0.0):
+        """
+        :param framed: bool
+            フレーム転送に対応した走行体として振る舞うか（Falseの場合は，すべての文字をコマンドとして受け取る）
+        :param latency: float
+            応答を返すまでの遅延（単位は秒）
+        :param loss: float
+            受け取った1バイトを取りこぼす確率
+        :param seed: int
+            取りこぼしと応答の遅れを決める乱数のシード
+        :param frame_timeout: float
+            フレームの途中でデータが届かなくなってから，NACKを返すまでの時間（単位は秒）
+        :param reply_loss: float
+            応答（ACKと通し番号，NACK，接続確認の応答）が届かない確率
+        :param jitter: float
+            応答ごとに，latencyに加えてランダムに遅らせる時間の上限（単位は秒）
+        """
+        super().__init__(daemon=True)
+        self.framed = framed
+        self.latency = latency
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.frame_timeout = frame_timeout
+        self.reply_loss = reply_loss
+        self.jitter = jitter
+        self.lost_replies = 0  # 届かなかった応答の数
+        (self.master, self.slave) = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)  # Bluetooth.connectに渡すポート
+        self.commands = bytearray()  # 受け取ったコマンド（終了コードを除く）
+        self.received_bytes = 0  # 取りこぼさずに受け取ったバイト数
+        self.hellos = 0  # 受け取った接続確認の数
+        self.frames = 0  # ACKを返したフレームの数（再送されたフレームを除く）
+        self.duplicates = 0  # 実行せずにACKを返し直した，再送されたフレームの数
+        self.last_seq = None  # 直前に受け取ったフレームの通し番号
+        self.nacks = 0  # NACKを返したフレームの数
+        self.discarded = 0  # フレームの外で読み捨てたバイト数
+        self.completed = threading.Event()  # 終了コードを受け取ったらセットする
+        self.completed_at = None  # 終了コードを受け取った時刻（time.perf_counter）
+        self.aborted = threading.Event()  # 中止コードを受け取ったらセットする
+        self.buffer = bytearray()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            data = self.receive(0.05)
+            if data is None:
+                continue
+            self.buffer += data
+            self.handle()
+
+    def receive(self, timeout):
+        """
+        受信したデータを返す（取りこぼしたバイトは除く）．timeout秒以内にデータが届かなければNoneを返す
+        """
+        (readable, _, _) = select.select([self.master], [], [], timeout)
+        if not readable:
+            return None
+        try:
+            data = os.read(self.master, 1024)
+        except OSError:
+            return None
+        data = bytes(b for b in data if self.random.random() >= self.loss)
+        self.received_bytes += len(data)
+        return data
+
+    def handle(self):
+        """
+        受信バッファのデータを先頭から処理する
+        """
+        while self.buffer:
+            head = self.buffer[0]
+            if self.framed and head == Bluetooth.FRAME_HEADER:
+                self.handle_frame()
+                continue
+            del self.buffer[0]
+            if head == self.HELLO:
+                self.hellos += 1
+                self.last_seq = None
+                self.reply(self.CONNECTED_FRAMED if self.framed else self.CONNECTED)
+            elif self.framed:
+                # 先頭を取りこぼしたフレームの残りは，コマンドとして受け取らない
+                self.discarded += 1
+            else:
+                self.accept(bytes([head]))
+
+    def handle_frame(self):
+        """
+        受信バッファの先頭のフレームを処理する．フレームがそろっていない場合は，frame_timeout秒まで続きを待つ
+        """
+        deadline = time.perf_counter() + self.frame_timeout
+        while len(self.buffer) < 3 or len(self.buffer) < self.buffer[2] + 4:
+            remaining = deadline - time.perf_counter()
+            data = self.receive(remaining) if remaining > 0 else None
+            if data is None:
+                # 途中のバイトを取りこぼしたフレームは捨てて，再送してもらう
+                self.buffer.clear()
+                self.nack()
+                return
+            self.buffer += data
+        size = self.buffer[2] + 4
+        frame = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        try:
+            (seq, payload) = Bluetooth.parse_frame(frame)
+        except ValueError:
+            self.buffer.clear()
+            self.nack()
+            return
+        self.reply(Bluetooth.ACK, seq)
+        if seq == self.last_seq:
+            # ACKが届かずに再送されたフレームは，もう実行したので受け取らない
+            self.duplicates += 1
+            return
+        self.last_seq = seq
+        self.frames += 1
+        self.accept(payload)
+
+    def accept(self, payload):
+        """
+        受け取ったコマンドを記録する．終了コードを受け取ったら完了にし，中止コードを受け取ったらコマンドを捨てる
+        """
+        for c in payload:
+            if c == self.TERMINATOR:
+                self.completed_at = time.perf_counter()
+                self.completed.set()
+            elif c == self.ABORT:
+                self.commands.clear()
+                self.aborted.set()
+            else:
+                self.commands.append(c)
+
+    def nack(self):
+        self.nacks += 1
+        self.reply(Bluetooth.NACK)
+
+    def reply(self, *int_values):
+        """
+        遅延させてからデータを返す．reply_lossの確率で，応答が届かなかったことにする
+        """
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.random.random() < self.reply_loss:
+            self.lost_replies += 1
+            return
+        os.write(self.master, bytes(int_values))
+
+    def send_start(self):
+        """
+        開始の合図(2)を送る（取りこぼさない）
+        """
+        os.write(self.master, bytes([self.START]))
+
+    def stop(self):
+        """
+        スレッドを終了して，疑似端末を閉じる
+        """
+        self.stopped.set()
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
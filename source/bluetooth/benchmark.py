@@ -0,0 +1,141 @@
+"""
+@file: benchmark.py
+@author: Tatsumi0000
+@brief: EV3Simulatorを相手に，コマンドの送信方式ごとの転送速度を計測する
+"""
+import argparse
+import random
+import time
+from Bluetooth import Bluetooth
+from CommandSender import CommandSender
+from EV3Simulator import EV3Simulator
+
+MODES = ('legacy', 'framed', 'streamed')  # 計測する送信方式
+INSTRUCTIONS = 'abcdefghijklmnopuwxyz'  # ブロックビンゴのコマンドで使う命令
+
+
+def random_commands(length, seed=0):
+    """
+    計測に使うコマンドの文字列を生成する
+    :param length: int
+        コマンドの文字数
+    :param seed: int
+        乱数のシード
+    :return: str コマンドの文字列
+    """
+    rand = random.Random(seed)
+    return ''.join(rand.choice(INSTRUCTIONS) for _ in range(length))
+
+
+def benchmark(mode, commands, latency=0.0, loss=0.0, seed=0, interval=0.5, retries=3, timeout=0.5, wait=10.0,
+              reply_loss=0.0):
+    """
+    EV3Simulatorと接続確認をしてから，コマンドと終了コードを送り，かかった時間を計測する
+    :param mode: str
+        送信方式（legacy: 1バイトずつ送る，framed: 1つのフレームにまとめて送る，streamed: CommandSenderで2つに分けて送る）
+    :param commands: str
+        送るコマンドの文字列
+    :param latency: float
+        走行体が応答を返すまでの遅延（単位は秒）
+    :param loss: float
+        走行体が1バイトを取りこぼす確率
+    :param seed: int
+        取りこぼしを決める乱数のシード
+    :param interval: float
+        1バイトずつ送る場合に，1バイト送るごとに待つ時間（単位は秒）
+    :param retries: int
+        1フレームあたりの送信回数の上限
+    :param timeout: float
+        接続確認の応答とACKを待つ時間（単位は秒）
+    :param wait: float
+        送信し終えてから，走行体が終了コードを受け取るまで待つ時間の上限（単位は秒）
+    :param reply_loss: float
+        走行体の応答（ACKなど）が届かない確率（ACKが届かずに再送したフレームを，走行体が2回実行しないかを確かめる）
+    :return: dict 計測結果
+        bytes_per_sec: 送ったコマンドのバイト数（終了コードを含む）を，走行体が終了コードを受け取るまでの時間で割ったもの
+        last_ack: 最後のACKを受け取るまでの時間（1バイトずつ送る場合はNone）
+        delivered: 走行体が終了コードを受け取るまでの時間（受け取れなかった場合はNone）
+        duplicates: 走行体が実行せずにACKを返し直した，再送されたフレームの数
+        intact: 走行体が受け取ったコマンドが，送ったコマンドと一致したか（取りこぼしや2回実行したコマンドがあればFalse）
+    """
+    if mode not in MODES:
+        raise ValueError('unknown mode: {}'.format(mode))
+    ev3 = EV3Simulator(framed=(mode != 'legacy'), latency=latency, seed=seed)
+    ev3.start()
+    bt = Bluetooth()
+    try:
+        bt.open(ev3.port, timeout=timeout)
+        # 接続確認は取りこぼさないようにして，計測を始める前に済ませる
+        if not bt.hello():
+            raise RuntimeError('EV3Simulator did not respond to hello!')
+        ev3.loss = loss
+        ev3.reply_loss = reply_loss
+
+        payload = commands + CommandSender.TERMINATOR
+        acked = True
+        start = time.perf_counter()
+        if mode == 'legacy':
+            bt.write_legacy(payload, interval=interval, is_print=False)
+        elif mode == 'framed':
+            acked = bt.write_frame(payload, retries=retries, ack_timeout=timeout, is_print=False)
+        else:
+            sender = CommandSender(bt, interval=interval, retries=retries, ack_timeout=timeout)
+            sender.start()
+            half = len(commands) // 2
+            sender.put(commands[:half])
+            sender.put(commands[half:])
+            sender.close()
+            sender.join()
+            acked = sender.error is None
+        sent = time.perf_counter()
+        ev3.completed.wait(wait)
+    finally:
+        bt.close()
+        ev3.stop()
+
+    delivered = ev3.completed_at - start if ev3.completed_at is not None else None
+    return {
+        'mode': mode,
+        'bytes': len(payload),
+        'wire_bytes': ev3.received_bytes,
+        'nacks': ev3.nacks,
+        'lost_replies': ev3.lost_replies,
+        'duplicates': ev3.duplicates,
+        'intact': ev3.completed.is_set() and ev3.commands.decode('ascii') == commands,
+        'last_ack': sent - start if mode != 'legacy' and acked else None,
+        'delivered': delivered,
+        'bytes_per_sec': len(payload) / delivered if delivered else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EV3Simulatorを相手に，コマンドの送信方式ごとの転送速度を計測する')
+    parser.add_argument('--mode', choices=MODES, nargs='*', default=list(MODES), help='計測する送信方式')
+    parser.add_argument('--length', type=int, default=60, help='送るコマンドの文字数')
+    parser.add_argument('--latency', type=float, nargs='*', default=[0.0, 0.01], help='走行体が応答を返すまでの遅延[sec]')
+    parser.add_argument('--loss', type=float, nargs='*', default=[0.0, 0.01], help='走行体が1バイトを取りこぼす確率')
+    parser.add_argument('--reply-loss', type=float, nargs='*', default=[0.0], help='走行体の応答が届かない確率')
+    parser.add_argument('--interval', type=float, default=0.5, help='1バイトずつ送る場合の送信間隔[sec]')
+    parser.add_argument('--retries', type=int, default=3, help='1フレームあたりの送信回数の上限')
+    parser.add_argument('--timeout', type=float, default=0.5, help='接続確認の応答とACKを待つ時間[sec]')
+    parser.add_argument('--repeat', type=int, default=3, help='1つの条件あたりの計測回数')
+    args = parser.parse_args()
+
+    print('mode      latency  loss   reply  bytes/s   last ACK[s]  delivered[s]  NACK  dup  intact')
+    for mode in args.mode:
+        for latency in args.latency:
+            for loss in args.loss:
+                for reply_loss in args.reply_loss:
+                    for seed in range(args.repeat):
+                        result = benchmark(mode, random_commands(args.length, seed), latency, loss, seed,
+                                           args.interval, args.retries, args.timeout, reply_loss=reply_loss)
+                        print('{:<9} {:<8} {:<6} {:<6} {:>8} {:>13} {:>13} {:>5} {:>4}  {}'.format(
+                            mode, latency, loss, reply_loss,
+                            '-' if result['bytes_per_sec'] is None else '{:.1f}'.format(result['bytes_per_sec']),
+                            '-' if result['last_ack'] is None else '{:.4f}'.format(result['last_ack']),
+                            '-' if result['delivered'] is None else '{:.4f}'.format(result['delivered']),
+                            result['nacks'], result['duplicates'], result['intact']))
+
+
+if __name__ == '__main__':
+    main()
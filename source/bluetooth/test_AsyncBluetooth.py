@@ -0,0 +1,93 @@
+"""
+@file: test_AsyncBluetooth.py
+@author: Tatsumi0000
+@brief: AsyncBluetooth.pyをテストするプログラム
+"""
+
+import asyncio
+import pytest
+import serial
+from Bluetooth import Bluetooth
+from AsyncBluetooth import AsyncBluetooth
+
+
+def create_loopback():
+    bt = Bluetooth()
+    bt.ser = serial.serial_for_url('loop://', timeout=0.05)
+    return AsyncBluetooth(bt)
+
+
+def test_wait_for():
+    async_bt = create_loopback()
+    async_bt.bt.ser.write(bytes([0, 1, AsyncBluetooth.START]))
+    asyncio.run(async_bt.wait_for(AsyncBluetooth.START, timeout=1))
+    # 届かないデータを待つとタイムアウトする
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(async_bt.wait_for(AsyncBluetooth.START, timeout=0.2))
+    # タイムアウトしたあとに届いたデータは，次に待つときに受け取れる
+    async_bt.bt.ser.write(bytes([AsyncBluetooth.START]))
+    asyncio.run(async_bt.wait_for(AsyncBluetooth.START, timeout=1))
+    async_bt.close()
+
+
+def test_cancel_wait_for():
+    async_bt = create_loopback()
+
+    async def main():
+        waiting = asyncio.ensure_future(async_bt.wait_for(AsyncBluetooth.START))
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        # キャンセルしたあとに届いたデータは，次に待つときに受け取れる
+        await async_bt.write(AsyncBluetooth.START)
+        await async_bt.wait_for(AsyncBluetooth.START, timeout=1)
+    asyncio.run(main())
+    async_bt.close()
+
+
+def test_handshake():
+    async_bt = create_loopback()
+    # 走行体の応答を先に受信バッファへ入れておく
+    async_bt.bt.ser.write(bytes([Bluetooth.CONNECTED_FRAMED]))
+    asyncio.run(async_bt.handshake(interval=0, timeout=1))
+    # 接続確認が送られ，フレーム転送に対応していると決まる
+    assert bytes([AsyncBluetooth.HELLO]) == async_bt.bt.ser.read(10)
+    assert async_bt.bt.framed
+    async_bt.close()
+
+
+def test_write_commands():
+    async_bt = create_loopback()
+    async_bt.bt.framed = True
+    async_bt.bt.ser.write(bytes([Bluetooth.ACK, 0, Bluetooth.ACK, 1]))
+    # 255バイトを超えるコマンドは，1フレームずつ送る
+    payload = b'a' * 300
+    asyncio.run(async_bt.write_commands(payload))
+    frames = async_bt.bt.ser.read(1000)
+    first = Bluetooth.make_frame(payload[:255], 0)
+    assert first + Bluetooth.make_frame(payload[255:], 1) == frames
+    async_bt.close()
+
+
+def test_concurrent_wait():
+    """
+    データを待っている間も、イベントループで別の処理を実行できることを確認する。
+    """
+    async_bt = create_loopback()
+
+    async def main():
+        waiting = asyncio.ensure_future(async_bt.wait_for(AsyncBluetooth.START, timeout=1))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        await async_bt.write(AsyncBluetooth.START)
+        await waiting
+    asyncio.run(main())
+    async_bt.close()
+
+
+def test_connect_failure():
+    async_bt = AsyncBluetooth()
+    with pytest.raises(serial.SerialException):
+        asyncio.run(async_bt.connect('/dev/not-exist-ev3', retry_interval=0, attempts=2))
+    async_bt.close()
@@ -16,3 +16,98 @@ def bluetooth():
 
 def test_create():
     Bluetooth()
+
+
+def create_loopback():
+    """
+    書き込んだデータをそのまま読み出せる（ループバック）シリアルポートに接続したBluetoothを返す
+    """
+    bt = Bluetooth()
+    bt.ser = serial.serial_for_url('loop://', timeout=0.1)
+    return bt
+
+
+def test_make_frame():
+    frame = Bluetooth.make_frame(b'acu#', 1)
+    assert bytes([Bluetooth.FRAME_HEADER, 1, 4]) + b'acu#' + bytes([(1 + 4 + sum(b'acu#')) & 0xFF]) == frame
+    assert (1, b'acu#') == Bluetooth.parse_frame(frame)
+    assert (0, b'') == Bluetooth.parse_frame(Bluetooth.make_frame(b''))
+    with pytest.raises(ValueError):
+        Bluetooth.make_frame(bytes(256))
+
+
+def test_parse_broken_frame():
+    frame = bytearray(Bluetooth.make_frame(b'acu#'))
+    frame[4] ^= 0x01
+    with pytest.raises(ValueError):
+        Bluetooth.parse_frame(bytes(frame))
+    with pytest.raises(ValueError):
+        Bluetooth.parse_frame(Bluetooth.make_frame(b'acu#')[:-1])
+
+
+def test_hello():
+    bt = create_loopback()
+    # フレーム転送に対応している走行体の応答
+    bt.ser.write(bytes([Bluetooth.CONNECTED_FRAMED]))
+    bt.seq = 1
+    assert bt.hello()
+    assert bt.framed
+    assert 0 == bt.seq
+    # 接続確認が送られている
+    assert bytes([Bluetooth.HELLO]) == bt.ser.read(10)
+
+    # フレーム転送に対応していない走行体の応答（応答以外のデータは読み捨てる）
+    bt.ser.write(bytes([Bluetooth.ACK, 0, Bluetooth.CONNECTED]))
+    assert bt.hello()
+    assert not bt.framed
+    bt.ser.read(10)
+
+    # 応答がない場合
+    assert not bt.hello(timeout=0.1)
+
+
+def test_write_frame_ack():
+    bt = create_loopback()
+    # 走行体が返すACKを先に受信バッファへ入れておく
+    bt.ser.write(bytes([Bluetooth.ACK, 0]))
+    assert bt.write_frame('acu#', is_print=False)
+    # フレームは1回だけ送られ，次のフレームの通し番号が変わる
+    assert Bluetooth.make_frame(b'acu#', 0) == bt.ser.read(100)
+    assert 1 == bt.seq
+
+
+def test_write_frame_nack():
+    bt = create_loopback()
+    # NACKを受け取ったあとは再送し、ACKが返ってこなければFalseになる
+    bt.ser.write(bytes([Bluetooth.NACK]))
+    assert not bt.write_frame('acu#', retries=2, ack_timeout=0.1, is_print=False)
+    assert 0 == bt.seq
+
+
+def test_write_frame_stale_ack():
+    bt = create_loopback()
+    bt.seq = 1
+    # 前のフレームのACK（通し番号0）が遅れて届いても，送ったフレームのACKとはみなさない
+    bt.ser.write(bytes([Bluetooth.ACK, 0]))
+    assert not bt.write_frame('acu#', retries=1, ack_timeout=0.1, is_print=False)
+    bt.ser.read(100)
+    bt.ser.write(bytes([Bluetooth.ACK, 0, Bluetooth.ACK, 1]))
+    assert bt.write_frame('acu#', retries=1, ack_timeout=0.1, is_print=False)
+
+
+def test_write_frame_split():
+    bt = create_loopback()
+    payload = bytes(range(256)) + b'#'
+    bt.ser.write(bytes([Bluetooth.ACK, 0, Bluetooth.ACK, 1]))
+    assert bt.write_frame(payload, is_print=False)
+    # 255バイトを超えるデータは2つのフレームに分けて送られる
+    frames = bt.ser.read(1000)
+    first = Bluetooth.make_frame(payload[:255], 0)
+    assert first == frames[:len(first)]
+    assert (1, payload[255:]) == Bluetooth.parse_frame(frames[len(first):])
+
+
+def test_write_legacy():
+    bt = create_loopback()
+    bt.write_legacy('acu#', interval=0, is_print=False)
+    assert b'acu#' == bt.ser.read(100)
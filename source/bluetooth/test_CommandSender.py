@@ -0,0 +1,83 @@
+"""
+@file: test_CommandSender.py
+@author: Tatsumi0000
+@brief: CommandSender.pyをテストするプログラム
+"""
+
+import serial
+from Bluetooth import Bluetooth
+from CommandSender import CommandSender
+
+
+def create_loopback():
+    bt = Bluetooth()
+    bt.ser = serial.serial_for_url('loop://', timeout=0.1)
+    return bt
+
+
+def test_send_segments():
+    bt = create_loopback()
+    bt.framed = True
+    # 2つのコマンドと終了コードの3フレーム分のACKを先に受信バッファへ入れておく
+    bt.ser.write(bytes([Bluetooth.ACK, 0, Bluetooth.ACK, 1, Bluetooth.ACK, 0]))
+    sender = CommandSender(bt)
+    sender.start()
+    sender.put(['a', 'c', 'o', 'g'])
+    sender.put('uk')
+    sender.close()
+    sender.join(timeout=5)
+
+    assert not sender.is_alive()
+    assert sender.error is None
+    assert ['acog', 'uk', '#'] == sender.sent
+    expected = Bluetooth.make_frame(b'acog', 0) + Bluetooth.make_frame(b'uk', 1) + Bluetooth.make_frame(b'#', 0)
+    assert expected == bt.ser.read(100)
+
+
+def test_send_legacy():
+    bt = create_loopback()
+    sender = CommandSender(bt, framed=False, interval=0)
+    sender.start()
+    sender.put(['a', 'c'])
+    sender.put([])
+    sender.close()
+    sender.join(timeout=5)
+    assert b'ac#' == bt.ser.read(100)
+
+
+def test_abort():
+    bt = create_loopback()
+    sender = CommandSender(bt, framed=False, interval=0)
+    sender.put('ac')
+    sender.abort()
+    sender.put('uk')
+    sender.start()
+    sender.join(timeout=5)
+    # キューに残ったコマンドと終了コードは送らずに，中止コードを送る
+    assert not sender.is_alive()
+    assert ['!'] == sender.sent
+    assert b'!' == bt.ser.read(100)
+
+
+def test_legacy_firmware():
+    bt = create_loopback()
+    # 走行体がフレーム転送に対応していると応答していなければ，フレームを送らずに1バイトずつ送る
+    assert not bt.framed
+    sender = CommandSender(bt, interval=0)
+    sender.send('ac')
+    assert b'ac' == bt.ser.read(100)
+
+
+def test_frame_failure():
+    bt = create_loopback()
+    bt.framed = True
+    # ACKが返ってこない場合は，1バイトずつ送り直さずに送信を止める
+    sender = CommandSender(bt, interval=0, retries=2, ack_timeout=0.05)
+    sender.start()
+    sender.put('ac')
+    sender.put('uk')
+    sender.close()
+    sender.join(timeout=5)
+    assert not sender.is_alive()
+    assert sender.error is not None
+    assert [] == sender.sent
@@ -0,0 +1,220 @@
+"""
+@file: test_EV3Simulator.py
+@author: Tatsumi0000
+@brief: EV3Simulator.pyとbenchmark.pyをテストするプログラム
+"""
+
+import asyncio
+import threading
+import time
+from AsyncBluetooth import AsyncBluetooth
+from Bluetooth import Bluetooth
+from CommandSender import CommandSender
+from EV3Simulator import EV3Simulator
+import benchmark
+
+
+def create_simulator(**kwargs):
+    ev3 = EV3Simulator(**kwargs)
+    ev3.start()
+    bt = Bluetooth()
+    bt.open(ev3.port, timeout=0.5)
+    assert bt.hello()
+    return (ev3, bt)
+
+
+def test_handshake_and_start():
+    (ev3, bt) = create_simulator()
+    async_bt = AsyncBluetooth(bt)
+
+    async def connect():
+        await async_bt.handshake(interval=0, timeout=2)
+        ev3.send_start()
+        await async_bt.wait_for(AsyncBluetooth.START, timeout=2)
+    asyncio.run(connect())
+    async_bt.close()
+    ev3.stop()
+
+
+def test_wait_for_after_timeout():
+    (ev3, bt) = create_simulator()
+    async_bt = AsyncBluetooth(bt)
+
+    async def wait():
+        # タイムアウトしたあとに届いた開始の合図を，読んで捨てない
+        try:
+            await async_bt.wait_for(AsyncBluetooth.START, timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+        ev3.send_start()
+        await async_bt.wait_for(AsyncBluetooth.START, timeout=2)
+    asyncio.run(wait())
+    async_bt.close()
+    ev3.stop()
+
+
+def test_heartbeat():
+    (ev3, bt) = create_simulator()
+    async_bt = AsyncBluetooth(bt)
+
+    async def wait():
+        heartbeat = asyncio.ensure_future(async_bt.heartbeat(interval=0.02, reply_timeout=0.2))
+        await asyncio.sleep(0.2)
+        # 接続確認の応答を待っている間に届いた開始の合図も受け取れる
+        ev3.send_start()
+        await async_bt.wait_for(AsyncBluetooth.START, timeout=2)
+        heartbeat.cancel()
+        try:
+            await heartbeat
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(wait())
+    assert ev3.hellos > 2
+    async_bt.close()
+    ev3.stop()
+
+
+def test_send_through_event_loop():
+    (ev3, bt) = create_simulator()
+    async_bt = AsyncBluetooth(bt)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    # コマンドもイベントループで送る
+    sender = CommandSender(async_bt, loop=loop)
+    sender.start()
+    sender.put('acu')
+    sender.put('kg')
+    sender.close()
+    sender.join(timeout=5)
+    assert ev3.completed.wait(2)
+    assert b'acukg' == bytes(ev3.commands)
+    assert 3 == ev3.frames
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    async_bt.close()
+    ev3.stop()
+
+
+def test_send_frames():
+    (ev3, bt) = create_simulator()
+    sender = CommandSender(bt)
+    sender.start()
+    sender.put(['a', 'c', 'o', 'g'])
+    sender.put('uk')
+    sender.close()
+    sender.join(timeout=5)
+
+    assert ev3.completed.wait(2)
+    assert b'acoguk' == bytes(ev3.commands)
+    assert 3 == ev3.frames
+    bt.close()
+    ev3.stop()
+
+
+def test_abort():
+    (ev3, bt) = create_simulator()
+    sender = CommandSender(bt)
+    sender.start()
+    sender.put('acu')
+    # 途中まで送ったコマンドは，中止コードで走行体に捨ててもらう
+    sender.abort()
+    sender.join(timeout=5)
+    assert ev3.aborted.wait(2)
+    assert not ev3.completed.is_set()
+    assert b'' == bytes(ev3.commands)
+    assert '!' == sender.sent[-1]
+    bt.close()
+    ev3.stop()
+
+
+def test_send_to_legacy_firmware():
+    (ev3, bt) = create_simulator(framed=False)
+    # フレーム転送に対応していない走行体には，フレームを1つも送らない
+    assert not bt.framed
+    sender = CommandSender(bt, interval=0)
+    sender.start()
+    sender.put('acu')
+    sender.put('kg')
+    sender.close()
+    sender.join(timeout=5)
+    assert ev3.completed.wait(2)
+    assert b'acukg' == bytes(ev3.commands)
+    bt.close()
+    ev3.stop()
+
+
+def test_late_ack():
+    (ev3, bt) = create_simulator(latency=0.35)
+    # ACKが遅れて再送しても，走行体は同じフレームを2回実行しない
+    assert bt.write_frame('acu#', ack_timeout=0.3, is_print=False)
+    assert ev3.completed.wait(2)
+    time.sleep(0.5)
+    assert b'acu' == bytes(ev3.commands)
+    assert 1 == ev3.frames
+    assert 1 == ev3.duplicates
+    # 遅れて届いた前のフレームのACKは，次のフレームのACKとみなさない
+    assert bt.write_frame('kg', ack_timeout=0.5, is_print=False)
+    assert b'acukg' == bytes(ev3.commands)
+    bt.close()
+    ev3.stop()
+
+
+def test_send_legacy():
+    (ev3, bt) = create_simulator(framed=False)
+    bt.write_legacy('ac#', interval=0, is_print=False)
+    assert ev3.completed.wait(2)
+    assert b'ac' == bytes(ev3.commands)
+    bt.close()
+    ev3.stop()
+
+
+def test_broken_frame():
+    (ev3, bt) = create_simulator(frame_timeout=0.05)
+    # チェックサムが一致しないフレームにはNACKを返す
+    frame = bytearray(Bluetooth.make_frame(b'ac'))
+    frame[-1] ^= 0xFF
+    bt.ser.write(bytes(frame))
+    assert Bluetooth.NACK == bt.read()
+    # 途中で途切れたフレームにはNACKを返す
+    bt.ser.write(Bluetooth.make_frame(b'ac')[:-1])
+    assert Bluetooth.NACK == bt.read()
+    assert 2 == ev3.nacks
+    assert b'' == bytes(ev3.commands)
+    bt.close()
+    ev3.stop()
+
+
+def test_benchmark_with_loss():
+    # 取りこぼしがあっても，再送によってコマンドがそのまま届く
+    commands = benchmark.random_commands(60)
+    result = benchmark.benchmark('framed', commands, loss=0.02, seed=1, retries=20, timeout=0.3)
+    assert result['intact']
+    assert result['nacks'] > 0
+    assert result['last_ack'] is not None
+    assert result['bytes_per_sec'] > 0
+
+    result = benchmark.benchmark('legacy', commands, interval=0)
+    assert result['intact']
+    assert result['last_ack'] is None
+
+
+def test_benchmark_with_reply_loss():
+    # ACKが届かずに再送しても，走行体は同じフレームを2回実行しない
+    commands = benchmark.random_commands(60)
+    result = benchmark.benchmark('streamed', commands, seed=3, retries=20, timeout=0.1, reply_loss=0.5)
+    assert result['intact']
+    assert result['lost_replies'] > 0
+    assert result['duplicates'] > 0
+    assert result['last_ack'] is not None
+
+
+def test_reply_jitter():
+    (ev3, bt) = create_simulator(jitter=0.2, seed=0)
+    # 応答がランダムに遅れても，遅れて届いた前のフレームのACKを取り違えない
+    for segment in ('ac', 'uk', 'og', '#'):
+        assert bt.write_frame(segment, retries=20, ack_timeout=0.1, is_print=False)
+    assert ev3.completed.wait(2)
+    assert b'acukog' == bytes(ev3.commands)
+    bt.close()
+    ev3.stop()
@@ -5,6 +5,19 @@ import sys
 import numpy as np
 import pytest
 
+# ブロックサークル(b1~b8)と交点サークル(c00~c33)の座標のキー
+BLOCK_CIRCLE_KEYS = ['b' + str(i + 1) for i in range(0, 8)]
+CROSS_CIRCLE_KEYS = ['c' + row + col for col in "0123" for row in "0123"]
+CIRCLE_KEYS = BLOCK_CIRCLE_KEYS + CROSS_CIRCLE_KEYS
+
+# remove_circle_number()のガウシアンフィルタの半径
+BLUR_RADIUS = 9
+# closing()のカーネルの半径
+MORPHOLOGY_RADIUS = 4
+# 各色のHue最小値と最大値
+HUE_LIST = {Color.RED: [0, 15], Color.BLUE: [90, 110],
+            Color.YELLOW: [15, 30], Color.GREEN: [60, 90]}
+
 
 class BlockRecognizer:
     def __init__(self, bonus, is_left):
@@ -28,25 +41,54 @@ class BlockRecognizer:
         return (h, s, v)
 
     def detect_color(self, img):
-        # 各色のHue最小値と最大値
-        hue_list = {Color.RED: [0, 15], Color.BLUE: [90, 110],
-                    Color.YELLOW: [15, 30], Color.GREEN: [60, 90]}
         (h, s, v) = self.convert_to_hsv(img)
-
-        # 黒色の識別
-        if 0 <= v < 40:
-            return Color.BLACK
-        # 白色の識別
-        if 240 <= v < 256:
-            return Color.WHITE
-
-        for (key, value) in hue_list.items():
-            if value[0] <= h < value[1]:
-                return key
-        print(h, s, v)
-        return None
+        color = self.classify_colors(np.array([[h, s, v]]))[0]
+        if color is None:
+            print(h, s, v)
+        return color
         # raise ValueError("値がNoneどすえ")
 
+    def detect_colors(self, imgs):
+        """
+        同じサイズの画像をまとめて色識別する。
+
+        Parameters
+        ----------
+        imgs: numpy.ndarray
+            画像を積み重ねた配列（枚数, 高さ, 横幅, 3）
+
+        Returns
+        -------
+        colors: numpy.ndarray
+            各画像の色(Color)の配列（識別できなかった画像はNone）
+        """
+        (n, height, width) = imgs.shape[:3]
+        # 縦に並べて1枚の画像とみなし、1回の変換ですべての画像をHSVに変換する
+        hsv = cv2.cvtColor(np.ascontiguousarray(imgs).reshape(n * height, width, 3), cv2.COLOR_BGR2HSV)
+        means = hsv.reshape(n, height * width, 3).mean(axis=1)
+        return self.classify_colors(means)
+
+    def classify_colors(self, means):
+        """
+        HSVの平均値から色を識別する。
+
+        Parameters
+        ----------
+        means: numpy.ndarray
+            HSVの平均値の配列（個数, 3）
+
+        Returns
+        -------
+        colors: numpy.ndarray
+            色(Color)の配列（識別できなかったものはNone）
+        """
+        (h, s, v) = means.T
+        # 黒色、白色、各色のHue最小値と最大値の順に判定する
+        conditions = [(0 <= v) & (v < 40), (240 <= v) & (v < 256)]
+        conditions += [(value[0] <= h) & (h < value[1]) for value in HUE_LIST.values()]
+        choices = np.array([Color.BLACK, Color.WHITE] + list(HUE_LIST.keys()) + [None], dtype=object)
+        return choices[np.select(conditions, range(len(conditions)), default=len(conditions))]
+
     def recognize(self, img, circles_coordinates):
         """
         各ブロック・交点サークル上のブロックを認識する
@@ -69,49 +111,105 @@ class BlockRecognizer:
         # ブロックサークルの数字を削除する。画像の周辺のノイズも削除する。
         img = self.extractor.remove_circle_number(img)
 
+        # 各サークルの周辺を切り取る
+        crops = {}
+        for key in CIRCLE_KEYS:
+            crops[key] = self.extractor.trim(img, circles_coordinates[key])
+
+        return self.recognize_crops(crops)
+
+    def recognize_sparse(self, img, mat, circles_coordinates):
+        """
+        台形補正する前の画像から、各サークルの周辺だけを台形補正してブロックを認識する。
+        ブロックビンゴエリア全体を台形補正しないため、recognize()よりも処理が軽い。
+
+        Parameters
+        ----------
+        img: numpy.ndarray
+            カメラでキャプチャした画像（台形補正前）
+
+        mat: numpy.ndarray
+            キャプチャした画像からブロックビンゴエリアの画像への射影変換行列
+
+        circles_coordinates: dict
+            ブロックビンゴエリアの画像におけるブロック・交点サークルの座標
+
+        Returns
+        -------
+        block_circle: BlockCirclesCoordinate
+            ブロックサークルのブロック情報
+        cross_circle: CrossCirclesCoordinate
+            交点サークル上のブロック情報
+        """
+        crops = {}
+        for key in CIRCLE_KEYS:
+            crops[key] = self.extractor.clip_circle(img, mat, circles_coordinates[key])
+
+        return self.recognize_crops(crops)
+
+    def recognize_crops(self, crops):
+        """
+        各サークルの周辺を切り取った画像から、ブロック・交点サークル上のブロックを認識する
+
+        Parameters
+        ----------
+        crops: dict
+            ブロック・交点サークルの周辺を切り取った画像（ノイズ除去済み）
+
+        Returns
+        -------
+        block_circle: BlockCirclesCoordinate
+            ブロックサークルのブロック情報
+        cross_circle: CrossCirclesCoordinate
+            交点サークル上のブロック情報
+        """
+        # 24個のサークルの周辺画像をまとめて色識別する
+        imgs = np.stack([crops[key] for key in CIRCLE_KEYS])
+        colors = self.detect_colors(self.extractor.closing_batch(imgs))
+
         # ブロックサークル上のブロックを識別
-        color, black = self.recognize_block_circle(img, circles_coordinates)
+        color, black = self.recognize_block_circle(colors[:len(BLOCK_CIRCLE_KEYS)])
         block_circle = BlockCirclesCoordinate(self.is_left, self.bonus, color, black)
 
         # クロスサークル上のブロックを識別
-        cross_circle = self.recognize_cross_circle(img, circles_coordinates)
+        cross_circle = self.recognize_cross_circle(colors[len(BLOCK_CIRCLE_KEYS):])
 
         return block_circle, cross_circle
 
-    def recognize_cross_circle(self, img, circles_coordinates):
+    def recognize_cross_circle(self, colors):
+        """
+        Parameters
+        ----------
+        colors: numpy.ndarray
+            CROSS_CIRCLE_KEYSの順に並べた交点サークル上のブロックの色
+        """
         cross_circles = CrossCirclesCoordinate()
-        for col in "0123":
-            for row in "0123":
-                key = 'c' + row + col
-                coordinate = (int(col), int(row))
-                point = circles_coordinates[key]  # 交点サークルの座標
-                crop = self.extractor.trim(img, point)  # 交点サークルの周辺を切り取る
-                color = self.detect_color(self.extractor.closing(crop))  # ブロック識別
-                cross_circles.set_block_color(coordinate, color)  # 認識結果を辞書に格納
+        for (key, color) in zip(CROSS_CIRCLE_KEYS, colors):
+            coordinate = (int(key[2]), int(key[1]))
+            cross_circles.set_block_color(coordinate, color)  # 認識結果を辞書に格納
         return cross_circles
 
-    def recognize_block_circle(self, img, circles_coordinates):
+    def recognize_block_circle(self, colors):
+        """
+        Parameters
+        ----------
+        colors: numpy.ndarray
+            ブロックサークル番号順に並べたブロックサークル上のブロックの色
+        """
         black = None  # 黒ブロックが置かれているブロックサークル番号
         color = None  # カラーブロックが置かれているブロックサークル番号
 
-        # サークル座標のデータ構造からブロックサークルの座標だけ抽出する
-        points = self.extract_block_circles_point(circles_coordinates)
-
-        for (idx, point) in enumerate(points):
-            crop = self.extractor.trim(img, point)
-            # cv2.imshow("crop", crop)
-            # cv2.waitKey(0)
-            # cv2.destroyAllWindows()
-            if Color.BLACK == self.detect_color(self.extractor.closing(crop)):
+        for (idx, block_color) in enumerate(colors):
+            if Color.BLACK == block_color:
                 black = idx + 1
-            elif Color.WHITE != self.detect_color(self.extractor.closing(crop)):
+            elif Color.WHITE != block_color:
                 color = idx + 1
 
         return (color, black)
 
     def extract_block_circles_point(self, circles_coordinates):
         points = []
-        for key in ['b' + str(i + 1) for i in range(0, 8)]:
+        for key in BLOCK_CIRCLE_KEYS:
             points.append(circles_coordinates[key])
         return points
 
@@ -120,6 +218,7 @@ class BlockExtractor():
     def trim(self, img, point, margin=5):
         """
         画像を指定の座標周辺で切り取る。
+        指定座標が画像の端に近い場合も同じ大きさで切り取れるように、切り取る範囲を画像の内側にずらす。
         
         Parameters
         ----------
@@ -130,7 +229,35 @@ class BlockExtractor():
         margin : int
             指定座標の周囲(px)
         """
-        return img[point[1] - margin:point[1] + margin, point[0] - margin:point[0] + margin]
+        (height, width) = img.shape[:2]
+        x = min(max(int(point[0]), margin), width - margin)
+        y = min(max(int(point[1]), margin), height - margin)
+        return img[y - margin:y + margin, x - margin:x + margin]
+
+    def clip_circle(self, img, mat, point, margin=5):
+        """
+        台形補正前の画像から、台形補正後の指定座標周辺だけを台形補正して切り取り、ノイズを除去する。
+        ガウシアンフィルタが周囲の画素を参照するため、その半径分だけ広く台形補正してから切り取る。
+
+        Parameters
+        ----------
+        img : Mat
+            台形補正前の画像
+        mat : numpy.ndarray
+            台形補正前の画像から台形補正後の画像への射影変換行列
+        point : tuple
+            台形補正後の画像における座標
+        margin : int
+            指定座標の周囲(px)
+        """
+        radius = margin + BLUR_RADIUS
+        # 台形補正後の座標系で、切り取る領域の左上が原点になるように平行移動する
+        shift = np.array([[1, 0, radius - int(point[0])],
+                          [0, 1, radius - int(point[1])],
+                          [0, 0, 1]], dtype=np.float64)
+        patch = cv2.warpPerspective(img, shift.dot(mat), (radius * 2, radius * 2))
+        patch = self.remove_circle_number(patch)
+        return self.trim(patch, (radius, radius), margin)
 
     def hsv_decomposition(self, img):
         """
@@ -172,6 +299,46 @@ class BlockExtractor():
         mask = cv2.morphologyEx(img, cv2.MORPH_CLOSE, kernel)
         return mask
 
+    def closing_batch(self, imgs):
+        """
+        同じサイズの画像をまとめてクロージング処理する。画像ごとにclosing()と同じ結果になる。
+
+        Parameters
+        ----------
+        imgs : numpy.ndarray
+            画像を積み重ねた配列（枚数, 高さ, 横幅, 3）
+        """
+        # 矩形カーネルの膨張・収縮は縦方向と横方向に分解できる
+        # 画像の外側は、膨張では0、収縮では255として無視する
+        dilated = self.sliding_filter(self.sliding_filter(imgs, 1, np.maximum, 0), 2, np.maximum, 0)
+        return self.sliding_filter(self.sliding_filter(dilated, 1, np.minimum, 255), 2, np.minimum, 255)
+
+    def sliding_filter(self, imgs, axis, func, pad_value, radius=MORPHOLOGY_RADIUS):
+        """
+        指定した軸に沿って、半径radiusの範囲の最大値(最小値)を求める。
+
+        Parameters
+        ----------
+        imgs : numpy.ndarray
+            画像を積み重ねた配列
+        axis : int
+            フィルタをかける軸
+        func : numpy.ufunc
+            np.maximum または np.minimum
+        pad_value : int
+            画像の外側の画素値
+        radius : int
+            フィルタの半径
+        """
+        pad_width = [(0, 0)] * imgs.ndim
+        pad_width[axis] = (radius, radius)
+        padded = np.pad(imgs, pad_width, mode='constant', constant_values=pad_value)
+        length = imgs.shape[axis]
+        result = padded.take(range(0, length), axis=axis)
+        for offset in range(1, radius * 2 + 1):
+            func(result, padded.take(range(offset, offset + length), axis=axis), out=result)
+        return result
+
     def opening(self, img):
         """
         オープニング処理する。
@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 
 from BlockRecognizer import BlockRecognizer
 from block_bingo.BlockBingoCoordinate import Color
@@ -65,3 +66,68 @@ def test_result1():
     for row in range(4):
         for col in range(4):
             assert cc.cross_circles[col][row] == result1_cc_blocks[col][row]
+
+
+def test_recognize_sparse():
+    circles_coordinates = {
+        'c00': (34, 61), 'c10': (210, 61), 'c20': (393, 56), 'c30': (573, 58),
+        "b1": (122, 153), "b2": (302, 155), "b3": (480, 150),
+        'c01': (36, 243), 'c11': (217, 242), 'c21': (392, 243), 'c31': (577, 241),
+        "b4": (127, 338), "b5": (480, 339),
+        'c02': (43, 425), 'c12': (219, 429), 'c22': (399, 426), 'c32': (572, 427),
+        "b6": (130, 521), "b7": (307, 521), "b8": (481, 520),
+        'c03': (49, 608), 'c13': (227, 606), 'c23': (400, 607), 'c33': (578, 608)
+        }
+
+    recognizer = create_block_recognizer()
+    img = cv2.imread('detection_block/result.png')
+    # 台形補正後の画像を斜めから撮影したような画像を作る
+    src = np.array([[0, 0], [640, 0], [0, 640], [640, 640]], dtype=np.float32)
+    dst = np.array([[300, 200], [900, 150], [200, 800], [1000, 850]], dtype=np.float32)
+    mat = cv2.getPerspectiveTransform(src, dst)
+    frame = cv2.warpPerspective(img, mat, (1280, 1000))
+
+    bc, cc = recognizer.recognize(img, circles_coordinates)
+    sparse_bc, sparse_cc = recognizer.recognize_sparse(frame, np.linalg.inv(mat), circles_coordinates)
+
+    assert (bc.get_black_circle(), bc.get_color_circle()) == \
+        (sparse_bc.get_black_circle(), sparse_bc.get_color_circle())
+    assert (cc.cross_circles == sparse_cc.cross_circles).all()
+
+
+def test_closing_batch():
+    recognizer = create_block_recognizer()
+    imgs = np.random.RandomState(0).randint(0, 256, (24, 10, 10, 3)).astype(np.uint8)
+    expected = np.stack([recognizer.extractor.closing(img) for img in imgs])
+    assert (recognizer.extractor.closing_batch(imgs) == expected).all()
+
+
+def test_detect_colors():
+    recognizer = create_block_recognizer()
+    img = cv2.imread('detection_block/result.png')
+    points = [(34, 61), (122, 153), (217, 242), (480, 339), (399, 426), (578, 608)]
+    imgs = np.stack([recognizer.extractor.trim(img, point) for point in points])
+
+    expected = [recognizer.detect_color(crop) for crop in imgs]
+    assert expected == list(recognizer.detect_colors(imgs))
+
+
+def test_trim_near_edge():
+    recognizer = create_block_recognizer()
+    img = cv2.imread('detection_block/result.png')
+    (height, width) = img.shape[:2]
+    # 画像の端に近い座標でも、同じ大きさで切り取る
+    for point in [(0, 0), (2, 61), (width - 1, height - 3), (34, 61)]:
+        assert (10, 10, 3) == recognizer.extractor.trim(img, point).shape
+
+    circles_coordinates = {
+        'c00': (2, 3), 'c10': (210, 61), 'c20': (393, 56), 'c30': (573, 58),
+        "b1": (122, 153), "b2": (302, 155), "b3": (480, 150),
+        'c01': (36, 243), 'c11': (217, 242), 'c21': (392, 243), 'c31': (577, 241),
+        "b4": (127, 338), "b5": (480, 339),
+        'c02': (43, 425), 'c12': (219, 429), 'c22': (399, 426), 'c32': (572, 427),
+        "b6": (130, 521), "b7": (307, 521), "b8": (481, 520),
+        'c03': (49, 608), 'c13': (227, 606), 'c23': (400, 607), 'c33': (width - 1, height - 1)
+        }
+    bc, cc = recognizer.recognize(img, circles_coordinates)
+    assert (5, 7) == (bc.get_black_circle(), bc.get_color_circle())
@@ -7,12 +7,113 @@
 @brief: 数字カードを認識する
 """
 
+import os
+import time
+import threading
+from concurrent.futures import Future
 import cv2
 import numpy as np
-from MLP import MLP
-from chainer import Chain, serializers
-import chainer.links as L
-import chainer
+from NumpyMLP import NumpyMLP
+
+# 学習済みモデルを読み込んだNumberPredictorのキャッシュ（key: (モデルの絶対パス, 更新時刻)）
+_predictors = {}
+_predictors_lock = threading.Lock()
+
+
+class NumberPredictor:
+    """
+    学習済みモデルだけを持ち、画像を引数で受け取って推論するクラス
+    推論中に書き換える状態を持たないので、複数のスレッドから同時に使える
+    """
+    def __init__(self, model_path='my_model.npz'):
+        """
+        :param model_path: str 学習済みモデルのパス
+        """
+        self.model_path = model_path
+        self.net = NumpyMLP()
+        # 学習済みモデルの読み込み（推論だけなのでchainerは使わない）
+        self.net.load_npz(model_path)
+        # 28x28の画像を入力できるモデルかを確かめる
+        if self.net.weights[0].shape[0] != 784:
+            raise ValueError('学習済みモデルの入力の大きさが784ではありません')
+        # 読み込んだ重みは書き換えない
+        for param in self.net.weights + self.net.biases:
+            param.setflags(write=False)
+
+    @staticmethod
+    def preprocess(img):
+        """
+        数字カードの画像を2値化し、28x28に縮小する
+
+        :param img: numpy.ndarray 数字カードの画像
+        :return: numpy.ndarray 28x28の2値画像
+        """
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, img = cv2.threshold(img, 0, 255, cv2.THRESH_OTSU)
+        # 画像を28x28に縮小
+        return cv2.resize(img, (28, 28))
+
+    def predict(self, img):
+        """
+        1枚の画像の数字と、その確からしさ（ソフトマックス関数の出力）を返す
+
+        :param img: numpy.ndarray 数字カードの画像
+        :return: tuple[int, float] (数字, 確からしさ(0~1))
+        """
+        if img is None:
+            raise FileNotFoundError('数字画像が指定されていません')
+        x = self.preprocess(img).reshape(1, 784).astype(np.float32)
+        prob = softmax(self.net(x))[0]
+        index = int(np.argmax(prob))
+        return index + 1, float(prob[index])
+
+    def detect_number_incrementally(self, imgs, threshold=0.9, max_frames=10, timeout=1.0):
+        """
+        画像を1枚ずつ推論して確率を積み上げ、ある数字の確からしさが閾値を超えた時点で打ち切る。
+        きれいに写っていれば1枚で終わり、紛らわしいときだけ追加の画像を使う
+
+        :param imgs: iterable[numpy.ndarray] 数字カードの画像（必要な分だけ取り出す）
+        :param threshold: float 打ち切る確からしさの閾値
+        :param max_frames: int 推論する画像の最大枚数
+        :param timeout: float 推論にかける最大時間（単位：秒）
+        :return: tuple[int, float] (数字, 確からしさ(0~1))
+        """
+        start = time.time()
+        prob_sum = None
+        count = 0
+        for img in imgs:
+            if img is None:
+                break
+            x = self.preprocess(img).reshape(1, 784).astype(np.float32)
+            prob = softmax(self.net(x))[0]
+            prob_sum = prob if prob_sum is None else prob_sum + prob
+            count += 1
+
+            index = int(np.argmax(prob_sum))
+            confidence = float(prob_sum[index] / count)
+            if confidence >= threshold or count >= max_frames or time.time() - start >= timeout:
+                break
+
+        if count == 0:
+            raise FileNotFoundError('数字画像が指定されていません')
+        return index + 1, confidence
+
+    def get_detect_number_batch(self, imgs):
+        """
+        複数の画像をまとめて1回で推論し、各画像の確率の平均が最も高い数字を返す
+
+        :param imgs: list[numpy.ndarray] 数字カードの画像のリスト
+        :return: tuple[int, float] (数字, 確からしさ(0~1))
+        """
+        if len(imgs) == 0:
+            raise FileNotFoundError('数字画像が指定されていません')
+        # 前処理した画像を(枚数, 784)の行列に詰める
+        x = np.empty((len(imgs), 784), dtype=np.float32)
+        for (i, img) in enumerate(imgs):
+            x[i] = self.preprocess(img).reshape(784)
+        prob = softmax(self.net(x)).mean(axis=0)
+        index = int(np.argmax(prob))
+        return index + 1, float(prob[index])
 
 
 class DetectionNumber:
@@ -21,37 +122,114 @@ class DetectionNumber:
         self.preprocess_img = None
         self.detected_number = None
         self.number_model_path = model_path
-        self.net = L.Classifier(MLP(1000, 10))
+        self.predictor = None
+        self.net = None
         self.data_directory = "data"
         self.img_directory = "imgs"  # 画像を保管するディレクトリ
         self.setup()
 
     def setup(self):
-        # 学習済みモデルの読み込み
-        serializers.load_npz(self.number_model_path, self.net)
-        optimizer = chainer.optimizers.Adam()
-        optimizer.setup(self.net)
+        self.predictor = NumberPredictor(self.number_model_path)
+        self.net = self.predictor.net
 
     def _preprocessing(self, is_save=False):
         if self.origin_img is None:
             raise FileNotFoundError('数字画像が指定されていません')
-        img = cv2.cvtColor(self.origin_img, cv2.COLOR_BGR2GRAY)
-        _, img = cv2.threshold(img, 0, 255, cv2.THRESH_OTSU)
-        # 画像を28x28に縮小
-        img = cv2.resize(img, (28, 28))
+        img = self.preprocess(self.origin_img)
         if is_save:
             cv2.imwrite("./imgs/preprocess.jpg", img)
         img = img.astype(np.float32)
         img = np.array(img).reshape(1, 784)
         self.preprocess_img = img
 
+    @staticmethod
+    def preprocess(img):
+        """
+        数字カードの画像を2値化し、28x28に縮小する（NumberPredictor.preprocessと同じ）
+        """
+        return NumberPredictor.preprocess(img)
+
     def set_img(self, img):
         self.origin_img = img
 
     def get_detect_number(self, is_save=False):
         self._preprocessing(is_save)
-        num = self.net.predictor(self.preprocess_img)
-        return np.argmax(num.data) + 1
+        num = self.net(self.preprocess_img)
+        return np.argmax(num) + 1
+
+    def get_detect_number_with_confidence(self, is_save=False):
+        """
+        数字と、その確からしさ（ソフトマックス関数の出力）を返す
+
+        :param is_save: bool Trueだと前処理した画像を保存する
+        :return: tuple[int, float] (数字, 確からしさ(0~1))
+        """
+        self._preprocessing(is_save)
+        prob = softmax(self.net(self.preprocess_img))[0]
+        index = int(np.argmax(prob))
+        return index + 1, float(prob[index])
+
+    def detect_number_incrementally(self, imgs, threshold=0.9, max_frames=10, timeout=1.0):
+        """
+        NumberPredictor.detect_number_incrementallyと同じ（set_img()で渡した画像は使わない）
+        """
+        return self.predictor.detect_number_incrementally(imgs, threshold, max_frames, timeout)
+
+    def get_detect_number_batch(self, imgs):
+        """
+        NumberPredictor.get_detect_number_batchと同じ（set_img()で渡した画像は使わない）
+        """
+        return self.predictor.get_detect_number_batch(imgs)
+
+
+def softmax(x):
+    """
+    行ごとにソフトマックス関数を計算する
+
+    :param x: numpy.ndarray ネットワークの出力（バッチ数 x 出力数）
+    :return: numpy.ndarray 確率（バッチ数 x 出力数）
+    """
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def get_predictor(model_path='my_model.npz'):
+    """
+    学習済みモデルを読み込んだNumberPredictorを返す。
+    同じモデル（パスと更新時刻が同じ）は1回だけ読み込み、プロセス内で使い回す（複数のスレッドから同時に使ってよい）
+
+    :param model_path: str 学習済みモデルのパス
+    :return: NumberPredictor 画像は推論するメソッドの引数で渡す
+    """
+    path = os.path.abspath(model_path)
+    key = (path, os.path.getmtime(path))
+    with _predictors_lock:
+        if key not in _predictors:
+            # モデルが更新された場合は、古いモデルを捨てる
+            for old_key in [k for k in _predictors if k[0] == path]:
+                del _predictors[old_key]
+            _predictors[key] = NumberPredictor(model_path)
+        return _predictors[key]
+
+
+def warm_up(model_path='my_model.npz'):
+    """
+    学習済みモデルをバックグラウンドで読み込んでおく
+
+    :param model_path: str 学習済みモデルのパス
+    :return: concurrent.futures.Future 読み込んだNumberPredictor（読み込みに失敗した場合は、result()で例外を送出する）
+    """
+    future = Future()
+
+    def load():
+        try:
+            future.set_result(get_predictor(model_path))
+        except Exception as e:
+            # バックグラウンドのスレッドで起きた例外は、result()を呼び出したスレッドで送出する
+            future.set_exception(e)
+
+    threading.Thread(target=load, daemon=True).start()
+    return future
 
 
 def main():
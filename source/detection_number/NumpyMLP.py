@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+@file: NumpyMLP.py
+@author: korosuke613
+@brief: MLP.pyで学習したモデルを、chainerを使わずにNumPyだけで推論する
+"""
+
+import numpy as np
+
+
+class NumpyMLP:
+    def __init__(self, n_layers=3):
+        """
+        :param n_layers: int 全結合層の数（MLP.pyと同じ3層）
+        """
+        self.n_layers = n_layers
+        self.weights = []  # 各層の重み（入力数 x 出力数に転置済み）
+        self.biases = []  # 各層のバイアス
+
+    def load_npz(self, file_name):
+        """
+        chainer.serializers.save_npzで保存したモデルから重みを読み込む
+        L.Classifier(MLP)を保存した場合はキーの先頭に"predictor/"が付くので、付いていてもいなくても読み込める
+
+        :param file_name: str 学習済みモデルのパス
+        """
+        weights = []
+        biases = []
+        with np.load(file_name) as npz:
+            prefix = 'predictor/' if 'predictor/l1/W' in npz.files else ''
+            for i in range(1, self.n_layers + 1):
+                w_key = '{}l{}/W'.format(prefix, i)
+                b_key = '{}l{}/b'.format(prefix, i)
+                if w_key not in npz.files or b_key not in npz.files:
+                    raise ValueError('学習済みモデルに{}の重みがありません'.format(w_key))
+                # chainerのLinearの重みは出力数 x 入力数なので、行列積しやすいように転置しておく
+                weights.append(np.ascontiguousarray(npz[w_key].T, dtype=np.float32))
+                biases.append(np.ascontiguousarray(npz[b_key], dtype=np.float32))
+
+        # 層と層のつながりが正しいかを確かめる
+        for i in range(self.n_layers):
+            if weights[i].shape[1] != biases[i].shape[0]:
+                raise ValueError('l{}の重みとバイアスの大きさが一致しません'.format(i + 1))
+            if i > 0 and weights[i - 1].shape[1] != weights[i].shape[0]:
+                raise ValueError('l{}とl{}の大きさが一致しません'.format(i, i + 1))
+
+        self.weights = weights
+        self.biases = biases
+
+    def forward(self, x):
+        """
+        順伝播する（MLP.forwardと同じ計算）
+
+        :param x: numpy.ndarray 入力（バッチ数 x 入力数）
+        :return: numpy.ndarray 出力（バッチ数 x 出力数）
+        """
+        h = np.asarray(x, dtype=np.float32)
+        for i in range(self.n_layers):
+            h = h.dot(self.weights[i])
+            h += self.biases[i]
+            # 最後の層以外はReLU
+            if i < self.n_layers - 1:
+                np.maximum(h, 0, out=h)
+        return h
+
+    def __call__(self, x):
+        return self.forward(x)
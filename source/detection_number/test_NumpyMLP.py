@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+from NumpyMLP import NumpyMLP
+
+
+def save_model(file_name, sizes=(784, 1000, 1000, 10), prefix='predictor/'):
+    rand = np.random.RandomState(0)
+    params = {}
+    for i in range(len(sizes) - 1):
+        # chainerのLinearと同じく、重みは出力数 x 入力数
+        params[f'{prefix}l{i + 1}/W'] = rand.randn(sizes[i + 1], sizes[i]).astype(np.float32) * 0.1
+        params[f'{prefix}l{i + 1}/b'] = rand.randn(sizes[i + 1]).astype(np.float32)
+    np.savez_compressed(file_name, **params)
+    return params
+
+
+def test_forward(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    params = save_model(file_name, sizes=(784, 20, 20, 10))
+    net = NumpyMLP()
+    net.load_npz(file_name)
+
+    x = np.random.RandomState(1).rand(3, 784).astype(np.float32)
+    h = np.maximum(x.dot(params['predictor/l1/W'].T) + params['predictor/l1/b'], 0)
+    h = np.maximum(h.dot(params['predictor/l2/W'].T) + params['predictor/l2/b'], 0)
+    expected = h.dot(params['predictor/l3/W'].T) + params['predictor/l3/b']
+
+    actual = net(x)
+    assert (3, 10) == actual.shape
+    assert np.float32 == actual.dtype
+    assert np.allclose(expected, actual, rtol=1e-4, atol=1e-4)
+
+
+def test_load_without_prefix(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name, sizes=(784, 20, 20, 10), prefix='')
+    net = NumpyMLP()
+    net.load_npz(file_name)
+    assert (784, 20) == net.weights[0].shape
+
+
+def test_load_invalid_model(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    params = save_model(file_name, sizes=(784, 20, 20, 10))
+    params['predictor/l2/W'] = np.zeros((20, 30), dtype=np.float32)
+    np.savez(file_name, **params)
+    with pytest.raises(ValueError):
+        NumpyMLP().load_npz(file_name)
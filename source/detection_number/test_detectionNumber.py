@@ -1,6 +1,9 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 import pytest
-from DetectionNumber import DetectionNumber
+from DetectionNumber import DetectionNumber, NumberPredictor, get_predictor, warm_up
 import cv2
+import numpy as np
 
 model_path = './detection_number/my_model.npz'
 
@@ -34,3 +37,113 @@ def test_set_img():
     img = cv2.imread("./detection_number/training_scripts/original/1.jpg")
     dn.set_img(img)
     assert dn.get_detect_number(1)
+
+
+def save_model(file_name, sizes=(784, 20, 20, 10)):
+    rand = np.random.RandomState(0)
+    params = {}
+    for i in range(len(sizes) - 1):
+        params[f'predictor/l{i + 1}/W'] = rand.randn(sizes[i + 1], sizes[i]).astype(np.float32)
+        params[f'predictor/l{i + 1}/b'] = rand.randn(sizes[i + 1]).astype(np.float32)
+    np.savez(file_name, **params)
+
+
+def test_get_predictor(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    dn = get_predictor(file_name)
+    # 同じモデルは使い回す
+    assert dn is get_predictor(file_name)
+
+    # モデルが更新されたら読み込み直す
+    stat = os.stat(file_name)
+    os.utime(file_name, (stat.st_atime, stat.st_mtime + 10))
+    assert dn is not get_predictor(file_name)
+
+
+def test_warm_up(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    predictor = warm_up(file_name).result(timeout=10)
+    assert predictor is get_predictor(file_name)
+    number, confidence = predictor.predict(cv2.imread("./detection_number/training_scripts/original/1.jpg"))
+    assert 1 <= number <= 10
+
+    # 読み込みに失敗した場合は、result()を呼び出したスレッドで例外を送出する
+    with pytest.raises(FileNotFoundError):
+        warm_up(str(tmp_path / 'missing.npz')).result(timeout=10)
+
+
+def test_predictor_is_stateless(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    predictor = get_predictor(file_name)
+    assert isinstance(predictor, NumberPredictor)
+    imgs = [cv2.imread(f"./detection_number/training_scripts/original/{i}.jpg") for i in range(1, 9)]
+    expected = [predictor.predict(img) for img in imgs]
+    # 複数のスレッドから同時に推論しても、1つずつ推論した結果と同じになる
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert expected == list(executor.map(predictor.predict, imgs * 4))[:8]
+    # 重みは書き換えられない
+    with pytest.raises(ValueError):
+        predictor.net.weights[0][0, 0] = 0
+
+
+def test_invalid_input_size(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name, sizes=(100, 20, 20, 10))
+    with pytest.raises(ValueError):
+        DetectionNumber(model_path=file_name)
+
+
+def test_detect_number_batch(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    dn = DetectionNumber(model_path=file_name)
+    imgs = [cv2.imread(f"./detection_number/training_scripts/original/{i}.jpg") for i in (1, 1, 1)]
+    dn.set_img(imgs[0])
+    number, confidence = dn.get_detect_number_batch(imgs)
+    # 同じ画像を並べた場合は、1枚ずつ推論した結果と同じになる
+    assert dn.get_detect_number() == number
+    assert 0 < confidence <= 1
+
+    with pytest.raises(FileNotFoundError):
+        dn.get_detect_number_batch([])
+
+
+def test_detect_number_with_confidence(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    dn = DetectionNumber(img=cv2.imread("./detection_number/training_scripts/original/2.jpg"), model_path=file_name)
+    number, confidence = dn.get_detect_number_with_confidence()
+    assert dn.get_detect_number() == number
+    assert 0 < confidence <= 1
+
+
+def test_detect_number_incrementally(tmp_path):
+    file_name = str(tmp_path / 'model.npz')
+    save_model(file_name)
+    dn = DetectionNumber(model_path=file_name)
+    img = cv2.imread("./detection_number/training_scripts/original/3.jpg")
+    dn.set_img(img)
+    expected = dn.get_detect_number_with_confidence()
+
+    used = []
+
+    def frames():
+        while True:
+            used.append(img)
+            yield img
+
+    # 閾値を超えたら、それ以上画像を取り出さない
+    assert expected == dn.detect_number_incrementally(frames(), threshold=0.0)
+    assert 1 == len(used)
+
+    # 閾値を超えない場合は、最大枚数まで推論する
+    used.clear()
+    number, confidence = dn.detect_number_incrementally(frames(), threshold=1.1, max_frames=4, timeout=60)
+    assert expected[0] == number
+    assert 4 == len(used)
+
+    with pytest.raises(FileNotFoundError):
+        dn.detect_number_incrementally([])
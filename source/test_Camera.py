@@ -4,9 +4,10 @@
 @brief: Camera.pyのをテストするプログラム
 """
 
-from Camera import Camera
+from Camera import Camera, FrameGrabber, open_video_capture
 import pytest
 import cv2
+import numpy as np
 
 
 @pytest.fixture()
@@ -62,3 +63,72 @@ def test_clip_bingo_area(camera):
     img = camera.get_block_bingo_img(is_debug=False)
     actual = cv2.imread("./img/sample_bingo.png")
     assert (img == actual).all()
+
+
+def test_frame_grabber():
+    grabber = FrameGrabber("./img/sample_camera_area.jpg")
+    grabber.start()
+    img = grabber.read()
+    grabber.stop()
+    _, actual = open_video_capture("./img/sample_camera_area.jpg").read()
+    assert (img == actual).all()
+    assert not grabber.is_alive()
+
+
+def test_frame_grabber_read_frames_after():
+    # 画像ファイルは1枚読むと途切れるので、retry_intervalごとに新しいフレームが1枚届く
+    grabber = FrameGrabber("./img/sample_camera_area.jpg", retry_interval=0.2)
+    grabber.start()
+    (frames, last_count) = grabber.read_frames_after(1)
+    assert 1 == len(frames)
+    # 前回使ったフレームは返さず、新しいフレームが届かなければタイムアウトする
+    assert ([], last_count) == grabber.read_frames_after(1, last_count, timeout=0.01)
+    (frames, next_count) = grabber.read_frames_after(1, last_count, timeout=5.0)
+    assert 1 == len(frames)
+    assert last_count < next_count
+    grabber.stop()
+
+
+def test_merge_frames_median():
+    frames = [np.full((2, 2, 3), 10, dtype=np.uint8) for _ in range(4)]
+    frames.append(np.full((2, 2, 3), 255, dtype=np.uint8))  # ノイズの乗ったフレーム
+    img = Camera.merge_frames(frames)
+    assert img.dtype == np.uint8
+    assert (img == 10).all()
+
+    # 偶数枚のときは中央の2枚の平均になる
+    img = Camera.merge_frames(frames[:3] + [np.full((2, 2, 3), 20, dtype=np.uint8)])
+    assert (img == 10).all()
+    img = Camera.merge_frames(frames[:2] + [np.full((2, 2, 3), 20, dtype=np.uint8)] * 2)
+    assert (img == 15).all()
+
+
+def test_merge_frames_mean():
+    frames = [np.full((2, 2, 3), value, dtype=np.uint8) for value in (10, 20, 31)]
+    img = Camera.merge_frames(frames, method="mean")
+    assert img.dtype == np.uint8
+    assert (img == 20).all()
+
+    with pytest.raises(ValueError):
+        Camera.merge_frames(frames, method="max")
+
+
+def test_warp_maps_cache(camera):
+    actual = cv2.imread("./img/sample_bingo.png")
+    for _ in range(2):
+        img = camera.get_block_bingo_img(is_debug=False)
+        assert (img == actual).all()
+    # 処理用と座標指定用の画像で同じ変換マップを使い回す
+    assert 1 == len(camera.warp_maps)
+
+    # 切り取る領域が変わったら変換マップを作り直す
+    camera.block_bingo_img_range = dict(camera.block_bingo_img_range)
+    assert 0 == len(camera.warp_maps)
+
+
+def test_get_number_imgs(camera):
+    camera.get_number_img(is_debug=False)
+    imgs = camera.get_number_imgs()
+    assert len(camera.captured_imgs) == len(imgs)
+    actual = cv2.imread("./img/sample_number.png")
+    assert (imgs[0] == actual).all()